@@ -0,0 +1,172 @@
+"""
+Platform Analytics Snapshot Job
+Computes site-wide reading aggregates into compact snapshot tables so that
+product queries never have to scan user_books or activities at request time
+"""
+
+import os
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+from typing import Dict, Set, Tuple
+
+from sqlalchemy import select, delete
+from sqlalchemy.orm import Session
+
+from database import (
+    SessionLocal, Book, Activity, user_books,
+    BookFinishSnapshot, GenreShareSnapshot, PlatformSnapshot
+)
+
+# How far back each run recomputes (rounded down to the start of that month)
+ANALYTICS_WINDOW_DAYS = int(os.getenv("ANALYTICS_WINDOW_DAYS", "90"))
+# Rows fetched per round-trip while streaming source tables
+ANALYTICS_CHUNK_SIZE = int(os.getenv("ANALYTICS_CHUNK_SIZE", "1000"))
+# Minutes between scheduled runs
+ANALYTICS_SNAPSHOT_INTERVAL_MINUTES = int(os.getenv("ANALYTICS_SNAPSHOT_INTERVAL_MINUTES", "60"))
+
+
+def _window_start(today: date) -> date:
+    start = today - timedelta(days=ANALYTICS_WINDOW_DAYS)
+    return start.replace(day=1)
+
+
+def _stream(db: Session, stmt):
+    """Yield rows from a server-side cursor, ANALYTICS_CHUNK_SIZE at a time"""
+    result = db.execute(stmt.execution_options(yield_per=ANALYTICS_CHUNK_SIZE))
+    for partition in result.partitions():
+        for row in partition:
+            yield row
+
+
+def compute_snapshots(db: Session, today: date = None) -> Dict:
+    """
+    Recompute every snapshot table for the current window.
+    Returns a summary of what was written.
+    """
+    today = today or datetime.utcnow().date()
+    window_start = _window_start(today)
+    window_start_dt = datetime.combine(window_start, datetime.min.time())
+    cutoff_7d = datetime.combine(today - timedelta(days=7), datetime.min.time())
+    cutoff_30d = datetime.combine(today - timedelta(days=30), datetime.min.time())
+
+    finishes_by_day: Dict[Tuple[date, int], int] = defaultdict(int)
+    genres_by_month: Dict[Tuple[str, str], int] = defaultdict(int)
+    readers_7d: Set[int] = set()
+    readers_30d: Set[int] = set()
+    finishes_7d = 0
+    finishes_30d = 0
+    pace_days_total = 0
+    pace_pages_total = 0
+    pace_count = 0
+    pages_pace_count = 0
+
+    # Finished books in the window, joined with the few book columns we need
+    finished_rows = _stream(db, select(
+        user_books.c.user_id,
+        user_books.c.book_id,
+        user_books.c.started_at,
+        user_books.c.finished_at,
+        Book.genre,
+        Book.page_count
+    ).join(Book, Book.id == user_books.c.book_id).where(
+        user_books.c.status == 'read',
+        user_books.c.finished_at >= window_start_dt
+    ))
+
+    for row in finished_rows:
+        finished_at = row.finished_at
+        finishes_by_day[(finished_at.date(), row.book_id)] += 1
+        if row.genre:
+            genres_by_month[(finished_at.strftime("%Y-%m"), row.genre)] += 1
+
+        if finished_at >= cutoff_30d:
+            finishes_30d += 1
+            readers_30d.add(row.user_id)
+            if finished_at >= cutoff_7d:
+                finishes_7d += 1
+                readers_7d.add(row.user_id)
+
+            if row.started_at and finished_at >= row.started_at:
+                days = (finished_at - row.started_at).days
+                pace_days_total += days
+                pace_count += 1
+                if row.page_count:
+                    pace_pages_total += row.page_count / max(days, 1)
+                    pages_pace_count += 1
+
+    # Anyone who did something in the last 30 days counts as an active reader
+    activity_rows = _stream(db, select(
+        Activity.user_id,
+        Activity.created_at
+    ).where(Activity.created_at >= cutoff_30d))
+
+    for row in activity_rows:
+        readers_30d.add(row.user_id)
+        if row.created_at >= cutoff_7d:
+            readers_7d.add(row.user_id)
+
+    # Month totals for genre share
+    month_totals: Dict[str, int] = defaultdict(int)
+    for (month, _), count in genres_by_month.items():
+        month_totals[month] += count
+
+    # Replace the window in one transaction
+    db.execute(delete(BookFinishSnapshot).where(BookFinishSnapshot.day >= window_start))
+    db.execute(delete(GenreShareSnapshot).where(GenreShareSnapshot.month >= window_start.strftime("%Y-%m")))
+    db.execute(delete(PlatformSnapshot).where(PlatformSnapshot.snapshot_date == today))
+
+    if finishes_by_day:
+        db.execute(BookFinishSnapshot.__table__.insert(), [
+            {"day": day, "book_id": book_id, "finishes": count}
+            for (day, book_id), count in finishes_by_day.items()
+        ])
+
+    if genres_by_month:
+        db.execute(GenreShareSnapshot.__table__.insert(), [
+            {
+                "month": month,
+                "genre": genre,
+                "finishes": count,
+                "share": round(count / month_totals[month], 4)
+            }
+            for (month, genre), count in genres_by_month.items()
+        ])
+
+    db.add(PlatformSnapshot(
+        snapshot_date=today,
+        active_readers_7d=len(readers_7d),
+        active_readers_30d=len(readers_30d),
+        finishes_7d=finishes_7d,
+        finishes_30d=finishes_30d,
+        avg_days_per_book=round(pace_days_total / pace_count, 1) if pace_count else None,
+        avg_pages_per_day=round(pace_pages_total / pages_pace_count, 1) if pages_pace_count else None,
+        computed_at=datetime.utcnow()
+    ))
+
+    db.commit()
+
+    return {
+        "window_start": window_start.isoformat(),
+        "book_days": len(finishes_by_day),
+        "genre_months": len(genres_by_month),
+        "active_readers_30d": len(readers_30d),
+    }
+
+
+def run_analytics_snapshot():
+    """Entry point for the scheduler: runs the job in its own session"""
+    db = SessionLocal()
+    try:
+        summary = compute_snapshots(db)
+        print(f"Analytics snapshot complete: {summary}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    from database import init_db
+    init_db()
+    run_analytics_snapshot()
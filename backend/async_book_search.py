@@ -0,0 +1,236 @@
+"""
+Async Book Search
+Coroutine variant of BookSearchService for async route handlers. Requests go
+through pooled httpx clients, one per upstream host, that keep connections
+alive between requests, speak HTTP/2 when the optional h2 package is
+installed, and have their own connection limits and timeouts. Query
+building, formatting and the lookup cache are shared with the sync service.
+"""
+
+import asyncio
+import os
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from book_cache import BookCache
+from ol_mirror import OpenLibraryMirror
+from author_directory import AuthorDirectory
+from book_search import BookSearchService, TRENDING_DEADLINE_SECONDS
+from resilience import endpoints, check_server_error
+
+# Open connections allowed per upstream host
+BOOK_HTTP_MAX_CONNECTIONS = int(os.getenv("BOOK_HTTP_MAX_CONNECTIONS", "20"))
+# Idle keep-alive connections kept per upstream host
+BOOK_HTTP_MAX_KEEPALIVE = int(os.getenv("BOOK_HTTP_MAX_KEEPALIVE", "10"))
+# Seconds an idle keep-alive connection stays open
+BOOK_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("BOOK_HTTP_KEEPALIVE_EXPIRY", "30"))
+# Per-host connection limit overrides, e.g. "openlibrary.org=40,covers.openlibrary.org=10"
+BOOK_HTTP_HOST_LIMITS = os.getenv("BOOK_HTTP_HOST_LIMITS", "")
+# Seconds to open a connection / read a response / wait for a free pooled connection
+BOOK_HTTP_CONNECT_TIMEOUT = float(os.getenv("BOOK_HTTP_CONNECT_TIMEOUT", "5"))
+BOOK_HTTP_READ_TIMEOUT = float(os.getenv("BOOK_HTTP_READ_TIMEOUT", "10"))
+BOOK_HTTP_POOL_TIMEOUT = float(os.getenv("BOOK_HTTP_POOL_TIMEOUT", "5"))
+# Negotiate HTTP/2 when h2 is installed ("false" forces HTTP/1.1)
+BOOK_HTTP2 = os.getenv("BOOK_HTTP2", "true").lower() == "true"
+
+try:
+    import h2  # noqa: F401  (optional: pip install httpx[http2])
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def _parse_host_limits(spec: str) -> Dict[str, int]:
+    limits = {}
+    for item in spec.split(','):
+        host, _, limit = item.strip().partition('=')
+        if host and limit.strip().isdigit():
+            limits[host.strip().lower()] = int(limit)
+    return limits
+
+
+class AsyncHTTPPool:
+    """Lazily created httpx.AsyncClient per host, reused for every request"""
+
+    def __init__(
+        self,
+        max_connections: int = BOOK_HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = BOOK_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry: float = BOOK_HTTP_KEEPALIVE_EXPIRY,
+        host_limits: Optional[Dict[str, int]] = None,
+        http2: bool = BOOK_HTTP2
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.host_limits = _parse_host_limits(BOOK_HTTP_HOST_LIMITS) if host_limits is None else host_limits
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.timeout = httpx.Timeout(
+            BOOK_HTTP_READ_TIMEOUT,
+            connect=BOOK_HTTP_CONNECT_TIMEOUT,
+            pool=BOOK_HTTP_POOL_TIMEOUT
+        )
+        self.headers = {'User-Agent': 'Bookshelf/1.0 (Commercial Book Tracker)'}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def client_for(self, url: str) -> httpx.AsyncClient:
+        """Pooled client for the URL's scheme and host"""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}".lower()
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            max_connections = self.host_limits.get(parts.hostname or '', self.max_connections)
+            client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=min(self.max_keepalive, max_connections),
+                    keepalive_expiry=self.keepalive_expiry
+                ),
+                timeout=self.timeout,
+                headers=self.headers
+            )
+            self._clients[origin] = client
+        return client
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.client_for(url).get(url, **kwargs)
+
+    async def aclose(self):
+        """Close every pooled connection (app shutdown)"""
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+    def stats(self) -> Dict:
+        return {
+            "http2": self.http2,
+            "hosts": sorted(self._clients),
+            "max_connections": self.max_connections,
+            "host_limits": self.host_limits,
+        }
+
+
+class AsyncBookSearchService(BookSearchService):
+    """
+    Same lookups as BookSearchService, as coroutines. Only the public lookup
+    methods are async; the inherited helpers build params and format results.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[BookCache] = None,
+        http: Optional[AsyncHTTPPool] = None,
+        mirror: Optional[OpenLibraryMirror] = None,
+        authors: Optional[AuthorDirectory] = None
+    ):
+        super().__init__(cache, mirror, authors)
+        self.http = http or AsyncHTTPPool()
+
+    async def search_books(self, query: str, max_results: int = 20) -> List[Dict]:
+        docs = await asyncio.to_thread(self.mirror.search_docs, query, max_results)
+        if docs:
+            return self._format_search_results({'docs': docs})
+
+        key = self._search_key(query, max_results)
+        try:
+            return await self.cache.aget_or_load('search', key, lambda: self._afetch_search(query, max_results))
+        except Exception as e:
+            self._log_upstream_error("Search", e)
+            return await asyncio.to_thread(self._catalog_search, query, max_results)
+
+    async def get_book_by_isbn(self, isbn: str) -> Optional[Dict]:
+        isbn = self._normalize_isbn(isbn)
+        doc = await asyncio.to_thread(self.mirror.isbn_doc, isbn)
+        if doc:
+            return self._format_mirror_doc(doc)
+
+        try:
+            return await self.cache.aget_or_load('isbn', isbn, lambda: self._afetch_isbn(isbn))
+        except Exception as e:
+            self._log_upstream_error("ISBN lookup", e)
+            return await asyncio.to_thread(self._catalog_isbn, isbn)
+
+    async def get_book_details(self, open_library_key: str) -> Optional[Dict]:
+        work = await asyncio.to_thread(self.mirror.work, open_library_key)
+        if work:
+            return await asyncio.to_thread(self._with_author_names, self._format_details(work))
+
+        try:
+            details = await self.cache.aget_or_load(
+                'details', open_library_key, lambda: self._afetch_details(open_library_key)
+            )
+        except Exception as e:
+            self._log_upstream_error("Details", e)
+            return None
+        # Name lookups are batched blocking calls (mirror, cache file, one search)
+        return await asyncio.to_thread(self._with_author_names, details) if details else None
+
+    async def get_trending_books(self, max_results: int = 40, deadline: float = TRENDING_DEADLINE_SECONDS) -> List[Dict]:
+        queries = self._trending_queries()
+        tasks = [asyncio.create_task(self._afetch_trending(query, deadline)) for query in queries]
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            print(f"Trending: {len(pending)} of {len(queries)} queries missed the {deadline}s deadline")
+
+        docs_per_query = []
+        for task in tasks:
+            if task not in done:
+                continue
+            if task.exception():
+                print(f"Trending search error: {task.exception()}")
+                continue
+            docs_per_query.append(task.result())
+        return self._collect_trending(docs_per_query, max_results)
+
+    async def _aget(self, endpoint: str, url: str, max_timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+        """Pooled GET guarded by the endpoint's circuit breaker, adaptive timeout and hedging"""
+        async def request(timeout: float) -> httpx.Response:
+            response = await self.http.get(url, timeout=timeout, **kwargs)
+            check_server_error(response.status_code, url)
+            return response
+        return await endpoints.get(endpoint).acall(request, max_timeout)
+
+    async def _afetch_trending(self, query: str, deadline: float) -> List[Dict]:
+        response = await self._aget(
+            'openlibrary.search', f"{self.open_library_url}/search.json",
+            max_timeout=deadline, params=self._trending_params(query)
+        )
+        response.raise_for_status()
+        return response.json().get('docs', [])
+
+    async def _afetch_search(self, query: str, max_results: int) -> List[Dict]:
+        response = await self._aget(
+            'openlibrary.search', f"{self.open_library_url}/search.json", params=self._search_params(query, max_results)
+        )
+        response.raise_for_status()
+        return self._format_search_results(response.json())
+
+    async def _afetch_isbn(self, isbn: str) -> Optional[Dict]:
+        response = await self._aget('openlibrary.books', f"{self.open_library_url}/api/books", params=self._isbn_params(isbn))
+        response.raise_for_status()
+
+        book_data = response.json().get(f'ISBN:{isbn}')
+        if book_data:
+            return self._format_book_detailed(book_data, isbn)
+
+        results = await self._afetch_search(f"isbn:{isbn}", 1)
+        return results[0] if results else None
+
+    async def _afetch_details(self, open_library_key: str) -> Optional[Dict]:
+        response = await self._aget('openlibrary.details', f"{self.open_library_url}{open_library_key}.json")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return self._format_details(response.json())
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+# Singleton instance
+async_book_service = AsyncBookSearchService()
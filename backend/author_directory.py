@@ -0,0 +1,241 @@
+"""
+Author Directory
+Resolves Open Library author keys (/authors/OL23919A) to names so work
+details can show real authors. Names come from the local mirror when it has
+them, otherwise from the persistent book cache ('authors' namespace), and
+only the keys neither knows are fetched - in batches, one author search per
+chunk of keys, all within one deadline per request. Keys the search doesn't
+return are shown as bare ids and resolved one by one on a background
+thread. Expired names are served while they are refreshed in the
+background, and a scheduled job keeps the most frequently seen authors warm.
+"""
+
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Set, Tuple
+
+import requests
+
+from book_cache import BookCache, book_cache, FRESH
+from ol_mirror import OpenLibraryMirror, ol_mirror
+from resilience import endpoints, guarded_get
+
+# Base URL for Open Library (same setting as book_search)
+OPEN_LIBRARY_URL = os.getenv("OPEN_LIBRARY_URL", "https://openlibrary.org")
+# How long a resolved name is trusted before it is refreshed (names rarely change)
+AUTHOR_DIRECTORY_TTL = int(os.getenv("AUTHOR_DIRECTORY_TTL", str(30 * 86400)))
+# Author keys per batched search request
+AUTHOR_DIRECTORY_BATCH_SIZE = int(os.getenv("AUTHOR_DIRECTORY_BATCH_SIZE", "50"))
+# Overall budget (seconds) a request spends on name lookups before showing ids instead
+AUTHOR_DIRECTORY_TIMEOUT_SECONDS = float(os.getenv("AUTHOR_DIRECTORY_TIMEOUT_SECONDS", "3"))
+# Most frequently seen authors kept resolved by the pre-warm job
+AUTHOR_DIRECTORY_PREWARM_SIZE = int(os.getenv("AUTHOR_DIRECTORY_PREWARM_SIZE", "500"))
+# Minutes between pre-warm runs
+AUTHOR_DIRECTORY_PREWARM_INTERVAL_MINUTES = int(os.getenv("AUTHOR_DIRECTORY_PREWARM_INTERVAL_MINUTES", "60"))
+
+# Seen-author counts kept across restarts (the pre-warm candidates)
+TRACKED_AUTHORS = 5000
+
+
+def author_key(key: str) -> str:
+    """'OL23919A', 'authors/OL23919A' or '/authors/OL23919A' -> '/authors/OL23919A'"""
+    return f"/authors/{key.rstrip('/').split('/')[-1]}"
+
+
+class AuthorDirectory:
+    """Author key -> name, batched and cached"""
+
+    def __init__(self, cache: Optional[BookCache] = None, mirror: Optional[OpenLibraryMirror] = None):
+        self.open_library_url = OPEN_LIBRARY_URL
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': 'Bookshelf/1.0 (Commercial Book Tracker)'})
+        self.cache = cache or book_cache
+        self.mirror = mirror or ol_mirror
+        self._seen: Counter = Counter()
+        self._seen_loaded = False
+        self._lock = threading.Lock()
+        # Keys handed to the background resolver and not finished yet
+        self._deferred: Set[str] = set()
+        self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="author-lookup")
+        self.stats = {"batch_requests": 0, "single_requests": 0, "deferred": 0, "prewarmed": 0}
+
+    def names(self, keys: List[str], timeout: float = AUTHOR_DIRECTORY_TIMEOUT_SECONDS) -> Dict[str, str]:
+        """
+        Names keyed by normalized author key, looked up within one overall
+        timeout. Keys that can't be resolved right now (unknown author, not in
+        the batch search, Open Library slow or down) are left out.
+        """
+        keys = list(dict.fromkeys(author_key(key) for key in keys if key))
+        if not keys:
+            return {}
+        with self._lock:
+            self._seen.update(keys)
+
+        deadline = time.monotonic() + timeout
+        found = self.mirror.author_names(keys)
+        rest = [key for key in keys if key not in found]
+        if rest:
+            try:
+                names = self.cache.get_many_or_load(
+                    'authors', rest, lambda missing: self._search_or_defer(missing, deadline), ttl=AUTHOR_DIRECTORY_TTL
+                )
+                found.update({key: name for key, name in names.items() if name})
+            except Exception as e:
+                print(f"Author lookup error: {e}")
+        return found
+
+    def resolve(self, keys: List[str]) -> List[str]:
+        """Display names in the given order, falling back to the bare id (OL23919A) once the budget is spent"""
+        names = self.names(keys)
+        return [names.get(author_key(key)) or key.rstrip('/').split('/')[-1] for key in keys if key]
+
+    # ---------- upstream ----------
+
+    def _search_or_defer(self, keys: List[str], deadline: float) -> Dict[str, str]:
+        """
+        Request-path cache loader: batch searches only, until the deadline.
+        Whatever they don't answer is resolved in the background and shows
+        as a bare id meanwhile (left out, so nothing is cached for it yet).
+        """
+        names, leftover = self._search_names(keys, deadline)
+        if leftover:
+            self._defer(leftover)
+        return names
+
+    def _defer(self, keys: List[str]):
+        with self._lock:
+            keys = [key for key in keys if key not in self._deferred]
+            self._deferred.update(keys)
+            self.stats["deferred"] += len(keys)
+        if keys:
+            self._background.submit(self._resolve_deferred, keys)
+
+    def _resolve_deferred(self, keys: List[str]):
+        try:
+            for key, name in self._fetch_names(keys).items():
+                self.cache.store('authors', key, name, ttl=AUTHOR_DIRECTORY_TTL)
+        except Exception as e:
+            print(f"Background author lookup error for {len(keys)} authors: {e}")
+        finally:
+            with self._lock:
+                self._deferred.difference_update(keys)
+
+    def _search_names(self, keys: List[str], deadline: Optional[float] = None) -> Tuple[Dict[str, str], List[str]]:
+        """One author search per chunk of keys; returns (names, keys not found)"""
+        names: Dict[str, str] = {}
+        leftover = []
+        for start in range(0, len(keys), AUTHOR_DIRECTORY_BATCH_SIZE):
+            chunk = keys[start:start + AUTHOR_DIRECTORY_BATCH_SIZE]
+            remaining = AUTHOR_DIRECTORY_TIMEOUT_SECONDS if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                leftover.extend(chunk)
+                continue
+            try:
+                found = self._search_authors(chunk, min(remaining, AUTHOR_DIRECTORY_TIMEOUT_SECONDS))
+            except Exception as e:
+                print(f"Author batch lookup error for {len(chunk)} authors: {e}")
+                found = {}
+            names.update(found)
+            leftover.extend(key for key in chunk if key not in found)
+        return names, leftover
+
+    def _fetch_names(self, keys: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Background and pre-warm loader: the batch searches, then an author
+        record fetch for any key they didn't return. Keys whose requests
+        failed are left out so the failure isn't cached.
+        """
+        names: Dict[str, Optional[str]] = {}
+        found, leftover = self._search_names(keys)
+        names.update(found)
+
+        if leftover:
+            with ThreadPoolExecutor(max_workers=min(4, len(leftover)), thread_name_prefix="author-lookup") as pool:
+                futures = {pool.submit(self._fetch_author, key): key for key in leftover}
+                for future in as_completed(futures):
+                    try:
+                        names[futures[future]] = future.result()
+                    except Exception as e:
+                        print(f"Author lookup error for {futures[future]}: {e}")
+        return names
+
+    def _search_authors(self, keys: List[str], max_timeout: float = AUTHOR_DIRECTORY_TIMEOUT_SECONDS) -> Dict[str, str]:
+        ids = ' OR '.join(key.split('/')[-1] for key in keys)
+        response = guarded_get(
+            self.session, endpoints.get('openlibrary.authors'), f"{self.open_library_url}/search/authors.json",
+            max_timeout=max_timeout,
+            params={'q': f'key:({ids})', 'fields': 'key,name', 'limit': len(keys)}
+        )
+        response.raise_for_status()
+        self._count("batch_requests")
+        return {
+            author_key(doc['key']): doc['name']
+            for doc in response.json().get('docs', []) if doc.get('key') and doc.get('name')
+        }
+
+    def _fetch_author(self, key: str) -> Optional[str]:
+        """None means Open Library doesn't know the key (cached as a miss)"""
+        response = guarded_get(
+            self.session, endpoints.get('openlibrary.authors'), f"{self.open_library_url}{key}.json",
+            max_timeout=AUTHOR_DIRECTORY_TIMEOUT_SECONDS
+        )
+        self._count("single_requests")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        data = response.json()
+        return data.get('name') or data.get('personal_name')
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.stats[name] += n
+
+    # ---------- pre-warming ----------
+
+    def _load_seen(self):
+        """Merge the counts persisted by the last pre-warm (once per process)"""
+        if self._seen_loaded:
+            return
+        self._seen_loaded = True
+        _, saved = self.cache.lookup('authors_seen', 'counts')
+        if saved:
+            with self._lock:
+                self._seen.update(saved)
+
+    def prewarm(self) -> Dict:
+        """Resolve the most frequently seen authors whose names are missing or expired"""
+        self._load_seen()
+        with self._lock:
+            counts = dict(self._seen.most_common(TRACKED_AUTHORS))
+            # Forget the long tail so the counter stays bounded
+            self._seen = Counter(counts)
+        self.cache.store('authors_seen', 'counts', counts, ttl=365 * 86400)
+
+        top = list(counts)[:AUTHOR_DIRECTORY_PREWARM_SIZE]
+        known = self.mirror.author_names(top)
+        stale = []
+        for key in top:
+            if key in known:
+                continue
+            state, _ = self.cache.lookup('authors', key)
+            if state != FRESH:
+                stale.append(key)
+        if not stale:
+            return {"tracked": len(counts), "refreshed": 0}
+
+        names = self._fetch_names(stale)
+        for key, name in names.items():
+            self.cache.store('authors', key, name, ttl=AUTHOR_DIRECTORY_TTL)
+        self._count("prewarmed", len(names))
+        return {"tracked": len(counts), "refreshed": len(names)}
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "tracked": len(self._seen)}
+
+
+# Singleton instance
+author_directory = AuthorDirectory()
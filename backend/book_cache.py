@@ -0,0 +1,400 @@
+"""
+External Book Lookup Cache
+Two-tier TTL cache for Open Library responses: an in-memory LRU in front of a
+SQLite file that survives restarts. Misses are cached too (with a shorter
+TTL), and expired entries are served immediately while a background refresh
+fetches a new copy (stale-while-revalidate). Concurrent misses for the same
+key are coalesced into one load (single-flight).
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from single_flight import SingleFlight
+
+# SQLite file for the persistent tier
+BOOK_CACHE_PATH = os.getenv("BOOK_CACHE_PATH", "./book_cache.db")
+# Entries kept in the in-memory tier
+BOOK_CACHE_MEMORY_ENTRIES = int(os.getenv("BOOK_CACHE_MEMORY_ENTRIES", "5000"))
+# How long an expired entry may still be served while it is refreshed
+BOOK_CACHE_STALE_SECONDS = int(os.getenv("BOOK_CACHE_STALE_SECONDS", "86400"))
+# TTL for lookups that found nothing
+BOOK_CACHE_NEGATIVE_TTL = int(os.getenv("BOOK_CACHE_NEGATIVE_TTL", "600"))
+
+# Per-method TTLs (seconds)
+BOOK_CACHE_TTLS = {
+    'search': int(os.getenv("BOOK_CACHE_SEARCH_TTL", "3600")),
+    'isbn': int(os.getenv("BOOK_CACHE_ISBN_TTL", "604800")),
+    'details': int(os.getenv("BOOK_CACHE_DETAILS_TTL", "604800")),
+}
+
+# Lookup outcomes
+FRESH = 'fresh'
+STALE = 'stale'
+MISS = 'miss'
+
+
+def _is_negative(value: Any) -> bool:
+    return value is None or value == []
+
+
+class BookCache:
+    """Memory LRU + SQLite TTL cache keyed by (namespace, key)"""
+
+    def __init__(
+        self,
+        path: str = BOOK_CACHE_PATH,
+        memory_entries: int = BOOK_CACHE_MEMORY_ENTRIES,
+        stale_seconds: int = BOOK_CACHE_STALE_SECONDS,
+        negative_ttl: int = BOOK_CACHE_NEGATIVE_TTL
+    ):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.stale_seconds = stale_seconds
+        self.negative_ttl = negative_ttl
+        # (namespace, key) -> (value, expires_at)
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._refreshing: Set[Tuple[str, str]] = set()
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="book-cache-refresh")
+        # Strong references so pending async refreshes aren't garbage collected
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._stats_lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    # ---------- persistent tier ----------
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        """Open the SQLite file lazily; the cache keeps working memory-only if it can't"""
+        if self._conn is None and self.path:
+            try:
+                conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache_entries ("
+                    "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                    "expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+                )
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE expires_at < ?",
+                    (time.time() - self.stale_seconds,)
+                )
+                self._conn = conn
+            except sqlite3.Error as e:
+                print(f"Book cache running memory-only ({self.path}): {e}")
+                self.path = None
+        return self._conn
+
+    def _disk_get(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        with self._db_lock:
+            conn = self._db()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (namespace, key)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"Book cache read error: {e}")
+                return None
+        if not row:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def _disk_put(self, namespace: str, key: str, value: Any, expires_at: float):
+        with self._db_lock:
+            conn = self._db()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value, separators=(',', ':')), expires_at)
+                )
+            except sqlite3.Error as e:
+                print(f"Book cache write error: {e}")
+
+    # ---------- lookups ----------
+
+    def lookup(self, namespace: str, key: str) -> Tuple[str, Any]:
+        """Return (FRESH|STALE|MISS, value) without loading anything"""
+        now = time.time()
+        cache_key = (namespace, key)
+        with self._lock:
+            entry = self._memory.get(cache_key)
+            if entry is not None:
+                self._memory.move_to_end(cache_key)
+
+        if entry is None:
+            entry = self._disk_get(namespace, key)
+            if entry is not None:
+                self._count(namespace, 'disk_hits')
+                self._remember(cache_key, entry)
+
+        if entry is None:
+            return MISS, None
+
+        value, expires_at = entry
+        if now < expires_at:
+            return FRESH, value
+        if now < expires_at + self.stale_seconds:
+            return STALE, value
+        return MISS, None
+
+    def store(self, namespace: str, key: str, value: Any, ttl: Optional[int] = None):
+        """Cache a loaded value; empty results get the negative TTL"""
+        expires_at = self._expires_at(namespace, value, ttl)
+        self._remember((namespace, key), (value, expires_at))
+        self._disk_put(namespace, key, value, expires_at)
+
+    async def alookup(self, namespace: str, key: str) -> Tuple[str, Any]:
+        """lookup() for coroutines: memory hits answer inline, SQLite reads run on a worker thread"""
+        if self.path:
+            with self._lock:
+                in_memory = (namespace, key) in self._memory
+            if not in_memory:
+                return await asyncio.to_thread(self.lookup, namespace, key)
+        return self.lookup(namespace, key)
+
+    async def astore(self, namespace: str, key: str, value: Any, ttl: Optional[int] = None):
+        """store() for coroutines: visible in memory at once, written to SQLite on a worker thread"""
+        expires_at = self._expires_at(namespace, value, ttl)
+        self._remember((namespace, key), (value, expires_at))
+        if self.path:
+            await asyncio.to_thread(self._disk_put, namespace, key, value, expires_at)
+
+    def _expires_at(self, namespace: str, value: Any, ttl: Optional[int]) -> float:
+        if _is_negative(value):
+            ttl = min(ttl or self.negative_ttl, self.negative_ttl)
+        else:
+            ttl = ttl or BOOK_CACHE_TTLS.get(namespace, 3600)
+        return time.time() + ttl
+
+    def _remember(self, cache_key: Tuple[str, str], entry: Tuple[Any, float]):
+        with self._lock:
+            self._memory[cache_key] = entry
+            self._memory.move_to_end(cache_key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _count(self, namespace: str, name: str):
+        with self._stats_lock:
+            self._stats[namespace][name] += 1
+
+    def record(self, namespace: str, state: str, value: Any = None):
+        """Count one lookup outcome for the hit-ratio metrics"""
+        self._count(namespace, state)
+        if state != MISS and _is_negative(value):
+            self._count(namespace, 'negative_hits')
+
+    def claim_refresh(self, namespace: str, key: str) -> bool:
+        """True if the caller should refresh this entry (only one refresh at a time)"""
+        with self._lock:
+            if (namespace, key) in self._refreshing:
+                return False
+            self._refreshing.add((namespace, key))
+            return True
+
+    def release_refresh(self, namespace: str, key: str):
+        with self._lock:
+            self._refreshing.discard((namespace, key))
+
+    def get_or_load(self, namespace: str, key: str, loader: Callable[[], Any], ttl: Optional[int] = None) -> Any:
+        """
+        Serve from cache, loading on a miss. Stale entries are returned at once
+        and refreshed on a background thread. Concurrent misses for one key
+        share a single load. Loader exceptions propagate to every waiter and
+        are never cached.
+        """
+        state, value = self.lookup(namespace, key)
+        self.record(namespace, state, value)
+
+        if state == FRESH:
+            return value
+        if state == STALE:
+            if self.claim_refresh(namespace, key):
+                self._refresher.submit(self._refresh, namespace, key, loader, ttl)
+            return value
+
+        return self._flights.do(
+            (namespace, key),
+            lambda: self._load(namespace, key, loader, ttl),
+            on_shared=lambda: self._count(namespace, 'coalesced')
+        )
+
+    def _load(self, namespace: str, key: str, loader: Callable[[], Any], ttl: Optional[int]) -> Any:
+        try:
+            value = loader()
+        except Exception:
+            self._count(namespace, 'errors')
+            raise
+        self.store(namespace, key, value, ttl)
+        return value
+
+    def _refresh(self, namespace: str, key: str, loader: Callable[[], Any], ttl: Optional[int]):
+        try:
+            self.store(namespace, key, loader(), ttl)
+            self._count(namespace, 'refreshes')
+        except Exception as e:
+            # Keep serving the stale copy until it ages out
+            self._count(namespace, 'refresh_errors')
+            print(f"Book cache refresh failed for {namespace}:{key}: {e}")
+        finally:
+            self.release_refresh(namespace, key)
+
+    def get_many_or_load(
+        self, namespace: str, keys: List[str], loader: Callable[[List[str]], Dict[str, Any]], ttl: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Batch get_or_load: every miss is handed to one loader(keys) call.
+        The loader returns {key: value} for the keys it could answer (None
+        means not found and is cached as a miss); keys it leaves out are
+        neither cached nor returned. Stale keys are served and refreshed
+        together in the background. Batch loads are not coalesced with
+        single-key loads.
+        """
+        found: Dict[str, Any] = {}
+        missing: List[str] = []
+        stale: List[str] = []
+        for key in keys:
+            state, value = self.lookup(namespace, key)
+            self.record(namespace, state, value)
+            if state == MISS:
+                missing.append(key)
+                continue
+            found[key] = value
+            if state == STALE and self.claim_refresh(namespace, key):
+                stale.append(key)
+
+        if stale:
+            self._refresher.submit(self._refresh_many, namespace, stale, loader, ttl)
+        if missing:
+            found.update(self._load_many(namespace, missing, loader, ttl))
+        return found
+
+    def _load_many(
+        self, namespace: str, keys: List[str], loader: Callable[[List[str]], Dict[str, Any]], ttl: Optional[int]
+    ) -> Dict[str, Any]:
+        try:
+            loaded = loader(keys)
+        except Exception:
+            self._count(namespace, 'errors')
+            raise
+        for key, value in loaded.items():
+            self.store(namespace, key, value, ttl)
+        return loaded
+
+    def _refresh_many(
+        self, namespace: str, keys: List[str], loader: Callable[[List[str]], Dict[str, Any]], ttl: Optional[int]
+    ):
+        try:
+            for key, value in loader(keys).items():
+                self.store(namespace, key, value, ttl)
+                self._count(namespace, 'refreshes')
+        except Exception as e:
+            self._count(namespace, 'refresh_errors')
+            print(f"Book cache refresh failed for {len(keys)} {namespace} keys: {e}")
+        finally:
+            for key in keys:
+                self.release_refresh(namespace, key)
+
+    async def aget_or_load(
+        self, namespace: str, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[int] = None
+    ) -> Any:
+        """
+        get_or_load for coroutine loaders; stale refreshes run as event-loop
+        tasks and the SQLite tier is only touched from worker threads
+        """
+        state, value = await self.alookup(namespace, key)
+        self.record(namespace, state, value)
+
+        if state == FRESH:
+            return value
+        if state == STALE:
+            if self.claim_refresh(namespace, key):
+                task = asyncio.create_task(self._arefresh(namespace, key, loader, ttl))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return value
+
+        return await self._flights.ado(
+            (namespace, key),
+            lambda: self._aload(namespace, key, loader, ttl),
+            on_shared=lambda: self._count(namespace, 'coalesced')
+        )
+
+    async def _aload(self, namespace: str, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[int]) -> Any:
+        try:
+            value = await loader()
+        except Exception:
+            self._count(namespace, 'errors')
+            raise
+        await self.astore(namespace, key, value, ttl)
+        return value
+
+    async def _arefresh(self, namespace: str, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[int]):
+        try:
+            await self.astore(namespace, key, await loader(), ttl)
+            self._count(namespace, 'refreshes')
+        except Exception as e:
+            self._count(namespace, 'refresh_errors')
+            print(f"Book cache refresh failed for {namespace}:{key}: {e}")
+        finally:
+            self.release_refresh(namespace, key)
+
+    # ---------- metrics ----------
+
+    def metrics(self) -> Dict:
+        """Hit ratios per namespace (stale serves count as hits)"""
+        namespaces = {}
+        totals = defaultdict(int)
+        with self._stats_lock:
+            snapshot = {namespace: dict(stats) for namespace, stats in self._stats.items()}
+        for namespace, stats in snapshot.items():
+            stats = defaultdict(int, stats)
+            lookups = stats[FRESH] + stats[STALE] + stats[MISS]
+            namespaces[namespace] = {
+                "lookups": lookups,
+                "hits": stats[FRESH],
+                "stale_hits": stats[STALE],
+                "misses": stats[MISS],
+                "negative_hits": stats['negative_hits'],
+                "disk_hits": stats['disk_hits'],
+                "refreshes": stats['refreshes'],
+                "refresh_errors": stats['refresh_errors'],
+                "errors": stats['errors'],
+                # Misses that waited on another caller's in-flight load
+                "coalesced": stats['coalesced'],
+                "hit_ratio": round((stats[FRESH] + stats[STALE]) / lookups, 4) if lookups else None,
+            }
+            totals['lookups'] += lookups
+            totals['hits'] += stats[FRESH] + stats[STALE]
+            totals['coalesced'] += stats['coalesced']
+
+        with self._lock:
+            memory_entries = len(self._memory)
+
+        return {
+            "hit_ratio": round(totals['hits'] / totals['lookups'], 4) if totals['lookups'] else None,
+            "lookups": totals['lookups'],
+            "coalesced": totals['coalesced'],
+            "in_flight": self._flights.in_flight(),
+            "memory_entries": memory_entries,
+            "persistent": self.path is not None,
+            "namespaces": namespaces,
+        }
+
+
+# Singleton instance
+book_cache = BookCache()
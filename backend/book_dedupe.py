@@ -0,0 +1,226 @@
+"""
+Duplicate Book Detection and Merging
+Catalog lookups by ISBN or match key for every ingestion path, plus a
+one-off job that merges Book rows sharing a match key into the oldest one
+and repoints everything that referenced the duplicates.
+
+Run from the command line:
+    python book_dedupe.py            # merge duplicates
+    python book_dedupe.py --dry-run  # only report duplicate groups
+"""
+
+import sys
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from database import (
+    SessionLocal, Book, Activity, CircleActivity, CircleChallenge, PointsLedgerEntry,
+    BookFinishSnapshot, user_books, collection_books, review_likes, import_row_keys
+)
+from book_matching import book_match_key
+from library_sync import next_library_revisions, record_tombstones, clear_tombstones
+
+# Book columns a merged duplicate can fill in on the book that is kept
+MERGED_COLUMNS = ('isbn', 'description', 'cover_url', 'published_year', 'genre', 'page_count', 'publisher')
+
+
+def find_existing_book(
+    db: Session,
+    isbn: Optional[str] = None,
+    title: Optional[str] = None,
+    author: Optional[str] = None
+) -> Optional[Book]:
+    """Catalog book with the same ISBN, or failing that the same match key"""
+    if isbn:
+        book = db.query(Book).filter(Book.isbn == isbn).first()
+        if book:
+            return book
+
+    match_key = book_match_key(title, author)
+    if match_key:
+        return db.query(Book).filter(Book.match_key == match_key).order_by(Book.id).first()
+    return None
+
+
+def _merge_library_entries(db: Session, keep_id: int, duplicate_ids: List[int]) -> int:
+    """One user_books row per user survives, on keep_id; returns affected users"""
+    rows = db.execute(
+        user_books.select().where(user_books.c.book_id.in_([keep_id] + duplicate_ids)).order_by(
+            (user_books.c.book_id != keep_id), user_books.c.id
+        )
+    ).fetchall()
+
+    by_user: Dict[int, List] = defaultdict(list)
+    for row in rows:
+        by_user[row.user_id].append(row)
+
+    affected = [user_id for user_id, entries in by_user.items() if any(e.book_id != keep_id for e in entries)]
+    if not affected:
+        return 0
+    revisions = next_library_revisions(db, affected)
+
+    for user_id in affected:
+        survivor, *others = by_user[user_id]
+        values = {'book_id': keep_id, 'revision': revisions[user_id]}
+        # Keep the survivor's own data, filling gaps from the rows being folded in
+        for column in ('rating', 'review', 'current_page', 'started_at', 'finished_at'):
+            if getattr(survivor, column) is None:
+                value = next((getattr(o, column) for o in others if getattr(o, column) is not None), None)
+                if value is not None:
+                    values[column] = value
+
+        if others:
+            db.execute(user_books.delete().where(user_books.c.id.in_([o.id for o in others])))
+        db.execute(user_books.update().where(user_books.c.id == survivor.id).values(**values))
+
+        removed = sorted({e.book_id for e in by_user[user_id] if e.book_id != keep_id})
+        record_tombstones(db, user_id, removed, revisions[user_id])
+        clear_tombstones(db, user_id, [keep_id])
+
+    return len(affected)
+
+
+def _merge_collection_entries(db: Session, keep_id: int, duplicate_ids: List[int]):
+    rows = db.execute(
+        select(collection_books.c.collection_id, collection_books.c.book_id).where(
+            collection_books.c.book_id.in_([keep_id] + duplicate_ids)
+        )
+    ).fetchall()
+    has_keep = {row.collection_id for row in rows if row.book_id == keep_id}
+    for row in rows:
+        if row.book_id == keep_id:
+            continue
+        condition = (collection_books.c.collection_id == row.collection_id) & (collection_books.c.book_id == row.book_id)
+        if row.collection_id in has_keep:
+            db.execute(collection_books.delete().where(condition))
+        else:
+            db.execute(collection_books.update().where(condition).values(book_id=keep_id))
+            has_keep.add(row.collection_id)
+
+
+def _merge_review_likes(db: Session, keep_id: int, duplicate_ids: List[int]):
+    rows = db.execute(
+        select(review_likes.c.id, review_likes.c.user_id, review_likes.c.reviewer_id, review_likes.c.book_id).where(
+            review_likes.c.book_id.in_([keep_id] + duplicate_ids)
+        ).order_by((review_likes.c.book_id != keep_id), review_likes.c.id)
+    ).fetchall()
+    seen = set()
+    redundant = []
+    for row in rows:
+        key = (row.user_id, row.reviewer_id)
+        if key in seen:
+            redundant.append(row.id)
+        seen.add(key)
+    if redundant:
+        db.execute(review_likes.delete().where(review_likes.c.id.in_(redundant)))
+    db.execute(review_likes.update().where(review_likes.c.book_id.in_(duplicate_ids)).values(book_id=keep_id))
+
+
+def _merge_finish_snapshots(db: Session, keep_id: int, duplicate_ids: List[int]):
+    """analytics_book_finishes is unique per (day, book): sum the days together"""
+    ids = [keep_id] + duplicate_ids
+    rows = db.execute(
+        select(BookFinishSnapshot.day, BookFinishSnapshot.finishes).where(BookFinishSnapshot.book_id.in_(ids))
+    ).fetchall()
+    if not rows:
+        return
+    finishes_by_day: Dict = defaultdict(int)
+    for row in rows:
+        finishes_by_day[row.day] += row.finishes
+    db.execute(delete(BookFinishSnapshot).where(BookFinishSnapshot.book_id.in_(ids)))
+    db.execute(BookFinishSnapshot.__table__.insert(), [
+        {"day": day, "book_id": keep_id, "finishes": finishes}
+        for day, finishes in finishes_by_day.items()
+    ])
+
+
+def merge_books(db: Session, keep_id: int, duplicate_ids: List[int]) -> Dict:
+    """
+    Fold duplicate books into keep_id and delete them.
+    Does not commit; returns how many users' libraries changed.
+    """
+    duplicate_ids = [book_id for book_id in duplicate_ids if book_id != keep_id]
+    if not duplicate_ids:
+        return {"users": 0}
+
+    books = {b.id: b for b in db.query(Book).filter(Book.id.in_([keep_id] + duplicate_ids))}
+    keep = books[keep_id]
+    fill = {}
+    for column in MERGED_COLUMNS:
+        if getattr(keep, column) is None:
+            value = next((getattr(books[i], column) for i in duplicate_ids
+                          if i in books and getattr(books[i], column) is not None), None)
+            if value is not None:
+                fill[column] = value
+
+    users = _merge_library_entries(db, keep_id, duplicate_ids)
+    _merge_collection_entries(db, keep_id, duplicate_ids)
+    _merge_review_likes(db, keep_id, duplicate_ids)
+    _merge_finish_snapshots(db, keep_id, duplicate_ids)
+    for column in (Activity.book_id, CircleActivity.book_id, CircleChallenge.target_book_id, PointsLedgerEntry.book_id):
+        db.execute(update(column.class_).where(column.in_(duplicate_ids)).values({column.key: keep_id}))
+    db.execute(import_row_keys.update().where(import_row_keys.c.book_id.in_(duplicate_ids)).values(book_id=keep_id))
+
+    # Duplicates go first so a copied ISBN can't collide with them
+    db.execute(delete(Book).where(Book.id.in_(duplicate_ids)))
+
+    ratings = db.execute(
+        select(func.avg(user_books.c.rating), func.count(user_books.c.rating)).where(
+            user_books.c.book_id == keep_id,
+            user_books.c.rating.isnot(None)
+        )
+    ).one()
+    fill['average_rating'] = float(ratings[0]) if ratings[1] else 0.0
+    fill['ratings_count'] = ratings[1]
+    db.execute(update(Book).where(Book.id == keep_id).values(**fill))
+    db.expire_all()
+
+    return {"users": users}
+
+
+def find_duplicate_groups(db: Session) -> List[List[int]]:
+    """Book ids sharing a match key, oldest first; ISBN-bearing books lead their group"""
+    keys = db.execute(
+        select(Book.match_key).where(Book.match_key != '').group_by(Book.match_key).having(func.count(Book.id) > 1)
+    ).scalars().all()
+
+    groups = []
+    for start in range(0, len(keys), 900):
+        members: Dict[str, List] = defaultdict(list)
+        for book_id, match_key, isbn in db.execute(
+            select(Book.id, Book.match_key, Book.isbn).where(Book.match_key.in_(keys[start:start + 900])).order_by(Book.id)
+        ):
+            members[match_key].append((isbn is None, book_id))
+        groups.extend([book_id for _, book_id in sorted(group)] for group in members.values())
+    return groups
+
+
+def merge_duplicate_books(dry_run: bool = False) -> Dict:
+    """Merge every duplicate group, committing after each group"""
+    db = SessionLocal()
+    try:
+        groups = find_duplicate_groups(db)
+        summary = {"groups": len(groups), "books_removed": sum(len(g) - 1 for g in groups), "users": 0}
+        if dry_run:
+            return summary
+
+        for keep_id, *duplicate_ids in groups:
+            try:
+                summary["users"] += merge_books(db, keep_id, duplicate_ids)["users"]
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                summary["books_removed"] -= len(duplicate_ids)
+                print(f"Could not merge books {duplicate_ids} into {keep_id}: {e}")
+        return summary
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    from database import init_db
+    init_db()
+    print(f"Duplicate books: {merge_duplicate_books(dry_run='--dry-run' in sys.argv)}")
@@ -0,0 +1,60 @@
+"""
+Book Match Keys
+Normalized title + author surname used to recognise the same book arriving
+from different sources ("The Hobbit (The Lord of the Rings, #0)" by
+"Tolkien, J.R.R." and "The Hobbit" by "J. R. R. Tolkien" share one key).
+Stored on books.match_key (indexed) so dedupe is a single equality lookup.
+"""
+
+import re
+import unicodedata
+from typing import Optional
+
+MATCH_KEY_MAX_LENGTH = 300
+
+_SERIES_SUFFIX = re.compile(r'\s*[\(\[][^\)\]]*[\)\]]\s*$')
+_NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+_AUTHOR_SEPARATORS = re.compile(r'\s+(?:and|&)\s+|;|/', re.IGNORECASE)
+_NAME_SUFFIXES = {'jr', 'sr', 'ii', 'iii', 'iv', 'phd', 'md'}
+_UNKNOWN_AUTHORS = {'', 'unknown', 'unknown author', 'anonymous'}
+
+
+def _fold(text: str) -> str:
+    """Casefold, strip accents and replace punctuation with single spaces"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_WORD.sub(' ', stripped.casefold()).strip()
+
+
+def normalize_title(title: Optional[str]) -> str:
+    """Title without series tags like "(Discworld, #1)", accents or punctuation"""
+    if not title:
+        return ''
+    title = _SERIES_SUFFIX.sub('', title.strip()) or title
+    return _fold(title.replace('&', ' and '))
+
+
+def author_surname(author: Optional[str]) -> str:
+    """Canonical surname of the first credited author"""
+    if not author or _fold(author) in _UNKNOWN_AUTHORS:
+        return ''
+    first = _AUTHOR_SEPARATORS.split(author)[0]
+    first = re.sub(r'\([^)]*\)', '', first).strip()
+
+    parts = [p.strip() for p in first.split(',') if p.strip()]
+    if len(parts) > 1 and len(parts[0].split()) == 1 and _fold(parts[1]) not in _NAME_SUFFIXES:
+        # "Last, First"
+        return _fold(parts[0])
+
+    words = _fold(parts[0] if parts else first).split()
+    while len(words) > 1 and words[-1] in _NAME_SUFFIXES:
+        words.pop()
+    return words[-1] if words else ''
+
+
+def book_match_key(title: Optional[str], author: Optional[str]) -> Optional[str]:
+    """Match key for a title/author pair, or None when there is no usable title"""
+    normalized = normalize_title(title)
+    if not normalized:
+        return None
+    return f"{normalized}|{author_surname(author)}"[:MATCH_KEY_MAX_LENGTH]
@@ -3,95 +3,321 @@ Commercial Book Search API
 Uses Open Library as primary source with intelligent fallbacks
 """
 
+import os
+import re
 import requests
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 import time
-from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from datetime import datetime
+
+from sqlalchemy import or_
+
+from book_cache import BookCache, book_cache
+from database import SessionLocal, Book
+from resilience import endpoints, guarded_get, CircuitOpenError
+from ol_mirror import OpenLibraryMirror, ol_mirror
+from cover_cache import cover_proxy_url
+from author_directory import AuthorDirectory, author_directory
+from genre_classifier import genre_classifier
+
+# Base URL for Open Library (overridable for mirrors and local stubs)
+OPEN_LIBRARY_URL = os.getenv("OPEN_LIBRARY_URL", "https://openlibrary.org")
+# Latency budget (seconds) for the concurrent trending queries; slower ones are dropped
+TRENDING_DEADLINE_SECONDS = float(os.getenv("TRENDING_DEADLINE_SECONDS", "3"))
+# ISBNs per multi-key bibkeys request in batch lookups
+ISBN_LOOKUP_BATCH_SIZE = int(os.getenv("ISBN_LOOKUP_BATCH_SIZE", "50"))
+# Concurrent bibkeys requests (and search fallbacks) per batch lookup
+ISBN_LOOKUP_WORKERS = int(os.getenv("ISBN_LOOKUP_WORKERS", "4"))
 
 class BookSearchService:
     """Multi-source book search optimized for commercial use"""
     
-    def __init__(self):
-        self.open_library_url = "https://openlibrary.org"
+    def __init__(
+        self,
+        cache: Optional[BookCache] = None,
+        mirror: Optional[OpenLibraryMirror] = None,
+        authors: Optional[AuthorDirectory] = None
+    ):
+        self.open_library_url = OPEN_LIBRARY_URL
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Bookshelf/1.0 (Commercial Book Tracker)'
         })
+        self.cache = cache or book_cache
+        # Local dump mirror, consulted before the network (see ol_mirror.py)
+        self.mirror = mirror or ol_mirror
+        # Author key -> name lookups for work details (see author_directory.py)
+        self.authors = authors or author_directory
     
     def search_books(self, query: str, max_results: int = 20) -> List[Dict]:
         """
         Search for books using Open Library API
         Free, unlimited, commercial-friendly
         """
-        url = f"{self.open_library_url}/search.json"
-        params = {
+        docs = self.mirror.search_docs(query, max_results)
+        if docs:
+            return self._format_search_results({'docs': docs})
+        
+        key = self._search_key(query, max_results)
+        try:
+            return self.cache.get_or_load('search', key, lambda: self._fetch_search(query, max_results))
+        except Exception as e:
+            self._log_upstream_error("Search", e)
+            return self._catalog_search(query, max_results)
+    
+    def get_book_by_isbn(self, isbn: str) -> Optional[Dict]:
+        """Look up book by ISBN"""
+        isbn = self._normalize_isbn(isbn)
+        doc = self.mirror.isbn_doc(isbn)
+        if doc:
+            return self._format_mirror_doc(doc)
+        
+        try:
+            return self.cache.get_or_load('isbn', isbn, lambda: self._fetch_isbn(isbn))
+        except Exception as e:
+            self._log_upstream_error("ISBN lookup", e)
+            return self._catalog_isbn(isbn)
+    
+    def get_book_details(self, open_library_key: str) -> Optional[Dict]:
+        """Get detailed book information from Open Library key"""
+        work = self.mirror.work(open_library_key)
+        if work:
+            return self._with_author_names(self._format_details(work))
+        
+        try:
+            details = self.cache.get_or_load('details', open_library_key, lambda: self._fetch_details(open_library_key))
+        except Exception as e:
+            self._log_upstream_error("Details", e)
+            return None
+        return self._with_author_names(details) if details else None
+    
+    def get_trending_books(self, max_results: int = 40, deadline: float = TRENDING_DEADLINE_SECONDS) -> List[Dict]:
+        """
+        Get trending/popular books - recent books sorted by popularity
+        Runs the subject queries concurrently and returns whatever finished
+        within the deadline
+        """
+        queries = self._trending_queries()
+        docs_per_query: List[Optional[List[Dict]]] = [None] * len(queries)
+        
+        pool = ThreadPoolExecutor(max_workers=len(queries), thread_name_prefix="trending")
+        futures = {
+            pool.submit(self._fetch_trending, query, min(10, deadline)): index
+            for index, query in enumerate(queries)
+        }
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                try:
+                    docs_per_query[futures[future]] = future.result()
+                except Exception as e:
+                    print(f"Trending search error: {e}")
+        except FuturesTimeoutError:
+            late = sum(1 for future in futures if not future.done())
+            print(f"Trending: {late} of {len(queries)} queries missed the {deadline}s deadline")
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        return self._collect_trending([docs for docs in docs_per_query if docs is not None], max_results)
+    
+    def _fetch_trending(self, query: str, timeout: float) -> List[Dict]:
+        response = self._get(
+            'openlibrary.search', f"{self.open_library_url}/search.json",
+            max_timeout=timeout, params=self._trending_params(query)
+        )
+        response.raise_for_status()
+        return response.json().get('docs', [])
+    
+    def _trending_queries(self) -> List[str]:
+        # Search for popular books from recent years
+        # Use subject filters and sort by rating to get popular books
+        current_year = datetime.now().year
+        return [
+            f"subject:fiction first_publish_year:[{current_year-3} TO {current_year}]",
+            f"subject:thriller first_publish_year:[{current_year-3} TO {current_year}]",
+            f"subject:mystery first_publish_year:[{current_year-3} TO {current_year}]",
+            f"subject:fantasy first_publish_year:[{current_year-2} TO {current_year}]",
+            f"subject:romance first_publish_year:[{current_year-2} TO {current_year}]",
+        ]
+    
+    def _trending_params(self, query: str) -> Dict:
+        return {
             'q': query,
-            'limit': max_results,
-            'fields': 'key,title,author_name,first_publish_year,isbn,cover_i,publisher,number_of_pages_median,subject,ratings_average'
+            'limit': 15,
+            'sort': 'rating',  # Sort by rating to get popular ones
+            'fields': 'key,title,author_name,first_publish_year,isbn,cover_i,publisher,number_of_pages_median,subject,ratings_average,ratings_count'
         }
+    
+    def _collect_trending(self, docs_per_query: List[List[Dict]], max_results: int) -> List[Dict]:
+        """Dedupe by title (in query order), keep books with covers, newest first then by rating"""
+        books = []
+        seen_titles = set()
         
-        try:
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            books = []
-            for doc in data.get('docs', []):
+        for docs in docs_per_query:
+            for doc in docs:
+                if len(books) >= max_results:
+                    break
+                # Skip duplicates
+                title_key = doc.get('title', '').lower()
+                if title_key in seen_titles:
+                    continue
+                seen_titles.add(title_key)
+                
+                # Only include books with covers for better presentation
+                if not doc.get('cover_i'):
+                    continue
+                
                 book = self._format_book(doc)
                 if book:
                     books.append(book)
-            
-            return books
+        
+        # Sort by year (newest first), then by rating
+        books.sort(key=lambda x: (
+            -(x.get('published_year') or 0),
+            -(x.get('average_rating') or 0)
+        ))
+        
+        return books[:max_results]
+    
+    def _get(self, endpoint: str, url: str, max_timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        """GET guarded by the endpoint's circuit breaker, adaptive timeout and hedging"""
+        return guarded_get(self.session, endpoints.get(endpoint), url, max_timeout, **kwargs)
+    
+    def _log_upstream_error(self, operation: str, error: Exception):
+        if isinstance(error, CircuitOpenError):
+            print(f"{operation} served locally: {error}")
+        else:
+            print(f"{operation} error: {error}")
+    
+    def _catalog_search(self, query: str, max_results: int) -> List[Dict]:
+        """Fallback while Open Library is unavailable: title/author match in our own catalog"""
+        # Drop Open Library field filters such as first_publish_year:[2000 TO *]
+        text = ' '.join(re.sub(r'\w+:(\[[^\]]*\]|\S+)', ' ', query).split())
+        if not text:
+            return []
+        db = SessionLocal()
+        try:
+            term = f"%{text}%"
+            books = db.query(Book).filter(or_(Book.title.ilike(term), Book.author.ilike(term))).order_by(
+                Book.ratings_count.desc(), Book.id
+            ).limit(max_results).all()
+            return [self._format_catalog_book(book) for book in books]
         except Exception as e:
-            print(f"Search error: {e}")
+            print(f"Catalog fallback error: {e}")
             return []
+        finally:
+            db.close()
     
-    def get_book_by_isbn(self, isbn: str) -> Optional[Dict]:
-        """Look up book by ISBN"""
-        url = f"{self.open_library_url}/api/books"
-        params = {
+    def _catalog_isbn(self, isbn: str) -> Optional[Dict]:
+        return self._catalog_isbns([isbn]).get(isbn)
+    
+    def _catalog_isbns(self, isbns: List[str]) -> Dict[str, Dict]:
+        """Local books keyed by ISBN, for the ISBNs our catalog has"""
+        db = SessionLocal()
+        try:
+            found = {}
+            for start in range(0, len(isbns), 900):
+                for book in db.query(Book).filter(Book.isbn.in_(isbns[start:start + 900])).order_by(Book.id):
+                    found.setdefault(book.isbn, self._format_catalog_book(book))
+            return found
+        except Exception as e:
+            print(f"Catalog fallback error: {e}")
+            return {}
+        finally:
+            db.close()
+    
+    def _format_catalog_book(self, book: Book) -> Dict:
+        """Local Book in the same shape as Open Library results"""
+        return {
+            'id': book.id,
+            'title': book.title,
+            'author': book.author,
+            'isbn': book.isbn,
+            'published_year': book.published_year,
+            'cover_url': book.cover_url,
+            'publisher': book.publisher,
+            'page_count': book.page_count,
+            'open_library_key': None,
+            'genre': book.genre,
+            'average_rating': book.average_rating,
+            'description': book.description,
+        }
+    
+    def _search_key(self, query: str, max_results: int) -> str:
+        """Cache and coalescing key: case and whitespace don't make a new query"""
+        return f"{max_results}:{' '.join(query.split()).casefold()}"
+    
+    def _normalize_isbn(self, isbn: str) -> str:
+        return re.sub(r'[\s-]', '', isbn).upper()
+    
+    def _search_params(self, query: str, max_results: int) -> Dict:
+        return {
+            'q': query,
+            'limit': max_results,
+            'fields': 'key,title,author_name,first_publish_year,isbn,cover_i,publisher,number_of_pages_median,subject,ratings_average'
+        }
+    
+    def _fetch_search(self, query: str, max_results: int) -> List[Dict]:
+        """Uncached search; raises on HTTP errors so they are not cached"""
+        url = f"{self.open_library_url}/search.json"
+        response = self._get('openlibrary.search', url, params=self._search_params(query, max_results))
+        response.raise_for_status()
+        return self._format_search_results(response.json())
+    
+    def _format_search_results(self, data: Dict) -> List[Dict]:
+        books = []
+        for doc in data.get('docs', []):
+            book = self._format_book(doc)
+            if book:
+                books.append(book)
+        return books
+    
+    def _isbn_params(self, isbn: str) -> Dict:
+        return {
             'bibkeys': f'ISBN:{isbn}',
             'format': 'json',
             'jscmd': 'data'
         }
+    
+    def _fetch_isbn(self, isbn: str) -> Optional[Dict]:
+        """Uncached ISBN lookup with the search fallback; None means not found"""
+        url = f"{self.open_library_url}/api/books"
+        response = self._get('openlibrary.books', url, params=self._isbn_params(isbn))
+        response.raise_for_status()
         
-        try:
-            response = self.session.get(url, params=params, timeout=10)
-            data = response.json()
-            
-            book_data = data.get(f'ISBN:{isbn}')
-            if book_data:
-                return self._format_book_detailed(book_data, isbn)
-            
-            # Fallback to search if direct lookup fails
-            results = self.search_books(f"isbn:{isbn}", max_results=1)
-            return results[0] if results else None
-            
-        except Exception as e:
-            print(f"ISBN lookup error: {e}")
-            return None
+        book_data = response.json().get(f'ISBN:{isbn}')
+        if book_data:
+            return self._format_book_detailed(book_data, isbn)
+        
+        # Fallback to search if direct lookup fails
+        results = self._fetch_search(f"isbn:{isbn}", 1)
+        return results[0] if results else None
     
-    def get_book_details(self, open_library_key: str) -> Optional[Dict]:
-        """Get detailed book information from Open Library key"""
+    def _fetch_details(self, open_library_key: str) -> Optional[Dict]:
+        """Uncached work/edition lookup; None means Open Library doesn't know the key"""
         url = f"{self.open_library_url}{open_library_key}.json"
-        
-        try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            return {
-                'title': data.get('title'),
-                'description': self._extract_description(data),
-                'authors': self._extract_authors(data),
-                'publish_date': data.get('publish_date'),
-                'publishers': data.get('publishers', []),
-                'number_of_pages': data.get('number_of_pages'),
-                'subjects': data.get('subjects', [])[:10],  # Top 10 subjects
-            }
-        except Exception as e:
-            print(f"Details error: {e}")
+        response = self._get('openlibrary.details', url)
+        if response.status_code == 404:
             return None
+        response.raise_for_status()
+        return self._format_details(response.json())
+    
+    def _format_details(self, data: Dict) -> Dict:
+        return {
+            'title': data.get('title'),
+            'description': self._extract_description(data),
+            'author_keys': self._extract_authors(data),
+            'publish_date': data.get('publish_date'),
+            'publishers': data.get('publishers', []),
+            'number_of_pages': data.get('number_of_pages'),
+            'subjects': data.get('subjects', [])[:10],  # Top 10 subjects
+        }
+    
+    def _with_author_names(self, details: Dict) -> Dict:
+        """Copy of cached details with author keys resolved to names"""
+        # Entries cached before author_keys existed kept the bare ids in 'authors'
+        keys = details.get('author_keys') or details.get('authors') or []
+        return {**details, 'author_keys': keys, 'authors': self.authors.resolve(keys)}
     
     def _format_book(self, doc: Dict) -> Optional[Dict]:
         """Format Open Library doc into our book schema"""
@@ -109,37 +335,10 @@ class BookSearchService:
             cover_url = None
             if cover_id:
                 # Use Medium size (default), can also use S, M, L
-                cover_url = f"https://covers.openlibrary.org/b/id/{cover_id}-M.jpg"
+                cover_url = cover_proxy_url(cover_id=cover_id) or f"https://covers.openlibrary.org/b/id/{cover_id}-M.jpg"
             
             # Extract genre from subjects
-            subjects = doc.get('subject', [])
-            genre = None
-            if subjects:
-                # Map common subjects to genres
-                genre_map = {
-                    'fiction': 'Fiction',
-                    'mystery': 'Mystery',
-                    'thriller': 'Thriller', 
-                    'romance': 'Romance',
-                    'science fiction': 'Science Fiction',
-                    'fantasy': 'Fantasy',
-                    'horror': 'Horror',
-                    'biography': 'Biography',
-                    'history': 'History',
-                    'self-help': 'Self-Help',
-                    'young adult': 'Young Adult',
-                    'children': 'Children',
-                    'nonfiction': 'Non-Fiction',
-                    'non-fiction': 'Non-Fiction',
-                }
-                for subject in subjects[:10]:
-                    subject_lower = subject.lower()
-                    for key, value in genre_map.items():
-                        if key in subject_lower:
-                            genre = value
-                            break
-                    if genre:
-                        break
+            genre = self._genre_from_subjects(doc.get('subject', []))
             
             return {
                 'title': doc.get('title', 'Unknown Title'),
@@ -157,18 +356,139 @@ class BookSearchService:
             print(f"Format error: {e}")
             return None
     
+    def _format_mirror_doc(self, doc: Dict) -> Optional[Dict]:
+        """Mirror ISBN docs also carry the work description"""
+        book = self._format_book(doc)
+        if book:
+            book['description'] = doc.get('description')
+        return book
+    
     def _format_book_detailed(self, data: Dict, isbn: str) -> Dict:
-        """Format detailed book data from ISBN lookup"""
+        """Format detailed book data from ISBN lookup (bibkeys jscmd=data)"""
+        publishers = [p['name'] if isinstance(p, dict) else p for p in data.get('publishers', [])]
+        subjects = [s['name'] if isinstance(s, dict) else s for s in data.get('subjects', [])]
+        year = re.search(r'\d{4}', data.get('publish_date') or '')
+        
+        description = self._extract_description(data)
+        if not description and data.get('excerpts'):
+            description = data['excerpts'][0].get('text')
+        
         return {
             'title': data.get('title', 'Unknown Title'),
             'author': ', '.join([a['name'] for a in data.get('authors', [])]),
             'isbn': isbn,
-            'published_year': data.get('publish_date', '')[:4] if data.get('publish_date') else None,
-            'cover_url': data.get('cover', {}).get('medium'),
-            'publisher': ', '.join(data.get('publishers', [])[:1]),
+            'published_year': int(year.group()) if year else None,
+            'cover_url': (cover_proxy_url(isbn=isbn) or data['cover'].get('medium')) if data.get('cover') else None,
+            'publisher': ', '.join(publishers[:1]),
             'page_count': data.get('number_of_pages'),
+            'open_library_key': data.get('key'),
+            'genre': self._genre_from_subjects(subjects),
+            'description': description,
         }
     
+    def get_books_by_isbns(
+        self, isbns: List[str], throttle: Optional[Callable[[], None]] = None
+    ) -> Dict[str, Optional[Dict]]:
+        """
+        Look up many ISBNs at once
+        Answers from the mirror and the shared ISBN cache first; the rest go to
+        Open Library as multi-key bibkeys requests, and only ISBNs those don't
+        know fall back to a search. throttle, if given, is called before every
+        upstream request (e.g. a rate limiter's wait). Returns {isbn: book or
+        None} in request order.
+        """
+        wanted = list(dict.fromkeys(self._normalize_isbn(isbn) for isbn in isbns if isbn and isbn.strip()))
+        books = {isbn: self._format_mirror_doc(doc) for isbn, doc in self.mirror.isbn_docs(wanted).items()}
+        rest = [isbn for isbn in wanted if isbn not in books]
+        if rest:
+            try:
+                books.update(self.cache.get_many_or_load('isbn', rest, lambda keys: self._fetch_isbns(keys, throttle)))
+            except Exception as e:
+                self._log_upstream_error("ISBN batch lookup", e)
+            unanswered = [isbn for isbn in rest if isbn not in books]
+            if unanswered:
+                books.update(self._catalog_isbns(unanswered))
+        return {isbn: books.get(isbn) for isbn in wanted}
+    
+    def _fetch_isbns(self, isbns: List[str], throttle: Optional[Callable[[], None]] = None) -> Dict[str, Optional[Dict]]:
+        """
+        Uncached batch lookup for the cache loader: bibkeys in chunks, then a
+        search per ISBN bibkeys didn't know. ISBNs whose requests failed are
+        left out so the failure isn't cached.
+        """
+        chunks = [isbns[i:i + ISBN_LOOKUP_BATCH_SIZE] for i in range(0, len(isbns), ISBN_LOOKUP_BATCH_SIZE)]
+        books: Dict[str, Optional[Dict]] = {}
+        unknown = []
+        
+        def throttled(fetch, *args):
+            if throttle:
+                throttle()
+            return fetch(*args)
+        
+        with ThreadPoolExecutor(max_workers=min(ISBN_LOOKUP_WORKERS, len(chunks)), thread_name_prefix="isbn-lookup") as pool:
+            futures = {pool.submit(throttled, self._fetch_bibkeys, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                try:
+                    found = future.result()
+                except Exception as e:
+                    self._log_upstream_error(f"ISBN batch of {len(futures[future])}", e)
+                    continue
+                books.update(found)
+                unknown.extend(isbn for isbn in futures[future] if isbn not in found)
+            
+            # Fallback to search, only for the ISBNs bibkeys doesn't know
+            searches = {pool.submit(throttled, self._fetch_search, f"isbn:{isbn}", 1): isbn for isbn in unknown}
+            for future in as_completed(searches):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    self._log_upstream_error("ISBN search fallback", e)
+                    continue
+                books[searches[future]] = results[0] if results else None
+        
+        return books
+    
+    def lookup_isbns(self, isbns: List[str]) -> Dict[str, Dict]:
+        """
+        Look up several ISBNs with a single bibkeys request
+        Returns formatted books keyed by ISBN (ISBNs Open Library doesn't know are omitted).
+        Raises on HTTP errors so callers can decide whether to retry.
+        """
+        if not isbns:
+            return {}
+        
+        books = {isbn: self._format_mirror_doc(doc) for isbn, doc in self.mirror.isbn_docs(isbns).items()}
+        isbns = [isbn for isbn in isbns if isbn not in books]
+        if isbns:
+            books.update(self._fetch_bibkeys(isbns))
+        return books
+    
+    def _fetch_bibkeys(self, isbns: List[str]) -> Dict[str, Dict]:
+        """One multi-key bibkeys request; ISBNs Open Library doesn't know are omitted"""
+        url = f"{self.open_library_url}/api/books"
+        params = {
+            'bibkeys': ','.join(f'ISBN:{isbn}' for isbn in isbns),
+            'format': 'json',
+            'jscmd': 'data'
+        }
+        
+        # Batches are rate limited by the caller: no hedging, and a longer budget
+        bibkeys = endpoints.get('openlibrary.bibkeys', max_timeout=30, hedge=False)
+        response = guarded_get(self.session, bibkeys, url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        
+        books = {}
+        for isbn in isbns:
+            book_data = data.get(f'ISBN:{isbn}')
+            if book_data:
+                books[isbn] = self._format_book_detailed(book_data, isbn)
+        return books
+    
+    def _genre_from_subjects(self, subjects: List[str]) -> Optional[str]:
+        """Most specific known genre in the leading subjects (see genre_classifier.py)"""
+        return genre_classifier.classify(subjects)
+    
     def _extract_description(self, data: Dict) -> Optional[str]:
         """Extract description from various possible fields"""
         description = data.get('description')
@@ -186,22 +506,20 @@ class BookSearchService:
         return None
     
     def _extract_authors(self, data: Dict) -> List[str]:
-        """Extract author names from author references"""
+        """Extract author keys from author references (names come from the author directory)"""
         authors = []
         for author_ref in data.get('authors', []):
             if isinstance(author_ref, dict):
                 author_key = author_ref.get('author', {}).get('key')
                 if author_key:
-                    # Could fetch author name from API, but skip for performance
-                    # Just use the key as identifier for now
-                    authors.append(author_key.split('/')[-1])
+                    authors.append(author_key)
         return authors
     
-    @lru_cache(maxsize=1000)
     def get_cached_cover(self, isbn: str) -> Optional[str]:
         """
         Get cover URL with caching
-        Good for repeated lookups in recommendations, etc.
+        Good for repeated lookups in recommendations, etc. Served from the
+        shared TTL'd ISBN cache, so it expires and is shared across instances.
         """
         book = self.get_book_by_isbn(isbn)
         return book.get('cover_url') if book else None
@@ -212,110 +530,54 @@ class BookSearchService:
 class NYTBooksAPI:
     """New York Times Books API - Free bestseller data"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache: Optional[BookCache] = None):
         self.api_key = api_key  # Free key from https://developer.nytimes.com/
         self.base_url = "https://api.nytimes.com/svc/books/v3"
+        self.session = requests.Session()
+        self.cache = cache or book_cache
     
     def get_bestsellers(self, list_name: str = "combined-print-and-e-book-fiction"):
         """Get current bestsellers - adds credibility to books"""
+        try:
+            # Lists change weekly; a stale copy is served while the API is down
+            return self.cache.get_or_load('nyt', list_name, lambda: self._fetch_bestsellers(list_name), ttl=6 * 3600)
+        except Exception as e:
+            print(f"NYT bestsellers error: {e}")
+            return []
+    
+    def _fetch_bestsellers(self, list_name: str) -> List[Dict]:
         url = f"{self.base_url}/lists/current/{list_name}.json"
-        params = {'api-key': self.api_key}
-        
-        response = requests.get(url, params=params)
-        data = response.json()
-        
-        return data.get('results', {}).get('books', [])
+        response = guarded_get(self.session, endpoints.get('nyt.bestsellers'), url, params={'api-key': self.api_key})
+        response.raise_for_status()
+        return response.json().get('results', {}).get('books', [])
 
 
 class ISBNdbAPI:
     """ISBNdb - Free tier: 1,000 requests/day"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache: Optional[BookCache] = None):
         self.api_key = api_key  # Free from https://isbndb.com/
         self.base_url = "https://api2.isbndb.com"
+        self.session = requests.Session()
+        self.session.headers.update({'Authorization': self.api_key})
+        self.cache = cache or book_cache
     
     def get_book(self, isbn: str) -> Optional[Dict]:
         """Supplement Open Library with better data quality"""
-        url = f"{self.base_url}/book/{isbn}"
-        headers = {'Authorization': self.api_key}
-        
         try:
-            response = requests.get(url, headers=headers, timeout=5)
-            if response.status_code == 200:
-                return response.json().get('book')
-        except:
-            pass
-        
-        return None
-    def get_trending_books(self, max_results: int = 40) -> List[Dict]:
-        """
-        Get trending/popular books - recent books sorted by popularity
-        Uses Open Library's trending endpoint and search for recent popular fiction
-        """
-        books = []
-        
-        # Get current year for filtering
-        from datetime import datetime
-        current_year = datetime.now().year
-        
-        # Search for popular books from recent years (last 5 years)
-        # Use subject:fiction and sort by rating to get popular books
-        queries = [
-            f"subject:fiction first_publish_year:[{current_year-3} TO {current_year}]",
-            f"subject:thriller first_publish_year:[{current_year-3} TO {current_year}]",
-            f"subject:mystery first_publish_year:[{current_year-3} TO {current_year}]",
-            f"subject:fantasy first_publish_year:[{current_year-2} TO {current_year}]",
-            f"subject:romance first_publish_year:[{current_year-2} TO {current_year}]",
-        ]
-        
-        seen_titles = set()
-        
-        for query in queries:
-            if len(books) >= max_results:
-                break
-                
-            try:
-                url = f"{self.open_library_url}/search.json"
-                params = {
-                    'q': query,
-                    'limit': 15,
-                    'sort': 'rating',  # Sort by rating to get popular ones
-                    'fields': 'key,title,author_name,first_publish_year,isbn,cover_i,publisher,number_of_pages_median,subject,ratings_average,ratings_count'
-                }
-                
-                response = self.session.get(url, params=params, timeout=10)
-                response.raise_for_status()
-                data = response.json()
-                
-                for doc in data.get('docs', []):
-                    # Skip duplicates
-                    title_key = doc.get('title', '').lower()
-                    if title_key in seen_titles:
-                        continue
-                    seen_titles.add(title_key)
-                    
-                    # Only include books with covers for better presentation
-                    if not doc.get('cover_i'):
-                        continue
-                    
-                    book = self._format_book(doc)
-                    if book:
-                        books.append(book)
-                        
-                    if len(books) >= max_results:
-                        break
-                        
-            except Exception as e:
-                print(f"Trending search error: {e}")
-                continue
-        
-        # Sort by year (newest first), then by rating
-        books.sort(key=lambda x: (
-            -(x.get('published_year') or 0),
-            -(x.get('average_rating') or 0)
-        ))
-        
-        return books[:max_results]
+            # Cached: the free tier only allows 1,000 requests a day
+            return self.cache.get_or_load('isbndb', isbn, lambda: self._fetch_book(isbn))
+        except Exception as e:
+            print(f"ISBNdb error: {e}")
+            return None
+    
+    def _fetch_book(self, isbn: str) -> Optional[Dict]:
+        url = f"{self.base_url}/book/{isbn}"
+        response = guarded_get(self.session, endpoints.get('isbndb.book', max_timeout=5), url)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json().get('book')
 
 
 # Usage example for your FastAPI app
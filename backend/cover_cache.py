@@ -0,0 +1,310 @@
+"""
+Cover Image Cache
+Backs the /covers/{isbn_or_id} proxy: each cover is fetched from Open
+Library once, stored on disk in thumb/medium/large variants and served with
+long-lived cache headers. With Pillow installed the variants are resized
+locally from one large download; without it the matching Open Library
+size (S/M/L) is fetched per variant. Concurrent misses for one cover share
+a single download, and the directory is kept under a size cap by evicting
+the least recently served files (never one handed out in the last few
+seconds, which a response may still be streaming).
+
+Identifiers are ISBNs (checksum-validated), numeric cover ids or edition
+OLIDs; an "isbn:" or "id:" prefix removes any ambiguity.
+"""
+
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import requests
+
+from resilience import endpoints, guarded_get
+from single_flight import SingleFlight
+
+try:
+    from PIL import Image  # optional: pip install Pillow
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# Directory holding cached cover files
+COVER_CACHE_DIR = os.getenv("COVER_CACHE_DIR", "./cover_cache")
+# Size cap for the directory; least recently served covers are evicted first
+COVER_CACHE_MAX_MB = int(os.getenv("COVER_CACHE_MAX_MB", "500"))
+# Cache-Control max-age sent with cover responses
+COVER_MAX_AGE_SECONDS = int(os.getenv("COVER_MAX_AGE_SECONDS", "2592000"))
+# How long a cover Open Library doesn't have is remembered as missing
+COVER_MISSING_TTL = int(os.getenv("COVER_MISSING_TTL", "86400"))
+# Files served this recently are never evicted (their response may still be streaming)
+COVER_EVICTION_GRACE_SECONDS = float(os.getenv("COVER_EVICTION_GRACE_SECONDS", "30"))
+# Covers host (overridable for local stubs)
+OPEN_LIBRARY_COVERS_URL = os.getenv("OPEN_LIBRARY_COVERS_URL", "https://covers.openlibrary.org")
+# Public base URL of this API; when set, search results point cover_url at the proxy
+COVER_PROXY_BASE_URL = os.getenv("COVER_PROXY_BASE_URL", "").rstrip('/')
+
+# Variant -> (Open Library size letter, longest edge in px when resizing locally)
+COVER_SIZES = {
+    'thumb': ('S', 96),
+    'medium': ('M', 240),
+    'large': ('L', None),
+}
+
+_ISBN = re.compile(r'^(\d{9}[\dX]|\d{13})$')
+_OLID = re.compile(r'^OL\d+M$')
+
+
+def is_valid_isbn(value: str) -> bool:
+    """ISBN-10 (mod 11, X = 10 in the last place) or ISBN-13 (mod 10) checksum"""
+    if not _ISBN.match(value):
+        return False
+    if len(value) == 10:
+        digits = [10 if c == 'X' else int(c) for c in value]
+        return sum((10 - i) * d for i, d in enumerate(digits)) % 11 == 0
+    return sum((3 if i % 2 else 1) * int(c) for i, c in enumerate(value)) % 10 == 0
+
+
+def parse_identifier(identifier: str) -> Tuple[str, str]:
+    """('isbn' | 'olid' | 'id', value); raises ValueError for anything else"""
+    value = identifier.replace('-', '').strip().upper()
+    prefix, _, rest = value.partition(':')
+    if rest:
+        if prefix == 'ISBN' and is_valid_isbn(rest):
+            return 'isbn', rest
+        if prefix == 'ID' and rest.isdigit():
+            return 'id', rest
+        if prefix == 'OLID' and _OLID.match(rest):
+            return 'olid', rest
+        raise ValueError(f"Not a valid {prefix.lower()}: {identifier}")
+    # Unprefixed digits are an ISBN only when the checksum agrees
+    if is_valid_isbn(value):
+        return 'isbn', value
+    if _OLID.match(value):
+        return 'olid', value
+    if value.isdigit():
+        return 'id', value
+    raise ValueError(f"Not an ISBN, cover id or OLID: {identifier}")
+
+
+def cover_proxy_url(cover_id: Optional[int] = None, isbn: Optional[str] = None, size: str = 'medium') -> Optional[str]:
+    """Proxy URL for a cover when COVER_PROXY_BASE_URL is configured, else None"""
+    if not COVER_PROXY_BASE_URL or not (cover_id or isbn):
+        return None
+    identifier = f"id:{cover_id}" if cover_id else f"isbn:{isbn}"
+    return f"{COVER_PROXY_BASE_URL}/covers/{identifier}?size={size}"
+
+
+class CoverCache:
+    """On-disk cover variants with an in-memory LRU index"""
+
+    def __init__(self, directory: str = COVER_CACHE_DIR, max_bytes: int = COVER_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': 'Bookshelf/1.0 (Commercial Book Tracker)'})
+        # relative path -> size in bytes, least recently served first
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._total = 0
+        self._missing: Dict[str, float] = {}
+        # relative path -> monotonic time it was last handed to a response
+        self._served: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.stats = {"hits": 0, "misses": 0, "downloads": 0, "not_found": 0, "evicted": 0}
+
+    def upstream_url(self, kind: str, value: str, size: str) -> str:
+        return f"{OPEN_LIBRARY_COVERS_URL}/b/{kind}/{value}-{COVER_SIZES[size][0]}.jpg"
+
+    def _relpath(self, name: str, size: str) -> str:
+        shard = hashlib.sha1(name.encode()).hexdigest()[:2]
+        return os.path.join(shard, f"{name}-{size}.jpg")
+
+    def _etag(self, relpath: str, nbytes: int) -> str:
+        # Variants never change once written, so name + length identifies the bytes
+        return '"' + hashlib.sha1(f"{relpath}:{nbytes}".encode()).hexdigest()[:16] + '"'
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.stats[name] += n
+
+    # ---------- LRU index ----------
+
+    def _load_index(self):
+        """Scan the directory once, oldest mtime first (mtime is bumped on every hit)"""
+        if self._index is not None:
+            return
+        files = []
+        if os.path.isdir(self.directory):
+            for shard in os.scandir(self.directory):
+                if shard.is_dir():
+                    for entry in os.scandir(shard.path):
+                        if entry.name.endswith('.jpg'):
+                            stat = entry.stat()
+                            files.append((stat.st_mtime, os.path.join(shard.name, entry.name), stat.st_size))
+        files.sort()
+        self._index = OrderedDict((relpath, nbytes) for _, relpath, nbytes in files)
+        self._total = sum(self._index.values())
+
+    def _lookup(self, relpath: str) -> Optional[int]:
+        with self._lock:
+            self._load_index()
+            nbytes = self._index.get(relpath)
+            if nbytes is not None:
+                self._index.move_to_end(relpath)
+        if nbytes is not None:
+            try:
+                os.utime(os.path.join(self.directory, relpath))
+            except OSError:
+                # Evicted or removed behind our back
+                with self._lock:
+                    self._total -= self._index.pop(relpath, 0)
+                return None
+        return nbytes
+
+    def _store(self, relpath: str, data: bytes):
+        path = os.path.join(self.directory, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+        evict = []
+        with self._lock:
+            self._load_index()
+            self._total += len(data) - self._index.pop(relpath, 0)
+            self._index[relpath] = len(data)
+            excess = self._total - self.max_bytes
+            if excess > 0:
+                recent_since = time.monotonic() - COVER_EVICTION_GRACE_SECONDS
+                for old, nbytes in self._index.items():
+                    if excess <= 0:
+                        break
+                    if old == relpath or self._served.get(old, 0) > recent_since:
+                        continue
+                    evict.append(old)
+                    excess -= nbytes
+                for old in evict:
+                    self._total -= self._index.pop(old)
+                    self._served.pop(old, None)
+        for old in evict:
+            try:
+                os.remove(os.path.join(self.directory, old))
+            except OSError:
+                pass
+        if evict:
+            self._count("evicted", len(evict))
+
+    # ---------- lookups ----------
+
+    def get(self, identifier: str, size: str) -> Optional[Tuple[str, str]]:
+        """
+        (file path, ETag) for a cover variant, downloading it on a miss.
+        None when Open Library has no cover; raises ValueError for a bad
+        identifier and lets upstream errors propagate.
+        """
+        kind, value = parse_identifier(identifier)
+        name = f"{kind}-{value}"
+        relpath = self._relpath(name, size)
+
+        nbytes = self._lookup(relpath)
+        if nbytes is not None:
+            self._count("hits")
+            return self._serve(relpath, nbytes)
+
+        missing_until = self._missing.get(name)
+        if missing_until and missing_until > time.time():
+            self._count("hits")
+            return None
+
+        self._count("misses")
+        # With Pillow one download fills every variant, so coalesce on the cover
+        key = name if PIL_AVAILABLE else (name, size)
+        if not self._flights.do(key, lambda: self._fill(kind, value, name, size)):
+            return None
+        nbytes = self._lookup(relpath)
+        if nbytes is None:
+            return None
+        return self._serve(relpath, nbytes)
+
+    def _serve(self, relpath: str, nbytes: int) -> Tuple[str, str]:
+        """Path and ETag for a response, protecting the file from eviction for a while"""
+        now = time.monotonic()
+        with self._lock:
+            if len(self._served) > 10000:
+                recent_since = now - COVER_EVICTION_GRACE_SECONDS
+                self._served = {path: at for path, at in self._served.items() if at > recent_since}
+            self._served[relpath] = now
+        return os.path.join(self.directory, relpath), self._etag(relpath, nbytes)
+
+    def _download(self, kind: str, value: str, size: str) -> Optional[bytes]:
+        # default=false makes Open Library answer 404 instead of a blank image
+        url = self.upstream_url(kind, value, size)
+        response = guarded_get(self.session, endpoints.get('openlibrary.covers'), url, params={'default': 'false'})
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        self._count("downloads")
+        return response.content
+
+    def _fill(self, kind: str, value: str, name: str, size: str) -> bool:
+        if self._lookup(self._relpath(name, size)) is not None:
+            # Filled by a flight that finished just before ours started
+            return True
+
+        if PIL_AVAILABLE:
+            original = self._download(kind, value, 'large')
+            if original is None:
+                return self._mark_missing(name)
+            for variant, data in self._resize(original).items():
+                self._store(self._relpath(name, variant), data)
+            return True
+
+        data = self._download(kind, value, size)
+        if data is None:
+            return self._mark_missing(name)
+        self._store(self._relpath(name, size), data)
+        return True
+
+    def _mark_missing(self, name: str) -> bool:
+        self._count("not_found")
+        now = time.time()
+        with self._lock:
+            if len(self._missing) > 10000:
+                self._missing = {k: until for k, until in self._missing.items() if until > now}
+            self._missing[name] = now + COVER_MISSING_TTL
+        return False
+
+    def _resize(self, original: bytes) -> Dict[str, bytes]:
+        variants = {'large': original}
+        image = Image.open(io.BytesIO(original))
+        image = image.convert('RGB')
+        for variant, (_, edge) in COVER_SIZES.items():
+            if edge is None:
+                continue
+            resized = image.copy()
+            resized.thumbnail((edge, edge * 2))
+            buffer = io.BytesIO()
+            resized.save(buffer, format='JPEG', quality=85, optimize=True)
+            variants[variant] = buffer.getvalue()
+        return variants
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            self._load_index()
+            return {
+                **self.stats,
+                "files": len(self._index),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "resizing": PIL_AVAILABLE,
+            }
+
+
+# Singleton instance
+cover_cache = CoverCache()
@@ -1,8 +1,10 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, Float, DateTime, ForeignKey, Table, Boolean
+from sqlalchemy import create_engine, Column, Integer, String, Text, Float, Date, DateTime, ForeignKey, Table, Boolean, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 from datetime import datetime
 
+from book_matching import book_match_key
+
 Base = declarative_base()
 
 # Association table for user's books with reading status
@@ -17,7 +19,29 @@ user_books = Table('user_books', Base.metadata,
     Column('started_at', DateTime, nullable=True),
     Column('finished_at', DateTime, nullable=True),
     Column('is_owned', Boolean, default=False),
-    Column('added_at', DateTime, default=datetime.utcnow)
+    Column('added_at', DateTime, default=datetime.utcnow),
+    Column('revision', Integer, nullable=True),  # User's library_revision when this row last changed
+    Index('ix_user_books_user_added', 'user_id', 'added_at'),
+    Index('ix_user_books_user_revision', 'user_id', 'revision')
+)
+
+# Removed library entries, kept so clients can sync deletions
+user_book_tombstones = Table('user_book_tombstones', Base.metadata,
+    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
+    Column('book_id', Integer, primary_key=True),  # No FK: merged-away books leave tombstones too
+    Column('revision', Integer, nullable=False),
+    Column('deleted_at', DateTime, default=datetime.utcnow),
+    Index('ix_user_book_tombstones_user_revision', 'user_id', 'revision')
+)
+
+# Imported source rows (e.g. Goodreads "Book Id") per user, so re-imports skip them
+import_row_keys = Table('import_row_keys', Base.metadata,
+    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
+    Column('source', String(30), primary_key=True),
+    Column('external_id', String(64), primary_key=True),
+    Column('book_id', Integer, ForeignKey('books.id'), nullable=False),
+    Column('job_id', Integer, nullable=True),
+    Column('created_at', DateTime, default=datetime.utcnow)
 )
 
 # Following relationship
@@ -52,6 +76,7 @@ class User(Base):
     is_verified = Column(Boolean, default=False)  # Email verification status
     verification_token = Column(String(100), nullable=True)  # Email verification token
     verification_token_expires = Column(DateTime, nullable=True)  # Token expiration
+    library_revision = Column(Integer, default=0)  # Bumped on every change to the user's library
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -63,6 +88,10 @@ class User(Base):
         backref='followers'
     )
 
+def _default_match_key(context):
+    params = context.get_current_parameters()
+    return book_match_key(params.get('title'), params.get('author')) or ''
+
 class Book(Base):
     __tablename__ = 'books'
     
@@ -79,6 +108,8 @@ class Book(Base):
     average_rating = Column(Float, default=0.0)
     ratings_count = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Normalized title|surname for dedupe; filled in on insert (see book_matching)
+    match_key = Column(String(300), index=True, default=_default_match_key)
 
 class Collection(Base):
     __tablename__ = 'collections'
@@ -205,6 +236,118 @@ class CircleActivity(Base):
     user = relationship('User')
     book = relationship('Book')
 
+# ==================== IMPORT JOBS ====================
+
+class ImportJob(Base):
+    """Queued library import; doubles as its own progress record and checkpoint"""
+    __tablename__ = 'import_jobs'
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    source = Column(String(30), default='goodreads')
+    status = Column(String(20), default='queued', index=True)  # 'queued', 'running', 'completed', 'failed'
+    file_path = Column(String(255), nullable=True)  # Uploaded file, removed once the job finishes
+    content_hash = Column(String(64), nullable=True, index=True)  # sha256 of the upload; same file = same job
+    total_rows = Column(Integer, nullable=True)
+    processed_rows = Column(Integer, default=0)  # Rows covered by committed chunks
+    imported = Column(Integer, default=0)
+    skipped = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    errors = Column(Text, nullable=True)  # JSON list, capped
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+
+# ==================== POINTS ====================
+
+class PointsLedgerEntry(Base):
+    """Append-only record of every points award (negative for reversals)"""
+    __tablename__ = 'points_ledger'
+    __table_args__ = (Index('ix_points_ledger_user_created', 'user_id', 'created_at'),)
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    circle_id = Column(Integer, ForeignKey('reading_circles.id', ondelete='CASCADE'), nullable=True)  # Set for circle points
+    points = Column(Integer, nullable=False)
+    reason = Column(String(50), nullable=False)  # 'book_added', 'book_rated', 'review_liked', 'challenge_progress', ...
+    book_id = Column(Integer, ForeignKey('books.id'), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# ==================== PLATFORM ANALYTICS ====================
+
+class BookFinishSnapshot(Base):
+    """Number of users who finished a book on a given day"""
+    __tablename__ = 'analytics_book_finishes'
+    __table_args__ = (UniqueConstraint('day', 'book_id', name='uq_analytics_book_finishes_day_book'),)
+    
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False, index=True)
+    book_id = Column(Integer, ForeignKey('books.id'), nullable=False, index=True)
+    finishes = Column(Integer, default=0)
+
+
+class GenreShareSnapshot(Base):
+    """Finished books per genre for a calendar month"""
+    __tablename__ = 'analytics_genre_share'
+    __table_args__ = (UniqueConstraint('month', 'genre', name='uq_analytics_genre_share_month_genre'),)
+    
+    id = Column(Integer, primary_key=True)
+    month = Column(String(7), nullable=False, index=True)  # 'YYYY-MM'
+    genre = Column(String(100), nullable=False)
+    finishes = Column(Integer, default=0)
+    share = Column(Float, default=0.0)  # Fraction of the month's finishes with a known genre
+
+
+class PlatformSnapshot(Base):
+    """Site-wide reading aggregates computed by the analytics job"""
+    __tablename__ = 'analytics_platform'
+    
+    id = Column(Integer, primary_key=True)
+    snapshot_date = Column(Date, nullable=False, unique=True, index=True)
+    active_readers_7d = Column(Integer, default=0)
+    active_readers_30d = Column(Integer, default=0)
+    finishes_7d = Column(Integer, default=0)
+    finishes_30d = Column(Integer, default=0)
+    avg_days_per_book = Column(Float, nullable=True)
+    avg_pages_per_day = Column(Float, nullable=True)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+# ==================== BACKGROUND REPORTS ====================
+
+class YearInReviewReport(Base):
+    """Precomputed annual reading summary, stored as compact JSON"""
+    __tablename__ = 'year_in_review_reports'
+    __table_args__ = (UniqueConstraint('user_id', 'year', name='uq_year_in_review_user_year'),)
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    year = Column(Integer, nullable=False)
+    data = Column(Text, nullable=False)
+    generated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ReportJob(Base):
+    """Progress checkpoint for a report generation run"""
+    __tablename__ = 'report_jobs'
+    __table_args__ = (UniqueConstraint('report_type', 'year', name='uq_report_jobs_type_year'),)
+    
+    id = Column(Integer, primary_key=True)
+    report_type = Column(String(50), nullable=False)  # 'year_in_review'
+    year = Column(Integer, nullable=False)
+    status = Column(String(20), default='pending')  # 'pending', 'running', 'completed', 'failed'
+    last_user_id = Column(Integer, default=0)  # Every user with id <= this has been processed
+    processed_users = Column(Integer, default=0)
+    failed_users = Column(Integer, default=0)
+    failed_user_ids = Column(Text, nullable=True)  # JSON list, retried with retry_failed
+    total_users = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
 # Database setup - supports both SQLite (local) and PostgreSQL (production)
 import os
 
@@ -272,3 +415,143 @@ def migrate_database():
                     print("Added verification_token_expires column")
                 except Exception as e:
                     print(f"Could not add verification_token_expires column: {e}")
+            
+            if 'library_revision' not in existing_columns:
+                try:
+                    conn.execute(text('ALTER TABLE users ADD COLUMN library_revision INTEGER DEFAULT 0'))
+                    conn.commit()
+                    print("Added library_revision column")
+                except Exception as e:
+                    print(f"Could not add library_revision column: {e}")
+    
+    # Existing balances predate the points ledger; record them as opening entries once
+    if 'points_ledger' in inspector.get_table_names():
+        with engine.connect() as conn:
+            try:
+                ledger_empty = conn.execute(text('SELECT COUNT(*) FROM points_ledger')).scalar() == 0
+                if ledger_empty:
+                    result = conn.execute(text(
+                        "INSERT INTO points_ledger (user_id, points, reason, created_at) "
+                        "SELECT id, points, 'opening_balance', CURRENT_TIMESTAMP FROM users WHERE points > 0"
+                    ))
+                    conn.execute(text(
+                        "INSERT INTO points_ledger (user_id, circle_id, points, reason, created_at) "
+                        "SELECT user_id, circle_id, circle_points, 'opening_balance', CURRENT_TIMESTAMP "
+                        "FROM circle_members WHERE circle_points > 0"
+                    ))
+                    conn.commit()
+                    if result.rowcount:
+                        print("Recorded opening balances in points_ledger")
+            except Exception as e:
+                print(f"Could not record opening point balances: {e}")
+    
+    # Columns and indexes added to user_books after it was first created
+    if 'user_books' in inspector.get_table_names():
+        existing_columns = [col['name'] for col in inspector.get_columns('user_books')]
+        existing_indexes = [idx['name'] for idx in inspector.get_indexes('user_books')]
+        
+        with engine.connect() as conn:
+            if 'revision' not in existing_columns:
+                try:
+                    conn.execute(text('ALTER TABLE user_books ADD COLUMN revision INTEGER'))
+                    conn.commit()
+                    print("Added user_books.revision column")
+                except Exception as e:
+                    print(f"Could not add user_books.revision column: {e}")
+            
+            if 'ix_user_books_user_revision' not in existing_indexes:
+                try:
+                    conn.execute(text('CREATE INDEX ix_user_books_user_revision ON user_books (user_id, revision)'))
+                    conn.commit()
+                    print("Added ix_user_books_user_revision index")
+                except Exception as e:
+                    print(f"Could not add ix_user_books_user_revision index: {e}")
+            
+            if 'ix_user_books_user_added' not in existing_indexes:
+                try:
+                    conn.execute(text('CREATE INDEX ix_user_books_user_added ON user_books (user_id, added_at)'))
+                    conn.commit()
+                    print("Added ix_user_books_user_added index")
+                except Exception as e:
+                    print(f"Could not add ix_user_books_user_added index: {e}")
+    
+    # Match keys for dedupe, backfilled for books created before the column existed
+    if 'books' in inspector.get_table_names():
+        existing_columns = [col['name'] for col in inspector.get_columns('books')]
+        existing_indexes = [idx['name'] for idx in inspector.get_indexes('books')]
+        
+        with engine.connect() as conn:
+            if 'match_key' not in existing_columns:
+                try:
+                    conn.execute(text('ALTER TABLE books ADD COLUMN match_key VARCHAR(300)'))
+                    conn.commit()
+                    print("Added books.match_key column")
+                except Exception as e:
+                    print(f"Could not add books.match_key column: {e}")
+            
+            if 'ix_books_match_key' not in existing_indexes:
+                try:
+                    conn.execute(text('CREATE INDEX ix_books_match_key ON books (match_key)'))
+                    conn.commit()
+                    print("Added ix_books_match_key index")
+                except Exception as e:
+                    print(f"Could not add ix_books_match_key index: {e}")
+            
+            try:
+                backfilled = 0
+                while True:
+                    # Every pass sets the key (or '') so rows never come back
+                    rows = conn.execute(text(
+                        'SELECT id, title, author FROM books WHERE match_key IS NULL ORDER BY id LIMIT 1000'
+                    )).fetchall()
+                    if not rows:
+                        break
+                    conn.execute(text('UPDATE books SET match_key = :match_key WHERE id = :id'), [
+                        {'id': row.id, 'match_key': book_match_key(row.title, row.author) or ''}
+                        for row in rows
+                    ])
+                    conn.commit()
+                    backfilled += len(rows)
+                if backfilled:
+                    print(f"Backfilled match_key for {backfilled} books")
+            except Exception as e:
+                print(f"Could not backfill books.match_key: {e}")
+    
+    # Tombstones outlive the books they point at (duplicate merges delete books)
+    if 'user_book_tombstones' in inspector.get_table_names():
+        for fk in inspector.get_foreign_keys('user_book_tombstones'):
+            if fk['referred_table'] == 'books' and fk.get('name'):
+                with engine.connect() as conn:
+                    try:
+                        conn.execute(text(f'ALTER TABLE user_book_tombstones DROP CONSTRAINT {fk["name"]}'))
+                        conn.commit()
+                        print("Dropped user_book_tombstones.book_id foreign key")
+                    except Exception as e:
+                        print(f"Could not drop user_book_tombstones.book_id foreign key: {e}")
+    
+    # Failed users are remembered so a later run can retry just them
+    if 'report_jobs' in inspector.get_table_names():
+        existing_columns = [col['name'] for col in inspector.get_columns('report_jobs')]
+        
+        with engine.connect() as conn:
+            if 'failed_user_ids' not in existing_columns:
+                try:
+                    conn.execute(text('ALTER TABLE report_jobs ADD COLUMN failed_user_ids TEXT'))
+                    conn.commit()
+                    print("Added report_jobs.failed_user_ids column")
+                except Exception as e:
+                    print(f"Could not add report_jobs.failed_user_ids column: {e}")
+    
+    # Upload hashes let a repeated import find (and resume) its earlier job
+    if 'import_jobs' in inspector.get_table_names():
+        existing_columns = [col['name'] for col in inspector.get_columns('import_jobs')]
+        
+        with engine.connect() as conn:
+            if 'content_hash' not in existing_columns:
+                try:
+                    conn.execute(text('ALTER TABLE import_jobs ADD COLUMN content_hash VARCHAR(64)'))
+                    conn.execute(text('CREATE INDEX ix_import_jobs_content_hash ON import_jobs (content_hash)'))
+                    conn.commit()
+                    print("Added import_jobs.content_hash column")
+                except Exception as e:
+                    print(f"Could not add import_jobs.content_hash column: {e}")
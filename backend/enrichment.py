@@ -0,0 +1,300 @@
+"""
+Book Metadata Enrichment
+Books created by imports only carry what the CSV had (no cover, genre or
+description). New book ids are queued here and looked up on Open Library in
+multi-ISBN bibkeys batches by a small rate-limited worker pool; results are
+written back with one executemany per batch, only filling empty columns.
+
+Backfill every book that is still missing metadata:
+    python enrichment.py
+
+Classify every book that has an ISBN but no genre (--local-only uses just
+the Open Library mirror, no network). ISBNs a run looked up without getting
+a genre are skipped by later runs for GENRE_BACKFILL_RETRY_DAYS:
+    python enrichment.py genres [--local-only]
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import bindparam, func, or_, select, update
+
+from database import SessionLocal, Book
+from book_cache import FRESH, MISS
+from book_search import BookSearchService
+from genre_classifier import genre_classifier
+
+# ISBNs per bibkeys request
+ENRICHMENT_BATCH_SIZE = int(os.getenv("ENRICHMENT_BATCH_SIZE", "50"))
+# Concurrent Open Library requests
+ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", "4"))
+# Requests per second across all workers
+ENRICHMENT_RATE_LIMIT = float(os.getenv("ENRICHMENT_RATE_LIMIT", "3"))
+# Seconds between background runs when nothing triggers one earlier
+ENRICHMENT_INTERVAL_SECONDS = float(os.getenv("ENRICHMENT_INTERVAL_SECONDS", "60"))
+# Minutes between scheduled genre backfills (0 = only via `python enrichment.py genres`)
+GENRE_BACKFILL_INTERVAL_MINUTES = int(os.getenv("GENRE_BACKFILL_INTERVAL_MINUTES", "0"))
+# Days before an ISBN that yielded no genre is looked up again by the backfill
+GENRE_BACKFILL_RETRY_DAYS = int(os.getenv("GENRE_BACKFILL_RETRY_DAYS", "30"))
+
+# Columns enrichment may fill in; existing values are never overwritten
+ENRICHED_COLUMNS = ('cover_url', 'genre', 'description', 'page_count', 'published_year', 'publisher')
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads"""
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_at)
+            self._next_at = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class BookEnricher:
+    """Queue of book ids waiting for Open Library metadata"""
+
+    def __init__(
+        self,
+        service: Optional[BookSearchService] = None,
+        batch_size: int = ENRICHMENT_BATCH_SIZE,
+        workers: int = ENRICHMENT_WORKERS,
+        rate_limit: float = ENRICHMENT_RATE_LIMIT
+    ):
+        self.service = service or BookSearchService()
+        self.batch_size = batch_size
+        self.workers = workers
+        self.limiter = RateLimiter(rate_limit)
+        self._pending: Set[int] = set()
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._on_enqueue = None
+
+    def set_enqueue_callback(self, callback):
+        """Called after ids are queued, e.g. to wake the background job"""
+        self._on_enqueue = callback
+
+    def enqueue(self, book_ids: Iterable[int]):
+        """Queue committed book ids for enrichment"""
+        with self._lock:
+            before = len(self._pending)
+            self._pending.update(book_ids)
+            added = len(self._pending) > before
+        if added and self._on_enqueue:
+            self._on_enqueue()
+
+    def run_pending(self) -> Dict:
+        """Enrich everything queued so far (scheduler entry point)"""
+        with self._run_lock:
+            with self._lock:
+                book_ids = sorted(self._pending)
+                self._pending.clear()
+            if not book_ids:
+                return {"books": 0, "requests": 0, "enriched": 0, "failed_requests": 0}
+
+            summary = self.enrich(book_ids)
+            print(f"Book enrichment complete: {summary}")
+            return summary
+
+    def enrich(self, book_ids: List[int]) -> Dict:
+        """Look up and fill in metadata for the given books"""
+        summary = {"books": 0, "requests": 0, "enriched": 0, "failed_requests": 0}
+
+        db = SessionLocal()
+        try:
+            # Only books with an ISBN and something left to fill in
+            isbn_to_id: Dict[str, int] = {}
+            for start in range(0, len(book_ids), 900):
+                rows = db.execute(
+                    select(Book.id, Book.isbn).where(
+                        Book.id.in_(book_ids[start:start + 900]),
+                        Book.isbn.isnot(None),
+                        or_(*[getattr(Book, column).is_(None) for column in ENRICHED_COLUMNS])
+                    )
+                ).all()
+                isbn_to_id.update({row.isbn: row.id for row in rows})
+
+            isbns = sorted(isbn_to_id)
+            summary["books"] = len(isbns)
+            batches = [isbns[i:i + self.batch_size] for i in range(0, len(isbns), self.batch_size)]
+            if not batches:
+                return summary
+
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = {pool.submit(self._fetch, batch): batch for batch in batches}
+                for future in as_completed(futures):
+                    summary["requests"] += 1
+                    try:
+                        found = future.result()
+                    except Exception as e:
+                        summary["failed_requests"] += 1
+                        print(f"Enrichment lookup failed for {len(futures[future])} ISBNs: {str(e)[:200]}")
+                        continue
+
+                    # Writes stay on this thread: one executemany per batch
+                    summary["enriched"] += self._write_back(db, isbn_to_id, found)
+                    db.commit()
+
+            return summary
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _fetch(self, isbns: List[str]) -> Dict[str, Dict]:
+        self.limiter.wait()
+        return self.service.lookup_isbns(isbns)
+
+    def _write_back(self, db, isbn_to_id: Dict[str, int], found: Dict[str, Dict]) -> int:
+        rows = []
+        for isbn, book in found.items():
+            values = {f"v_{column}": book.get(column) or None for column in ENRICHED_COLUMNS}
+            if not any(values.values()):
+                continue
+            rows.append({"b_id": isbn_to_id[isbn], **values})
+
+        if rows:
+            db.execute(
+                update(Book.__table__).where(Book.__table__.c.id == bindparam("b_id")).values({
+                    column: func.coalesce(Book.__table__.c[column], bindparam(f"v_{column}"))
+                    for column in ENRICHED_COLUMNS
+                }),
+                rows
+            )
+        return len(rows)
+
+
+def backfill_missing_metadata(chunk_size: int = 1000) -> Dict:
+    """Enrich every catalog book with an ISBN and a missing cover, in id order"""
+    totals = {"books": 0, "requests": 0, "enriched": 0, "failed_requests": 0}
+    last_id = 0
+    while True:
+        db = SessionLocal()
+        try:
+            book_ids = db.execute(
+                select(Book.id).where(
+                    Book.id > last_id,
+                    Book.isbn.isnot(None),
+                    Book.cover_url.is_(None)
+                ).order_by(Book.id).limit(chunk_size)
+            ).scalars().all()
+        finally:
+            db.close()
+
+        if not book_ids:
+            return totals
+
+        summary = book_enricher.enrich(book_ids)
+        for key in totals:
+            totals[key] += summary[key]
+        last_id = book_ids[-1]
+
+
+def _answered(service: BookSearchService, isbn: str, book: Optional[Dict]) -> bool:
+    """True when the mirror or Open Library answered for the ISBN, rather than the lookup failing"""
+    if book is None:
+        # Not found is cached; a failed request leaves no entry
+        return service.cache.lookup('isbn', isbn)[0] != MISS
+    # Catalog rows only come back when the upstream lookup failed
+    return 'id' not in book
+
+
+def backfill_genres(chunk_size: int = 500, lookup: bool = True, after_id: int = 0) -> Dict:
+    """
+    Classify every catalog book with an ISBN and no genre, in id order
+    (starting after after_id, to resume an interrupted run).
+    Subjects come from the Open Library mirror and, with lookup, from the
+    shared ISBN cache and bibkeys batches plus search fallbacks, every
+    request spaced by the enrichment rate limiter. ISBNs that were answered
+    without a genre are marked ('genre_backfill' cache namespace) so later
+    runs skip them until the mark expires.
+    """
+    totals = {"books": 0, "classified": 0, "skipped": 0}
+    service = book_enricher.service
+    last_id = after_id
+    while True:
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(Book.id, Book.isbn).where(
+                    Book.id > last_id,
+                    Book.genre.is_(None),
+                    Book.isbn.isnot(None)
+                ).order_by(Book.id).limit(chunk_size)
+            ).all()
+            if not rows:
+                return totals
+            last_id = rows[-1].id
+
+            isbns = sorted({service._normalize_isbn(row.isbn) for row in rows})
+            if lookup:
+                # Looked up recently without a genre: don't spend requests on them again
+                tried = {isbn for isbn in isbns if service.cache.lookup('genre_backfill', isbn)[0] == FRESH}
+                isbns = [isbn for isbn in isbns if isbn not in tried]
+                totals["skipped"] += len(tried)
+                genres = {}
+                for start in range(0, len(isbns), book_enricher.batch_size):
+                    books = service.get_books_by_isbns(
+                        isbns[start:start + book_enricher.batch_size], throttle=book_enricher.limiter.wait
+                    )
+                    for isbn, book in books.items():
+                        genre = book.get('genre') if book else None
+                        if genre:
+                            genres[isbn] = genre
+                        elif _answered(service, isbn, book):
+                            service.cache.store(
+                                'genre_backfill', isbn, {'genre': None}, ttl=GENRE_BACKFILL_RETRY_DAYS * 86400
+                            )
+            else:
+                genres = {
+                    isbn: genre_classifier.classify(doc.get('subject', []))
+                    for isbn, doc in service.mirror.isbn_docs(isbns).items()
+                }
+
+            updates = []
+            for row in rows:
+                genre = genres.get(service._normalize_isbn(row.isbn))
+                if genre:
+                    updates.append({"b_id": row.id, "v_genre": genre})
+            if updates:
+                db.execute(
+                    update(Book.__table__).where(
+                        Book.__table__.c.id == bindparam("b_id"),
+                        Book.__table__.c.genre.is_(None)
+                    ).values(genre=bindparam("v_genre")),
+                    updates
+                )
+                db.commit()
+
+            totals["books"] += len(rows)
+            totals["classified"] += len(updates)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+# Singleton instance
+book_enricher = BookEnricher()
+
+
+if __name__ == "__main__":
+    import sys
+    from database import init_db
+    init_db()
+    if sys.argv[1:2] == ["genres"]:
+        print(f"Genre backfill: {backfill_genres(lookup='--local-only' not in sys.argv)}")
+    else:
+        print(f"Enrichment backfill: {backfill_missing_metadata()}")
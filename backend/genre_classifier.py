@@ -0,0 +1,98 @@
+"""
+Genre Classifier
+Maps free-form subjects (Open Library subjects, Goodreads shelves) to our
+genres with one precompiled regex instead of a substring scan per genre.
+The taxonomy is ordered by priority: when the leading subjects match several
+genres the earliest entry wins, so "Fantasy fiction" is Fantasy and
+"Science fiction" is Science Fiction rather than plain Fiction.
+
+Override the taxonomy with a JSON file (GENRE_TAXONOMY_PATH) holding either
+an object {"phrase": "Genre", ...} or a list of ["phrase", "Genre"] pairs,
+highest priority first. Phrases are matched case-insensitively at the start
+of a word.
+"""
+
+import json
+import os
+import re
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# JSON taxonomy file; the built-in one below is used when unset
+GENRE_TAXONOMY_PATH = os.getenv("GENRE_TAXONOMY_PATH", "")
+# Leading subjects considered per book (Open Library lists the most relevant first)
+GENRE_MAX_SUBJECTS = int(os.getenv("GENRE_MAX_SUBJECTS", "10"))
+
+# Highest priority first: specific genres before the catch-all 'fiction'
+DEFAULT_TAXONOMY: List[Tuple[str, str]] = [
+    ('science fiction', 'Science Fiction'),
+    ('sci-fi', 'Science Fiction'),
+    ('fantasy', 'Fantasy'),
+    ('mystery', 'Mystery'),
+    ('thriller', 'Thriller'),
+    ('romance', 'Romance'),
+    ('horror', 'Horror'),
+    ('young adult', 'Young Adult'),
+    ('children', 'Children'),
+    ('biography', 'Biography'),
+    ('self-help', 'Self-Help'),
+    ('history', 'History'),
+    ('nonfiction', 'Non-Fiction'),
+    ('non-fiction', 'Non-Fiction'),
+    ('fiction', 'Fiction'),
+]
+
+
+def load_taxonomy(path: str = GENRE_TAXONOMY_PATH) -> List[Tuple[str, str]]:
+    """Taxonomy from the JSON file, or the built-in one if unset or unreadable"""
+    if not path:
+        return DEFAULT_TAXONOMY
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        pairs = list(data.items()) if isinstance(data, dict) else [tuple(pair) for pair in data]
+        if not pairs or not all(len(pair) == 2 and all(isinstance(v, str) and v for v in pair) for pair in pairs):
+            raise ValueError("expected phrase -> genre pairs")
+        return pairs
+    except (OSError, ValueError) as e:
+        print(f"Genre taxonomy {path} not loaded, using the built-in one: {e}")
+        return DEFAULT_TAXONOMY
+
+
+class GenreClassifier:
+    """Priority-ordered phrase -> genre matcher compiled into one regex"""
+
+    def __init__(self, taxonomy: Optional[List[Tuple[str, str]]] = None):
+        self.taxonomy = taxonomy or load_taxonomy()
+        # phrase -> (priority, genre); a phrase listed twice keeps its first entry
+        self._phrases: Dict[str, Tuple[int, str]] = {}
+        for priority, (phrase, genre) in enumerate(self.taxonomy):
+            self._phrases.setdefault(phrase.lower(), (priority, genre))
+        # Longest first so 'science fiction' wins over 'fiction' at the same position;
+        # the lookahead on first letters skips most word starts without trying every phrase
+        alternatives = sorted(self._phrases, key=len, reverse=True)
+        first_letters = ''.join(re.escape(c) for c in sorted({p[0] for p in alternatives}))
+        self._pattern = re.compile(
+            r'\b(?=[' + first_letters + r'])(?:' + '|'.join(re.escape(p) for p in alternatives) + ')'
+        )
+
+    def classify(self, subjects: Iterable[str]) -> Optional[str]:
+        """Highest-priority genre found in the leading subjects, or None"""
+        # Lowercased once: cheaper than a case-insensitive pattern
+        text = '\n'.join(s for s in islice(subjects, GENRE_MAX_SUBJECTS) if isinstance(s, str)).lower()
+        best = None
+        for match in self._pattern.finditer(text):
+            candidate = self._phrases[match.group()]
+            if best is None or candidate[0] < best[0]:
+                best = candidate
+                if best[0] == 0:
+                    break
+        return best[1] if best else None
+
+    def genres(self) -> List[str]:
+        """Distinct genres in priority order"""
+        return list(dict.fromkeys(genre for _, genre in self.taxonomy))
+
+
+# Singleton instance
+genre_classifier = GenreClassifier()
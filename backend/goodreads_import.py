@@ -5,7 +5,7 @@ Parses and imports data from Goodreads export CSV files
 
 import csv
 import io
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterator, Optional, TextIO, Tuple
 from datetime import datetime
 from dataclasses import dataclass
 
@@ -27,6 +27,7 @@ class GoodreadsBook:
     bookshelves: List[str]
     exclusive_shelf: str  # read, currently-reading, to-read
     my_review: Optional[str]
+    goodreads_id: Optional[str] = None  # "Book Id" column, used as the row's idempotency key
 
 
 class GoodreadsImporter:
@@ -47,10 +48,37 @@ class GoodreadsImporter:
         books = []
         errors = []
         
+        for batch, batch_errors, _ in self.iter_batches(io.StringIO(csv_content)):
+            books.extend(batch)
+            errors.extend(batch_errors)
+            
+        return books, errors
+    
+    def iter_batches(
+        self,
+        stream: TextIO,
+        batch_size: int = 500,
+        skip_rows: int = 0
+    ) -> Iterator[Tuple[List[GoodreadsBook], List[str], int]]:
+        """
+        Parse a Goodreads CSV export incrementally from a text stream
+        Yields (parsed books, error messages, CSV rows consumed) per batch of
+        `batch_size` rows, so only one batch is held in memory at a time.
+        The first `skip_rows` data rows are read past without being parsed.
+        """
+        books = []
+        errors = []
+        rows_read = 0
+        row_num = 1
+        
         try:
-            reader = csv.DictReader(io.StringIO(csv_content))
+            reader = csv.DictReader(stream)
             
             for row_num, row in enumerate(reader, start=2):
+                if row_num - 2 < skip_rows:
+                    continue
+                    
+                rows_read += 1
                 try:
                     book = self._parse_row(row)
                     if book:
@@ -58,10 +86,100 @@ class GoodreadsImporter:
                 except Exception as e:
                     errors.append(f"Row {row_num}: {str(e)}")
                     
+                if rows_read == batch_size:
+                    yield books, errors, rows_read
+                    books, errors, rows_read = [], [], 0
+                    
         except Exception as e:
-            errors.append(f"CSV parsing error: {str(e)}")
+            errors.append(f"CSV parsing error after row {row_num}: {str(e)}")
             
-        return books, errors
+        if books or errors or rows_read:
+            yield books, errors, rows_read
+    
+    def preview(self, stream: TextIO, sample_size: int = 10, max_errors: int = 5) -> Dict:
+        """
+        Summarize an export in one streaming pass without parsing every row.
+        Counts only look at the Title, Exclusive Shelf, My Rating and My Review
+        columns; full GoodreadsBook objects are built for the sampled rows only.
+        """
+        preview = {
+            "total": 0,
+            "by_status": {
+                "read": 0,
+                "currently_reading": 0,
+                "want_to_read": 0
+            },
+            "with_ratings": 0,
+            "with_reviews": 0,
+            "sample_books": [],
+            "errors": []
+        }
+        by_status = preview["by_status"]
+        row_num = 1
+        
+        try:
+            reader = csv.reader(stream)
+            header = next(reader, None)
+            if not header:
+                return preview
+            
+            def column(name):
+                return header.index(name) if name in header else None
+            
+            title_col = column('Title')
+            shelf_col = column('Exclusive Shelf')
+            rating_col = column('My Rating')
+            review_col = column('My Review')
+            if title_col is None:
+                return preview
+            
+            for row_num, row in enumerate(reader, start=2):
+                if not row:
+                    continue  # DictReader skips blank lines too
+                width = len(row)
+                if title_col >= width or not row[title_col].strip():
+                    continue
+                
+                preview["total"] += 1
+                shelf = row[shelf_col].strip() if shelf_col is not None and shelf_col < width else 'to-read'
+                status = self.get_our_status(shelf)
+                by_status[status] = by_status.get(status, 0) + 1
+                
+                if rating_col is not None and rating_col < width and self._parse_int(row[rating_col]):
+                    preview["with_ratings"] += 1
+                if review_col is not None and review_col < width and row[review_col].strip():
+                    preview["with_reviews"] += 1
+                
+                if len(preview["sample_books"]) < sample_size:
+                    try:
+                        book = self._parse_row(dict(zip(header, row)))
+                        preview["sample_books"].append({
+                            "title": book.title,
+                            "author": book.author,
+                            "status": status,
+                            "rating": book.my_rating,
+                            "year": book.year_published
+                        })
+                    except Exception as e:
+                        if len(preview["errors"]) < max_errors:
+                            preview["errors"].append(f"Row {row_num}: {str(e)}")
+                            
+        except Exception as e:
+            if len(preview["errors"]) < max_errors:
+                preview["errors"].append(f"CSV parsing error after row {row_num}: {str(e)}")
+            
+        return preview
+    
+    def count_rows(self, stream: TextIO) -> int:
+        """Count data rows in a CSV stream without building row dicts"""
+        count = 0
+        try:
+            for row in csv.reader(stream):
+                if row:  # DictReader skips blank lines too
+                    count += 1
+        except csv.Error:
+            pass
+        return max(count - 1, 0)  # minus the header row
     
     def _parse_row(self, row: Dict) -> Optional[GoodreadsBook]:
         """Parse a single CSV row into a GoodreadsBook"""
@@ -124,7 +242,8 @@ class GoodreadsImporter:
             date_added=date_added,
             bookshelves=bookshelves,
             exclusive_shelf=exclusive_shelf,
-            my_review=my_review
+            my_review=my_review,
+            goodreads_id=(row.get('Book Id') or '').strip() or None
         )
     
     def _clean_isbn(self, isbn_str: str) -> Optional[str]:
@@ -0,0 +1,515 @@
+"""
+Library Import Jobs
+Goodreads uploads are queued in the import_jobs table and processed by a
+small pool of worker threads in committed chunks. Progress lives on the job
+row, so a restarted worker picks up after the last committed chunk. Jobs are
+keyed by the upload's content hash and rows by their Goodreads Book Id, so
+uploading the same export again resumes or no-ops instead of re-importing.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, List, Optional, TextIO
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, Book, ImportJob, user_books, import_row_keys
+from book_matching import book_match_key
+from enrichment import book_enricher
+from goodreads_import import goodreads_importer, GoodreadsBook
+from genre_classifier import genre_classifier
+from library_sync import next_library_revision, clear_tombstones
+from points import award_points_many
+
+# Where uploads wait until a worker processes them
+IMPORT_UPLOAD_DIR = os.getenv("IMPORT_UPLOAD_DIR", "./import_uploads")
+# Worker threads processing jobs
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+# Rows per committed chunk
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "200"))
+# Seconds between queue polls when idle
+IMPORT_POLL_INTERVAL_SECONDS = float(os.getenv("IMPORT_POLL_INTERVAL_SECONDS", "2"))
+# Errors kept on the job row
+MAX_JOB_ERRORS = 100
+# Bytes read at a time while hashing and saving uploads
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+# Max values per IN (...) list, well under SQLite's bound-parameter limit
+IN_CLAUSE_CHUNK = 900
+
+
+def _chunked(values: List, size: int = IN_CLAUSE_CHUNK):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def resolve_books(db: Session, gr_books: List[GoodreadsBook]) -> List[Optional[int]]:
+    """
+    Match parsed rows to existing books with set-based queries:
+    one IN over every ISBN, then one IN over the match keys of the rows still unmatched.
+    Returns a book id (or None) per row.
+    """
+    isbns = sorted({isbn for b in gr_books for isbn in (b.isbn13, b.isbn) if isbn})
+    books_by_isbn = {}
+    for isbn_chunk in _chunked(isbns):
+        for book_id, isbn in db.execute(
+            select(Book.id, Book.isbn).where(Book.isbn.in_(isbn_chunk))
+        ):
+            books_by_isbn[isbn] = book_id
+
+    resolved = []
+    for b in gr_books:
+        resolved.append(books_by_isbn.get(b.isbn13) or books_by_isbn.get(b.isbn))
+
+    # Normalized title + author surname for rows without an ISBN match
+    row_keys = [
+        book_match_key(b.title, b.author) if book_id is None else None
+        for b, book_id in zip(gr_books, resolved)
+    ]
+    books_by_key = {}
+    for key_chunk in _chunked(sorted({key for key in row_keys if key})):
+        for book_id, match_key in db.execute(
+            select(Book.id, Book.match_key).where(Book.match_key.in_(key_chunk)).order_by(Book.id)
+        ):
+            books_by_key.setdefault(match_key, book_id)
+
+    for i, key in enumerate(row_keys):
+        if key:
+            resolved[i] = books_by_key.get(key)
+
+    return resolved
+
+
+def _imported_row_ids(db: Session, user_id: int, source: str, external_ids: List[str]) -> set:
+    """Row keys already imported whose book is still in the user's library"""
+    done = set()
+    for id_chunk in _chunked(external_ids):
+        done.update(db.execute(
+            select(import_row_keys.c.external_id).join(
+                user_books,
+                (user_books.c.user_id == import_row_keys.c.user_id) &
+                (user_books.c.book_id == import_row_keys.c.book_id)
+            ).where(
+                import_row_keys.c.user_id == user_id,
+                import_row_keys.c.source == source,
+                import_row_keys.c.external_id.in_(id_chunk)
+            )
+        ).scalars())
+    return done
+
+
+def _record_row_ids(db: Session, user_id: int, source: str, row_books: Dict[str, int], job_id: Optional[int]):
+    """Remember which book each source row resolved to (replacing stale keys)"""
+    external_ids = sorted(row_books)
+    for id_chunk in _chunked(external_ids):
+        db.execute(import_row_keys.delete().where(
+            import_row_keys.c.user_id == user_id,
+            import_row_keys.c.source == source,
+            import_row_keys.c.external_id.in_(id_chunk)
+        ))
+    db.execute(import_row_keys.insert(), [
+        {'user_id': user_id, 'source': source, 'external_id': external_id,
+         'book_id': row_books[external_id], 'job_id': job_id}
+        for external_id in external_ids
+    ])
+
+
+def import_books(
+    db: Session,
+    user_id: int,
+    gr_books: List[GoodreadsBook],
+    source: str = 'goodreads',
+    job_id: Optional[int] = None
+) -> Dict:
+    """
+    Add parsed Goodreads books to a user's library (creating missing books).
+    Rows whose Goodreads Book Id was already imported are skipped before any
+    lookups; resolution is set-based and writes are bulk inserts.
+    Does not commit; returns imported/skipped counts, errors, the imported books
+    and the ids of catalog books it created (to enrich once committed).
+    """
+    results = {
+        "imported": 0,
+        "skipped": 0,
+        "errors": [],
+        "books": [],
+        "created_book_ids": []
+    }
+
+    # Row-level idempotency: a retried chunk or re-uploaded export is a no-op
+    done = _imported_row_ids(db, user_id, source, sorted({b.goodreads_id for b in gr_books if b.goodreads_id}))
+    if done:
+        pending = [b for b in gr_books if b.goodreads_id not in done]
+        results["skipped"] += len(gr_books) - len(pending)
+        gr_books = pending
+    if not gr_books:
+        return results
+
+    resolved = resolve_books(db, gr_books)
+
+    # Books missing from the catalog, created once even if the file repeats them
+    new_book_rows = []
+    new_book_index = {}
+    row_new_book = {}
+    for i, (b, book_id) in enumerate(zip(gr_books, resolved)):
+        if book_id is not None:
+            continue
+        isbn = b.isbn13 or b.isbn
+        keys = [('isbn', isbn), ('match', book_match_key(b.title, b.author))]
+        position = next((new_book_index[key] for key in keys if key[1] and key in new_book_index), None)
+        if position is None:
+            position = len(new_book_rows)
+            new_book_rows.append({
+                'title': b.title,
+                'author': b.author,
+                'isbn': isbn,
+                'published_year': b.year_published,
+                'page_count': b.num_pages,
+                'publisher': b.publisher,
+                'average_rating': b.average_rating or 0.0,
+                # User shelves such as "fantasy" or "sci-fi"; enrichment fills the rest
+                'genre': genre_classifier.classify(b.bookshelves),
+                'match_key': keys[1][1] or '',
+            })
+        for key in keys:
+            if key[1]:
+                new_book_index.setdefault(key, position)
+        row_new_book[i] = position
+
+    if new_book_rows:
+        new_ids = db.scalars(
+            insert(Book).returning(Book.id, sort_by_parameter_order=True),
+            new_book_rows
+        ).all()
+        for i, position in row_new_book.items():
+            resolved[i] = new_ids[position]
+        results["created_book_ids"] = list(new_ids)
+
+    # Which of the matched books the user already has
+    existing_ids = sorted({book_id for i, book_id in enumerate(resolved) if i not in row_new_book})
+    in_library = set()
+    for id_chunk in _chunked(existing_ids):
+        in_library.update(db.execute(
+            select(user_books.c.book_id).where(
+                user_books.c.user_id == user_id,
+                user_books.c.book_id.in_(id_chunk)
+            )
+        ).scalars())
+
+    # One library revision covers the whole batch
+    revision = next_library_revision(db, user_id)
+    library_rows = []
+    awards = []
+    now = datetime.utcnow()
+
+    for b, book_id in zip(gr_books, resolved):
+        if book_id in in_library:
+            results["skipped"] += 1
+            continue
+        in_library.add(book_id)  # Repeated rows in the same file count once
+
+        status = goodreads_importer.get_our_status(b.exclusive_shelf)
+        library_rows.append({
+            'user_id': user_id,
+            'book_id': book_id,
+            'status': status,
+            'rating': b.my_rating,
+            'review': b.my_review,
+            'started_at': b.date_added,
+            'finished_at': b.date_read if status == 'read' else None,
+            'added_at': b.date_added or now,
+            'revision': revision,
+        })
+
+        results["imported"] += 1
+        results["books"].append({
+            "title": b.title,
+            "author": b.author,
+            "status": status
+        })
+
+        # Update points, one ledger entry per award like the single-book endpoints
+        awards.append((5, 'book_added', book_id))  # Points for adding book
+        if b.my_rating:
+            awards.append((10, 'book_rated', book_id))  # Points for rating
+        if b.my_review:
+            awards.append((20, 'book_reviewed', book_id))  # Points for review
+
+    if library_rows:
+        db.execute(user_books.insert(), library_rows)
+        clear_tombstones(db, user_id, [row['book_id'] for row in library_rows])
+    award_points_many(db, user_id, awards)
+
+    row_books = {b.goodreads_id: book_id for b, book_id in zip(gr_books, resolved) if b.goodreads_id}
+    if row_books:
+        _record_row_ids(db, user_id, source, row_books, job_id)
+
+    return results
+
+
+# ==================== JOB QUEUE ====================
+
+def find_import_job(db: Session, user_id: int, content_hash: str, source: str = 'goodreads') -> Optional[ImportJob]:
+    """The user's most recent job for the same file, if any"""
+    return db.query(ImportJob).filter(
+        ImportJob.user_id == user_id,
+        ImportJob.source == source,
+        ImportJob.content_hash == content_hash
+    ).order_by(ImportJob.id.desc()).first()
+
+
+def enqueue_import(db: Session, user_id: int, upload: BinaryIO, source: str = 'goodreads') -> ImportJob:
+    """
+    Save the uploaded file to disk and queue a job for it.
+    Re-uploading a file that is queued, running or done returns that job
+    unchanged; a failed job is requeued and resumes from its checkpoint.
+    """
+    os.makedirs(IMPORT_UPLOAD_DIR, exist_ok=True)
+    file_path = os.path.join(IMPORT_UPLOAD_DIR, f"{uuid.uuid4().hex}.csv")
+    digest = hashlib.sha256()
+    with open(file_path, 'wb') as f:
+        for block in iter(lambda: upload.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+            f.write(block)
+    content_hash = digest.hexdigest()
+
+    job = find_import_job(db, user_id, content_hash, source)
+    if job and job.status != 'failed':
+        _remove_file(file_path)
+        return job
+
+    if job:
+        if job.file_path and job.file_path != file_path:
+            _remove_file(job.file_path)
+        job.file_path = file_path
+        job.status = 'queued'
+        job.finished_at = None
+    else:
+        job = ImportJob(
+            user_id=user_id,
+            source=source,
+            status='queued',
+            file_path=file_path,
+            content_hash=content_hash
+        )
+        db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    import_worker_pool.wake()
+    return job
+
+
+def job_status(job: ImportJob) -> Dict:
+    """Serialize an import job for progress polling"""
+    percentage = 0
+    if job.total_rows:
+        percentage = round(min(job.processed_rows / job.total_rows, 1) * 100, 1)
+    elif job.status == 'completed':
+        percentage = 100
+
+    return {
+        "job_id": job.id,
+        "source": job.source,
+        "status": job.status,
+        "total_rows": job.total_rows,
+        "processed_rows": job.processed_rows,
+        "imported": job.imported,
+        "skipped": job.skipped,
+        "failed": job.failed,
+        "percentage": percentage,
+        "errors": json.loads(job.errors) if job.errors else [],
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def _append_errors(job: ImportJob, new_errors: List[str]):
+    if not new_errors:
+        return
+    errors = json.loads(job.errors) if job.errors else []
+    errors.extend(new_errors[:MAX_JOB_ERRORS - len(errors)])
+    job.errors = json.dumps(errors)
+
+
+def _claim_next_job(db: Session) -> Optional[int]:
+    """Atomically move the oldest queued job to running; returns its id"""
+    candidates = db.query(ImportJob.id).filter(
+        ImportJob.status == 'queued'
+    ).order_by(ImportJob.id).limit(5).all()
+
+    for (job_id,) in candidates:
+        claimed = db.query(ImportJob).filter(
+            ImportJob.id == job_id,
+            ImportJob.status == 'queued'
+        ).update({
+            ImportJob.status: 'running',
+            ImportJob.started_at: datetime.utcnow()
+        }, synchronize_session=False)
+        db.commit()
+        if claimed:
+            return job_id
+
+    return None
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def import_stream(
+    db: Session,
+    job: ImportJob,
+    stream: TextIO,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    on_chunk: Optional[Callable[[Dict], None]] = None
+):
+    """
+    Import the rows after job.processed_rows from a CSV text stream.
+    Each chunk commits together with the job's counters, so the checkpoint
+    always matches what is in the library.
+    """
+    batches = goodreads_importer.iter_batches(stream, chunk_size, skip_rows=job.processed_rows)
+    for chunk, parse_errors, rows_read in batches:
+        results = import_books(db, job.user_id, chunk, job.source, job.id)
+
+        job.processed_rows += rows_read
+        job.imported += results["imported"]
+        job.skipped += results["skipped"]
+        job.failed += len(results["errors"]) + len(parse_errors)
+        _append_errors(job, parse_errors + results["errors"])
+        db.commit()
+        book_enricher.enqueue(results["created_book_ids"])
+        if on_chunk:
+            on_chunk(results)
+
+    job.status = 'completed'
+    job.finished_at = datetime.utcnow()
+    db.commit()
+
+
+def fail_job(db: Session, job: ImportJob, error: Exception):
+    """Mark a job failed after rolling back its unfinished chunk"""
+    db.rollback()
+    job.status = 'failed'
+    job.finished_at = datetime.utcnow()
+    _append_errors(job, [f"Import failed: {str(error)}"])
+    db.commit()
+
+
+def process_import_job(job_id: int, chunk_size: int = IMPORT_CHUNK_SIZE):
+    """Run (or resume) one job, committing progress with every chunk"""
+    db = SessionLocal()
+    job = None
+    try:
+        job = db.query(ImportJob).filter(ImportJob.id == job_id).first()
+        if not job:
+            return
+        if not job.file_path or not os.path.exists(job.file_path):
+            raise FileNotFoundError("upload is no longer available; upload the same file again to resume")
+
+        if job.total_rows is None:
+            with open(job.file_path, encoding='utf-8-sig', newline='') as f:
+                job.total_rows = goodreads_importer.count_rows(f)
+            db.commit()
+
+        # Stream the file chunk by chunk; processed_rows counts CSV rows consumed
+        with open(job.file_path, encoding='utf-8-sig', newline='') as f:
+            import_stream(db, job, f, chunk_size)
+
+        _remove_file(job.file_path)
+    except Exception as e:
+        print(f"Import job {job_id} failed: {e}")
+        if job is not None:
+            fail_job(db, job, e)
+        else:
+            db.rollback()
+    finally:
+        db.close()
+
+
+class ImportWorkerPool:
+    """Worker threads that poll the import_jobs queue"""
+
+    def __init__(self, workers: int = IMPORT_WORKERS):
+        self.workers = workers
+        self._threads: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+
+    def start(self):
+        if self._threads:
+            return
+        self._requeue_interrupted()
+        self._stop_event.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"import-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        self._wake_event.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def wake(self):
+        """Tell idle workers a job was queued"""
+        self._wake_event.set()
+
+    def _requeue_interrupted(self):
+        """
+        Jobs left running by a previous process resume from their checkpoint.
+        Jobs without a stored file (left by the former inline import endpoint)
+        are marked failed and resume when the same file is uploaded again.
+        """
+        db = SessionLocal()
+        try:
+            requeued = db.query(ImportJob).filter(
+                ImportJob.status == 'running',
+                ImportJob.file_path.isnot(None)
+            ).update({ImportJob.status: 'queued'}, synchronize_session=False)
+            interrupted = db.query(ImportJob).filter(
+                ImportJob.status == 'running',
+                ImportJob.file_path.is_(None)
+            ).update({ImportJob.status: 'failed'}, synchronize_session=False)
+            db.commit()
+            if requeued:
+                print(f"Requeued {requeued} interrupted import job(s)")
+            if interrupted:
+                print(f"Marked {interrupted} interrupted inline import(s) as failed")
+        finally:
+            db.close()
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            db = SessionLocal()
+            try:
+                job_id = _claim_next_job(db)
+            except Exception as e:
+                print(f"Import queue error: {e}")
+                job_id = None
+            finally:
+                db.close()
+
+            if job_id is not None:
+                process_import_job(job_id)
+                continue
+
+            self._wake_event.wait(IMPORT_POLL_INTERVAL_SECONDS)
+            self._wake_event.clear()
+
+
+# Singleton instance
+import_worker_pool = ImportWorkerPool()
@@ -0,0 +1,67 @@
+"""
+Library Change Log
+Every insert, update and delete in user_books is stamped with a per-user,
+monotonically increasing revision so clients can fetch only what changed
+"""
+
+from typing import Dict, Iterable, List
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from database import User, user_book_tombstones
+
+users_table = User.__table__
+
+
+def next_library_revision(db: Session, user_id: int) -> int:
+    """
+    Bump and return the user's library revision.
+    The UPDATE holds the user's row lock until commit, so revisions commit in order.
+    """
+    return db.execute(
+        users_table.update().where(users_table.c.id == user_id).values(
+            library_revision=func.coalesce(users_table.c.library_revision, 0) + 1
+        ).returning(users_table.c.library_revision)
+    ).scalar()
+
+
+def next_library_revisions(db: Session, user_ids: Iterable[int]) -> Dict[int, int]:
+    """Bump the revision of several users at once; returns user_id -> new revision"""
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return {}
+    db.execute(
+        users_table.update().where(users_table.c.id.in_(user_ids)).values(
+            library_revision=func.coalesce(users_table.c.library_revision, 0) + 1
+        )
+    )
+    return {
+        row.id: row.library_revision
+        for row in db.execute(
+            select(users_table.c.id, users_table.c.library_revision).where(users_table.c.id.in_(user_ids))
+        )
+    }
+
+
+def record_tombstones(db: Session, user_id: int, book_ids: List[int], revision: int):
+    """Remember removed library entries so delta sync can report them"""
+    if not book_ids:
+        return
+    clear_tombstones(db, user_id, book_ids)
+    db.execute(user_book_tombstones.insert(), [
+        {'user_id': user_id, 'book_id': book_id, 'revision': revision}
+        for book_id in book_ids
+    ])
+
+
+def clear_tombstones(db: Session, user_id: int, book_ids: List[int]):
+    """Forget removals for books that are back in the library"""
+    if not book_ids:
+        return
+    db.execute(
+        user_book_tombstones.delete().where(
+            user_book_tombstones.c.user_id == user_id,
+            user_book_tombstones.c.book_id.in_(book_ids)
+        )
+    )
@@ -1,17 +1,23 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, UploadFile, File, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func, or_
+from sqlalchemy import desc, func, or_, select, bindparam
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+import base64
+import io
+import json
 import secrets
 import string
 import os
 
 from database import (
-    get_db, init_db, User, Book, user_books, Collection, Activity, 
+    get_db, init_db, SessionLocal, User, Book, user_books, user_book_tombstones, Collection, Activity, 
     collection_books, followers, review_likes,
-    ReadingCircle, CircleMember, CircleChallenge, ChallengeProgress, CircleActivity
+    ReadingCircle, CircleMember, CircleChallenge, ChallengeProgress, CircleActivity,
+    BookFinishSnapshot, GenreShareSnapshot, PlatformSnapshot,
+    YearInReviewReport, ReportJob, PointsLedgerEntry, ImportJob
 )
 from schemas import *
 from auth import (
@@ -22,11 +28,28 @@ from auth import (
 )
 from ai_recommendations import ai_service
 from book_search import BookSearchService
+from async_book_search import async_book_service
+from resilience import endpoints as upstream_endpoints
 from email_service import (
     generate_verification_token, 
     get_token_expiry, 
     send_verification_email
 )
+from scheduler import scheduler
+from analytics import run_analytics_snapshot, ANALYTICS_SNAPSHOT_INTERVAL_MINUTES
+from reading_stats import summarize_reading
+from progress_buffer import progress_buffer, PROGRESS_FLUSH_INTERVAL_SECONDS
+from library_sync import next_library_revision, record_tombstones, clear_tombstones
+from points import award_points, award_points_many, set_challenge_progress
+from enrichment import book_enricher, backfill_genres, ENRICHMENT_INTERVAL_SECONDS, GENRE_BACKFILL_INTERVAL_MINUTES
+from book_dedupe import find_existing_book
+from trending import trending_snapshot, TRENDING_REFRESH_INTERVAL_MINUTES
+from author_directory import author_directory, AUTHOR_DIRECTORY_PREWARM_INTERVAL_MINUTES
+from cover_cache import cover_cache, parse_identifier, COVER_SIZES, COVER_MAX_AGE_SECONDS
+from year_in_review import (
+    job_progress, run_scheduled_year_in_review, default_report_year,
+    REPORT_TYPE as YEAR_IN_REVIEW_REPORT, YEAR_IN_REVIEW_INTERVAL_HOURS
+)
 
 app = FastAPI(title="Verso API", version="2.0.0")
 
@@ -44,6 +67,32 @@ app.add_middleware(
 @app.on_event("startup")
 def startup_event():
     init_db()
+    
+    # Background jobs
+    scheduler.add_job("analytics_snapshot", run_analytics_snapshot, ANALYTICS_SNAPSHOT_INTERVAL_MINUTES * 60)
+    progress_flush = scheduler.add_job("progress_flush", progress_buffer.flush, PROGRESS_FLUSH_INTERVAL_SECONDS, run_on_start=False)
+    progress_buffer.set_threshold_callback(progress_flush.trigger)
+    enrichment = scheduler.add_job("book_enrichment", book_enricher.run_pending, ENRICHMENT_INTERVAL_SECONDS, run_on_start=False)
+    book_enricher.set_enqueue_callback(enrichment.trigger)
+    trending_snapshot.load()
+    scheduler.add_job("trending_snapshot", trending_snapshot.refresh, TRENDING_REFRESH_INTERVAL_MINUTES * 60)
+    scheduler.add_job("year_in_review", run_scheduled_year_in_review, YEAR_IN_REVIEW_INTERVAL_HOURS * 3600)
+    scheduler.add_job("author_prewarm", author_directory.prewarm, AUTHOR_DIRECTORY_PREWARM_INTERVAL_MINUTES * 60)
+    if GENRE_BACKFILL_INTERVAL_MINUTES > 0:
+        scheduler.add_job("genre_backfill", backfill_genres, GENRE_BACKFILL_INTERVAL_MINUTES * 60, run_on_start=False)
+    scheduler.start()
+    import_worker_pool.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    scheduler.stop()
+    import_worker_pool.stop()
+    # Write out any progress updates still sitting in memory
+    progress_buffer.flush()
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    await async_book_service.aclose()
 
 # Initialize book search service
 book_service = BookSearchService()
@@ -242,20 +291,14 @@ def update_reading_progress(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Update current page for a book"""
-    db.execute(
-        user_books.update().where(
-            user_books.c.user_id == current_user.id,
-            user_books.c.book_id == book_id
-        ).values(current_page=current_page)
-    )
-    db.commit()
+    """Update current page for a book (buffered and written to the database in batches)"""
+    progress_buffer.record(current_user.id, book_id, current_page)
     
-    # Get book to calculate percentage
-    book = db.query(Book).filter(Book.id == book_id).first()
+    # Get page count to calculate percentage
+    page_count = db.query(Book.page_count).filter(Book.id == book_id).scalar()
     percentage = 0
-    if book and book.page_count:
-        percentage = int((current_page / book.page_count) * 100)
+    if page_count:
+        percentage = int((current_page / page_count) * 100)
     
     return {"current_page": current_page, "percentage": percentage}
 
@@ -266,6 +309,36 @@ def get_user_points(
     """Get current user's points"""
     return {"points": current_user.points, "username": current_user.username}
 
+@app.get("/points/history")
+def get_points_history(
+    limit: int = 50,
+    before_id: Optional[int] = None,
+    circle_id: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the current user's points awards, newest first (pass before_id to page back)"""
+    query = db.query(PointsLedgerEntry, Book.title).outerjoin(
+        Book, Book.id == PointsLedgerEntry.book_id
+    ).filter(PointsLedgerEntry.user_id == current_user.id)
+    
+    if circle_id is not None:
+        query = query.filter(PointsLedgerEntry.circle_id == circle_id)
+    if before_id is not None:
+        query = query.filter(PointsLedgerEntry.id < before_id)
+    
+    entries = query.order_by(desc(PointsLedgerEntry.id)).limit(limit).all()
+    
+    return [{
+        'id': entry.id,
+        'points': entry.points,
+        'reason': entry.reason,
+        'book_id': entry.book_id,
+        'book_title': book_title,
+        'circle_id': entry.circle_id,
+        'created_at': entry.created_at
+    } for entry, book_title in entries]
+
 # ==================== BOOK ROUTES ====================
 
 @app.post("/books", response_model=BookResponse, status_code=status.HTTP_201_CREATED)
@@ -274,15 +347,22 @@ def create_book(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Create a new book entry"""
+    """Create a new book entry (returns the existing book if it is already in the catalog)"""
+    existing = find_existing_book(db, book_data.isbn, book_data.title, book_data.author)
+    if existing:
+        return existing
+    
     db_book = Book(**book_data.dict())
     db.add(db_book)
     db.commit()
     db.refresh(db_book)
+    if db_book.isbn and not db_book.genre:
+        # Genre (and any other gaps) from the Open Library subjects for the ISBN
+        book_enricher.enqueue([db_book.id])
     return db_book
 
 @app.get("/books/search-external")
-def search_external_books(
+async def search_external_books(
     query: str,
     limit: int = 40,
     year_from: Optional[int] = None,
@@ -299,7 +379,32 @@ def search_external_books(
     elif year_to:
         search_query = f"{query} first_publish_year:[* TO {year_to}]"
     
-    return book_service.search_books(search_query, max_results=limit)
+    return await async_book_service.search_books(search_query, max_results=limit)
+
+@app.post("/books/lookup")
+def lookup_books_by_isbn(
+    lookup: BookLookupRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Look up to 500 ISBNs in one call (batched Open Library requests, cached per ISBN)"""
+    isbns, invalid = [], []
+    for isbn in lookup.isbns:
+        try:
+            kind, value = parse_identifier(isbn)
+        except ValueError:
+            kind = None
+        if kind != 'isbn':
+            invalid.append(isbn)
+        else:
+            isbns.append(value)
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid ISBNs: {', '.join(invalid[:20])}")
+    
+    books = book_service.get_books_by_isbns(isbns)
+    return {
+        "books": books,
+        "not_found": [isbn for isbn, book in books.items() if book is None],
+    }
 
 @app.post("/books/import-from-search")
 def import_book_from_search(
@@ -308,11 +413,10 @@ def import_book_from_search(
     db: Session = Depends(get_db)
 ):
     """Import a book from external search into our database"""
-    # Check if book already exists by ISBN
-    if book_data.get('isbn'):
-        existing = db.query(Book).filter(Book.isbn == book_data['isbn']).first()
-        if existing:
-            return existing
+    # Check if book already exists by ISBN or normalized title and author
+    existing = find_existing_book(db, book_data.get('isbn'), book_data.get('title'), book_data.get('author'))
+    if existing:
+        return existing
     
     # Create new book
     db_book = Book(
@@ -355,6 +459,18 @@ def get_books(
     
     return query.offset(skip).limit(limit).all()
 
+@app.get("/books/trending")
+async def get_trending_books(
+    limit: int = 40,
+    current_user: User = Depends(get_current_user)
+):
+    """Get trending books - recent popular books from Open Library (precomputed snapshot)"""
+    books = trending_snapshot.get(limit)
+    if books is None:
+        # No snapshot yet (first start, refresh still running): compute live
+        return await async_book_service.get_trending_books(max_results=limit)
+    return books
+
 @app.get("/books/{book_id}", response_model=BookResponse)
 def get_book(book_id: int, db: Session = Depends(get_db)):
     """Get a specific book"""
@@ -427,15 +543,6 @@ def get_popular_books(limit: int = 10, db: Session = Depends(get_db)):
     return books
 
 
-@app.get("/books/trending")
-def get_trending_books(
-    limit: int = 40,
-    current_user: User = Depends(get_current_user)
-):
-    """Get trending books - recent popular books from Open Library"""
-    return book_service.get_trending_books(max_results=limit)
-
-
 @app.get("/reviews/recent")
 def get_recent_reviews(limit: int = 10, db: Session = Depends(get_db)):
     """Get recent reviews from all users"""
@@ -500,9 +607,8 @@ def like_review(
     )
     
     # Award 1 point to reviewer
-    reviewer = db.query(User).filter(User.id == reviewer_id).first()
-    if reviewer:
-        reviewer.points += 1
+    if db.query(User.id).filter(User.id == reviewer_id).first():
+        award_points(db, reviewer_id, 1, 'review_liked', book_id=book_id)
     
     db.commit()
     return {"message": "Review liked", "liked": True}
@@ -524,10 +630,8 @@ def unlike_review(
     )
     
     if result.rowcount > 0:
-        # Remove 1 point from reviewer
-        reviewer = db.query(User).filter(User.id == reviewer_id).first()
-        if reviewer and reviewer.points > 0:
-            reviewer.points -= 1
+        # Remove 1 point from reviewer (never below zero)
+        award_points(db, reviewer_id, -1, 'review_unliked', book_id=book_id)
         db.commit()
         return {"message": "Review unliked", "liked": False}
     
@@ -588,6 +692,7 @@ def add_book_to_library(
             finished_at = datetime.utcnow()
     
     # Add to library
+    revision = next_library_revision(db, current_user.id)
     db.execute(
         user_books.insert().values(
             user_id=current_user.id,
@@ -597,9 +702,11 @@ def add_book_to_library(
             review=user_book.review,
             is_owned=user_book.is_owned,
             started_at=started_at,
-            finished_at=finished_at
+            finished_at=finished_at,
+            revision=revision
         )
     )
+    clear_tombstones(db, current_user.id, [user_book.book_id])
     
     # Update book's average rating
     if user_book.rating:
@@ -622,51 +729,200 @@ def add_book_to_library(
     
     # Award points
     points_earned = 0
-    current_user.points += 5  # 5 points for adding a book
-    points_earned += 5
+    points_earned += award_points(db, current_user.id, 5, 'book_added', book_id=user_book.book_id)
     
     if user_book.rating:
-        current_user.points += 10  # 10 points for rating
-        points_earned += 10
+        points_earned += award_points(db, current_user.id, 10, 'book_rated', book_id=user_book.book_id)
     
     if user_book.review:
-        current_user.points += 20  # 20 points for writing a review
-        points_earned += 20
+        points_earned += award_points(db, current_user.id, 20, 'book_reviewed', book_id=user_book.book_id)
     
     db.commit()
     return {"message": "Book added to library", "points_earned": points_earned}
 
+# Sort options for /my-books: column expression and whether it runs descending
+MY_BOOKS_SORTS = {
+    'added_at': (user_books.c.added_at, True),
+    'title': (Book.title, False),
+    'rating': (func.coalesce(user_books.c.rating, -1.0), True),
+}
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _encode_cursor(sort_value, row_id: int) -> str:
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor: str, sort: str):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if sort == 'added_at' and sort_value is not None:
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _my_books_query(user_id: int, status: Optional[str], sort: str, cursor: Optional[str]):
+    """Single joined query over the user's library with keyset pagination"""
+    if sort not in MY_BOOKS_SORTS:
+        raise HTTPException(status_code=400, detail=f"Sort must be one of: {', '.join(MY_BOOKS_SORTS)}")
+    sort_column, descending = MY_BOOKS_SORTS[sort]
+    
+    query = select(
+        Book,
+        user_books.c.id.label('entry_id'),
+        user_books.c.status,
+        user_books.c.rating,
+        user_books.c.review,
+        user_books.c.current_page,
+        user_books.c.is_owned,
+        user_books.c.started_at,
+        user_books.c.finished_at,
+        user_books.c.added_at,
+        sort_column.label('sort_value')
+    ).join(Book, Book.id == user_books.c.book_id).where(user_books.c.user_id == user_id)
+    
+    if status:
+        query = query.where(user_books.c.status == status)
+    
+    if cursor:
+        sort_value, last_id = _decode_cursor(cursor, sort)
+        if descending:
+            query = query.where(or_(
+                sort_column < sort_value,
+                (sort_column == sort_value) & (user_books.c.id < last_id)
+            ))
+        else:
+            query = query.where(or_(
+                sort_column > sort_value,
+                (sort_column == sort_value) & (user_books.c.id > last_id)
+            ))
+    
+    if descending:
+        return query.order_by(sort_column.desc(), user_books.c.id.desc())
+    return query.order_by(sort_column.asc(), user_books.c.id.asc())
+
+
+def _user_book_response(row, buffered_pages: dict) -> UserBookResponse:
+    return UserBookResponse(
+        book=row.Book,
+        status=row.status,
+        rating=row.rating,
+        review=row.review,
+        current_page=buffered_pages.get(row.Book.id, row.current_page),
+        is_owned=row.is_owned,
+        started_at=row.started_at,
+        finished_at=row.finished_at,
+        added_at=row.added_at
+    )
+
+
+def _stream_my_books(query, buffered_pages: dict):
+    """Serialize library rows one at a time from a server-side cursor"""
+    # The request-scoped session is closed before a streaming body is sent
+    db = SessionLocal()
+    try:
+        for row in db.execute(query.execution_options(yield_per=500)):
+            yield _user_book_response(row, buffered_pages).model_dump_json() + "\n"
+    finally:
+        db.close()
+
+
 @app.get("/my-books", response_model=List[UserBookResponse])
 def get_my_books(
+    request: Request,
+    response: Response,
     status: Optional[str] = None,
+    sort: str = 'added_at',
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get user's books with optional status filter"""
-    query = user_books.select().where(user_books.c.user_id == current_user.id)
+    """
+    Get user's books with optional status filter
+    Pass limit to paginate; the next page's cursor is returned in X-Next-Cursor.
+    Send Accept: application/x-ndjson to stream one JSON object per line.
+    """
+    query = _my_books_query(current_user.id, status, sort, cursor)
+    buffered_pages = progress_buffer.pending_for_user(current_user.id)
+    if limit is not None:
+        limit = max(1, limit)
     
-    if status:
-        query = query.where(user_books.c.status == status)
+    if NDJSON_MEDIA_TYPE in request.headers.get('accept', ''):
+        if limit is not None:
+            query = query.limit(limit)
+        return StreamingResponse(_stream_my_books(query, buffered_pages), media_type=NDJSON_MEDIA_TYPE)
     
-    user_book_entries = db.execute(query).fetchall()
+    if limit is not None:
+        query = query.limit(limit + 1)
     
-    result = []
-    for ub in user_book_entries:
-        book = db.query(Book).filter(Book.id == ub.book_id).first()
-        if book:
-            result.append(UserBookResponse(
-                book=book,
-                status=ub.status,
-                rating=ub.rating,
-                review=ub.review,
-                current_page=ub.current_page,
-                is_owned=ub.is_owned,
-                started_at=ub.started_at,
-                finished_at=ub.finished_at,
-                added_at=ub.added_at
-            ))
+    rows = db.execute(query).all()
     
-    return result
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        response.headers['X-Next-Cursor'] = _encode_cursor(rows[-1].sort_value, rows[-1].entry_id)
+    
+    return [_user_book_response(row, buffered_pages) for row in rows]
+
+@app.get("/my-books/changes", response_model=LibraryChangesResponse)
+def get_my_books_changes(
+    since: int = 0,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get library entries changed or removed after revision `since`
+    Clients store the returned revision and pass it on the next sync; since=0 returns everything.
+    """
+    revision = db.execute(
+        select(User.library_revision).where(User.id == current_user.id)
+    ).scalar() or 0
+    
+    query = select(
+        Book,
+        user_books.c.status,
+        user_books.c.rating,
+        user_books.c.review,
+        user_books.c.current_page,
+        user_books.c.is_owned,
+        user_books.c.started_at,
+        user_books.c.finished_at,
+        user_books.c.added_at,
+        user_books.c.revision
+    ).join(Book, Book.id == user_books.c.book_id).where(
+        user_books.c.user_id == current_user.id
+    ).order_by(user_books.c.revision, user_books.c.id)
+    
+    deleted = []
+    if since > 0:
+        query = query.where(user_books.c.revision > since)
+        deleted = db.execute(
+            select(user_book_tombstones.c.book_id, user_book_tombstones.c.revision).where(
+                user_book_tombstones.c.user_id == current_user.id,
+                user_book_tombstones.c.revision > since
+            ).order_by(user_book_tombstones.c.revision)
+        ).all()
+    
+    buffered_pages = progress_buffer.pending_for_user(current_user.id)
+    changes = [
+        UserBookChange(
+            **_user_book_response(row, buffered_pages).model_dump(),
+            revision=row.revision or 0
+        )
+        for row in db.execute(query)
+    ]
+    
+    return LibraryChangesResponse(
+        revision=revision,
+        changes=changes,
+        deleted=[LibraryTombstone(book_id=row.book_id, revision=row.revision) for row in deleted]
+    )
 
 @app.put("/my-books/{book_id}")
 def update_my_book(
@@ -711,6 +967,7 @@ def update_my_book(
         update_dict['finished_at'] = update_data.finished_at
     
     # Update
+    update_dict['revision'] = next_library_revision(db, current_user.id)
     db.execute(
         user_books.update().where(
             user_books.c.user_id == current_user.id,
@@ -725,12 +982,10 @@ def update_my_book(
     # Award points for new ratings/reviews
     points_earned = 0
     if update_data.rating is not None and existing.rating is None:
-        current_user.points += 10  # First time rating
-        points_earned += 10
+        points_earned += award_points(db, current_user.id, 10, 'book_rated', book_id=book_id)  # First time rating
     
     if update_data.review is not None and existing.review is None:
-        current_user.points += 20  # First time reviewing
-        points_earned += 20
+        points_earned += award_points(db, current_user.id, 20, 'book_reviewed', book_id=book_id)  # First time reviewing
     
     db.commit()
     return {"message": "Book updated", "points_earned": points_earned}
@@ -752,12 +1007,215 @@ def remove_from_library(
     if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Book not in library")
     
+    progress_buffer.discard(current_user.id, book_id)
+    record_tombstones(db, current_user.id, [book_id], next_library_revision(db, current_user.id))
+    
     # Update book's average rating
     update_book_rating(db, book_id)
     
     db.commit()
     return {"message": "Book removed from library"}
 
+@app.post("/my-books/batch")
+def batch_update_library(
+    batch: LibraryBatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Apply many add/update/remove operations in one transaction
+    Operations run in order; each one gets its own result entry. A book removed
+    and added back within the batch gets a fresh library entry, as it would
+    from separate calls.
+    """
+    book_ids = {op.book_id for op in batch.operations}
+    
+    # One query: which books exist, and the user's current row for each
+    rows = db.execute(
+        select(Book.id.label('book_id'), user_books).select_from(Book).outerjoin(
+            user_books,
+            (user_books.c.book_id == Book.id) & (user_books.c.user_id == current_user.id)
+        ).where(Book.id.in_(book_ids))
+    ).mappings().fetchall()
+    
+    library_columns = ['status', 'rating', 'review', 'is_owned', 'started_at', 'finished_at', 'current_page', 'added_at']
+    existing_books = set()
+    original = {}
+    for row in rows:
+        existing_books.add(row['book_id'])
+        if row['user_id'] is not None:
+            original[row['book_id']] = {col: row[col] for col in library_columns}
+    
+    # Simulate the operations against an in-memory copy of the library
+    state = {book_id: dict(entry) for book_id, entry in original.items()}
+    removed = set()  # Books whose original row a remove op dropped (even if added back later)
+    results = []
+    activities = []
+    rated_books = set()
+    total_points = 0
+    awards = []  # (points, reason, book_id): one ledger row each, like the single-book endpoints
+    now = datetime.utcnow()
+    
+    for index, op in enumerate(batch.operations):
+        result = {'index': index, 'op': op.op, 'book_id': op.book_id, 'ok': False}
+        results.append(result)
+        current = state.get(op.book_id)
+        
+        if op.op == 'add':
+            if op.book_id not in existing_books:
+                result['error'] = "Book not found"
+                continue
+            if current is not None:
+                result['error'] = "Book already in library"
+                continue
+            if not op.status:
+                result['error'] = "Status is required to add a book"
+                continue
+            
+            started_at = op.started_at
+            finished_at = op.finished_at
+            if op.status == 'currently_reading' and not started_at:
+                started_at = now
+            elif op.status == 'read':
+                started_at = started_at or now
+                finished_at = finished_at or now
+            
+            state[op.book_id] = {
+                'status': op.status,
+                'rating': op.rating,
+                'review': op.review,
+                'is_owned': op.is_owned or False,
+                'started_at': started_at,
+                'finished_at': finished_at,
+                'current_page': None,
+                'added_at': now
+            }
+            
+            activities.append({
+                'user_id': current_user.id,
+                'activity_type': {
+                    'read': 'finished_book',
+                    'currently_reading': 'started_book',
+                    'want_to_read': 'added_to_list'
+                }.get(op.status, 'added_to_list'),
+                'book_id': op.book_id,
+                'content': op.review if op.review else None,
+                'created_at': now
+            })
+            
+            op_awards = [(5, 'book_added', op.book_id)]
+            if op.rating:
+                op_awards.append((10, 'book_rated', op.book_id))
+                rated_books.add(op.book_id)
+            if op.review:
+                op_awards.append((20, 'book_reviewed', op.book_id))
+        
+        elif op.op == 'update':
+            if current is None:
+                result['error'] = "Book not in library"
+                continue
+            
+            op_awards = []
+            if op.status is not None:
+                current['status'] = op.status
+                if op.status == 'currently_reading' and not current['started_at']:
+                    current['started_at'] = now
+                elif op.status == 'read':
+                    current['started_at'] = current['started_at'] or now
+                    current['finished_at'] = current['finished_at'] or now
+            if op.rating is not None:
+                if current['rating'] is None:
+                    op_awards.append((10, 'book_rated', op.book_id))  # First time rating
+                current['rating'] = op.rating
+                rated_books.add(op.book_id)
+            if op.review is not None:
+                if current['review'] is None:
+                    op_awards.append((20, 'book_reviewed', op.book_id))  # First time reviewing
+                current['review'] = op.review
+            if op.is_owned is not None:
+                current['is_owned'] = op.is_owned
+            if op.started_at is not None:
+                current['started_at'] = op.started_at
+            if op.finished_at is not None:
+                current['finished_at'] = op.finished_at
+        
+        else:  # remove
+            if current is None:
+                result['error'] = "Book not in library"
+                continue
+            state[op.book_id] = None
+            if op.book_id in original:
+                removed.add(op.book_id)
+            rated_books.add(op.book_id)
+            op_awards = []
+        
+        points_earned = sum(points for points, _, _ in op_awards)
+        result['ok'] = True
+        result['points_earned'] = points_earned
+        total_points += points_earned
+        awards.extend(op_awards)
+    
+    # Diff the final state against what was loaded and write it in bulk
+    inserts, updates, deletes = [], [], []
+    for book_id, entry in state.items():
+        before = original.get(book_id)
+        if book_id in removed:
+            # Delete the old row (tombstone included); a re-add inserts a new one
+            deletes.append(book_id)
+            if entry is not None:
+                inserts.append({'user_id': current_user.id, 'book_id': book_id, **entry})
+        elif entry is None:
+            if before is not None:
+                deletes.append(book_id)
+        elif before is None:
+            inserts.append({'user_id': current_user.id, 'book_id': book_id, **entry})
+        elif entry != before:
+            updates.append({'b_book_id': book_id, **entry})
+    
+    revision = None
+    if inserts or updates or deletes:
+        revision = next_library_revision(db, current_user.id)
+    
+    if deletes:
+        db.execute(
+            user_books.delete().where(
+                user_books.c.user_id == current_user.id,
+                user_books.c.book_id.in_(deletes)
+            )
+        )
+        for book_id in deletes:
+            progress_buffer.discard(current_user.id, book_id)
+        record_tombstones(db, current_user.id, deletes, revision)
+    if inserts:
+        db.execute(user_books.insert(), [{**insert, 'revision': revision} for insert in inserts])
+        clear_tombstones(db, current_user.id, [insert['book_id'] for insert in inserts])
+    if updates:
+        # current_page is owned by the progress buffer, so leave it alone here
+        update_columns = [col for col in library_columns if col != 'current_page']
+        db.execute(
+            user_books.update().where(
+                user_books.c.user_id == current_user.id,
+                user_books.c.book_id == bindparam('b_book_id')
+            ).values(revision=revision, **{col: bindparam(col) for col in update_columns}),
+            [{key: value for key, value in update.items() if key != 'current_page'} for update in updates]
+        )
+    if activities:
+        db.execute(Activity.__table__.insert(), activities)
+    
+    update_book_ratings(db, rated_books)
+    
+    award_points_many(db, current_user.id, awards)
+    
+    db.commit()
+    
+    applied = sum(1 for r in results if r['ok'])
+    return {
+        "results": results,
+        "applied": applied,
+        "failed": len(results) - applied,
+        "points_earned": total_points
+    }
+
 # ==================== COLLECTIONS ROUTES ====================
 
 @app.post("/collections", response_model=CollectionResponse, status_code=status.HTTP_201_CREATED)
@@ -1183,160 +1641,59 @@ def get_reading_stats(
 # ==================== GOODREADS IMPORT ====================
 
 from goodreads_import import goodreads_importer, GoodreadsBook
+from import_jobs import enqueue_import, job_status, import_worker_pool
+
+
+def _upload_text(file: UploadFile):
+    """Decode an uploaded CSV lazily instead of reading it into one string"""
+    return io.TextIOWrapper(file.file, encoding='utf-8-sig', newline='')
+
 
-@app.post("/import/goodreads")
-async def import_goodreads(
-    file_content: str,
+@app.post("/import/goodreads", status_code=status.HTTP_202_ACCEPTED)
+@app.post("/import/goodreads/jobs", status_code=status.HTTP_202_ACCEPTED)
+def import_goodreads(
+    file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Import books from Goodreads CSV export
-    Expects the CSV content as a string in the request body
+    Queue a Goodreads CSV export for background import
+    The upload is saved and imported by the worker pool in committed chunks, so
+    large exports never run inside the request. Returns the job to poll with
+    GET /import/jobs/{job_id}. Uploading the same file again returns its job
+    (already_imported once it has finished) or resumes a failed one.
     """
-    # Parse the CSV
-    parsed_books, parse_errors = goodreads_importer.parse_csv(file_content)
-    
-    if not parsed_books and parse_errors:
-        raise HTTPException(status_code=400, detail=f"Failed to parse CSV: {parse_errors[0]}")
-    
-    # Track import results
-    results = {
-        "total_parsed": len(parsed_books),
-        "imported": 0,
-        "skipped": 0,
-        "errors": [],
-        "books": []
-    }
-    
-    for gr_book in parsed_books:
-        try:
-            # Try to find existing book by ISBN
-            existing_book = None
-            if gr_book.isbn13:
-                existing_book = db.query(Book).filter(Book.isbn == gr_book.isbn13).first()
-            if not existing_book and gr_book.isbn:
-                existing_book = db.query(Book).filter(Book.isbn == gr_book.isbn).first()
-            
-            # If not found by ISBN, try title + author match
-            if not existing_book:
-                existing_book = db.query(Book).filter(
-                    Book.title.ilike(gr_book.title),
-                    Book.author.ilike(f"%{gr_book.author.split()[0]}%")  # Match first name
-                ).first()
-            
-            # Create book if it doesn't exist
-            if existing_book:
-                book_id = existing_book.id
-            else:
-                new_book = Book(
-                    title=gr_book.title,
-                    author=gr_book.author,
-                    isbn=gr_book.isbn13 or gr_book.isbn,
-                    published_year=gr_book.year_published,
-                    page_count=gr_book.num_pages,
-                    publisher=gr_book.publisher,
-                    average_rating=gr_book.average_rating or 0.0
-                )
-                db.add(new_book)
-                db.flush()  # Get the ID
-                book_id = new_book.id
-            
-            # Check if user already has this book
-            existing_user_book = db.execute(
-                user_books.select().where(
-                    user_books.c.user_id == current_user.id,
-                    user_books.c.book_id == book_id
-                )
-            ).first()
-            
-            if existing_user_book:
-                results["skipped"] += 1
-                continue
-            
-            # Add to user's library
-            status = goodreads_importer.get_our_status(gr_book.exclusive_shelf)
-            
-            db.execute(user_books.insert().values(
-                user_id=current_user.id,
-                book_id=book_id,
-                status=status,
-                rating=gr_book.my_rating,
-                review=gr_book.my_review,
-                started_at=gr_book.date_added,
-                finished_at=gr_book.date_read if status == 'read' else None,
-                added_at=gr_book.date_added or datetime.utcnow()
-            ))
-            
-            results["imported"] += 1
-            results["books"].append({
-                "title": gr_book.title,
-                "author": gr_book.author,
-                "status": status
-            })
-            
-            # Update points
-            current_user.points += 5  # Points for adding book
-            if gr_book.my_rating:
-                current_user.points += 10  # Points for rating
-            if gr_book.my_review:
-                current_user.points += 20  # Points for review
-                
-        except Exception as e:
-            results["errors"].append(f"{gr_book.title}: {str(e)}")
-    
-    db.commit()
-    
-    return results
+    job = enqueue_import(db, current_user.id, file.file, source='goodreads')
+    return {**job_status(job), "already_imported": job.status == 'completed'}
+
+
+@app.get("/import/jobs/{job_id}")
+def get_import_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get progress counters and errors for an import job"""
+    job = db.query(ImportJob).filter(
+        ImportJob.id == job_id,
+        ImportJob.user_id == current_user.id
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job_status(job)
 
 
 @app.post("/import/goodreads/preview")
-async def preview_goodreads_import(
-    file_content: str,
+def preview_goodreads_import(
+    file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Preview what would be imported from Goodreads CSV
-    Returns parsed books without actually importing them
+    Returns totals and ten sample books without importing (or fully parsing) the file
     """
-    parsed_books, parse_errors = goodreads_importer.parse_csv(file_content)
-    
-    preview = {
-        "total": len(parsed_books),
-        "by_status": {
-            "read": 0,
-            "currently_reading": 0,
-            "want_to_read": 0
-        },
-        "with_ratings": 0,
-        "with_reviews": 0,
-        "sample_books": [],
-        "errors": parse_errors[:5]  # First 5 errors only
-    }
-    
-    for book in parsed_books:
-        status = goodreads_importer.get_our_status(book.exclusive_shelf)
-        preview["by_status"][status] = preview["by_status"].get(status, 0) + 1
-        
-        if book.my_rating:
-            preview["with_ratings"] += 1
-        if book.my_review:
-            preview["with_reviews"] += 1
-    
-    # Sample first 10 books
-    preview["sample_books"] = [
-        {
-            "title": b.title,
-            "author": b.author,
-            "status": goodreads_importer.get_our_status(b.exclusive_shelf),
-            "rating": b.my_rating,
-            "year": b.year_published
-        }
-        for b in parsed_books[:10]
-    ]
-    
-    return preview
+    return goodreads_importer.preview(_upload_text(file))
 
 
 # ==================== DETAILED STATISTICS ====================
@@ -1360,146 +1717,12 @@ def get_detailed_stats(
         books = db.query(Book).filter(Book.id.in_(book_ids)).all()
         books_dict = {b.id: b for b in books}
     
-    # Initialize stats
-    stats = {
-        "overview": {
-            "total_books": len(user_book_entries),
-            "books_read": 0,
-            "currently_reading": 0,
-            "want_to_read": 0,
-            "total_pages": 0,
-            "total_ratings": 0,
-            "total_reviews": 0,
-            "average_rating_given": 0,
-        },
-        "books_by_month": {},  # { "2024-01": 5, "2024-02": 3, ... }
-        "books_by_year": {},   # { "2024": 20, "2023": 15, ... }
-        "pages_by_month": {},  # { "2024-01": 1500, ... }
-        "genres": {},          # { "Fiction": 10, "Mystery": 5, ... }
-        "ratings_distribution": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0},
-        "authors": {},         # { "Author Name": 3, ... }
-        "reading_pace": {
-            "avg_days_per_book": None,
-            "fastest_read": None,
-            "slowest_read": None,
-        },
-        "publication_years": {},  # { "2020": 5, "2019": 3, ... }
-        "monthly_goal_progress": [],  # [{ month: "Jan", target: 4, actual: 5 }, ...]
-    }
-    
-    ratings_sum = 0
-    ratings_count = 0
-    reading_times = []  # List of days taken to read books
-    
-    for ub in user_book_entries:
-        book = books_dict.get(ub.book_id)
-        if not book:
-            continue
-            
-        # Overview counts
-        if ub.status == 'read':
-            stats["overview"]["books_read"] += 1
-            if book.page_count:
-                stats["overview"]["total_pages"] += book.page_count
-        elif ub.status == 'currently_reading':
-            stats["overview"]["currently_reading"] += 1
-        elif ub.status == 'want_to_read':
-            stats["overview"]["want_to_read"] += 1
-            
-        if ub.rating:
-            stats["overview"]["total_ratings"] += 1
-            ratings_sum += ub.rating
-            ratings_count += 1
-            # Ratings distribution (round to nearest int for distribution)
-            rating_key = min(5, max(1, round(ub.rating)))
-            stats["ratings_distribution"][rating_key] += 1
-            
-        if ub.review:
-            stats["overview"]["total_reviews"] += 1
-            
-        # Books by month/year (based on finished_at for read books, fallback to added_at)
-        if ub.status == 'read':
-            # Use finished_at if available, otherwise fall back to added_at
-            date_to_use = ub.finished_at or ub.added_at
-            if date_to_use:
-                month_key = date_to_use.strftime("%Y-%m")
-                year_key = str(date_to_use.year)
-                
-                stats["books_by_month"][month_key] = stats["books_by_month"].get(month_key, 0) + 1
-                stats["books_by_year"][year_key] = stats["books_by_year"].get(year_key, 0) + 1
-                
-                if book.page_count:
-                    stats["pages_by_month"][month_key] = stats["pages_by_month"].get(month_key, 0) + book.page_count
-                    
-            # Calculate reading time (only if both dates exist)
-            if ub.started_at and ub.finished_at:
-                days = (ub.finished_at - ub.started_at).days
-                if days >= 0:
-                    reading_times.append({
-                        "days": days,
-                        "title": book.title,
-                        "pages": book.page_count
-                    })
-        
-        # Genre breakdown
-        if book.genre:
-            stats["genres"][book.genre] = stats["genres"].get(book.genre, 0) + 1
-            
-        # Author breakdown (top authors)
-        if book.author:
-            # Handle multiple authors
-            primary_author = book.author.split(',')[0].strip()
-            stats["authors"][primary_author] = stats["authors"].get(primary_author, 0) + 1
-            
-        # Publication years
-        if book.published_year:
-            year_key = str(book.published_year)
-            stats["publication_years"][year_key] = stats["publication_years"].get(year_key, 0) + 1
-    
-    # Calculate averages
-    if ratings_count > 0:
-        stats["overview"]["average_rating_given"] = round(ratings_sum / ratings_count, 2)
-        
-    # Reading pace
-    if reading_times:
-        avg_days = sum(rt["days"] for rt in reading_times) / len(reading_times)
-        stats["reading_pace"]["avg_days_per_book"] = round(avg_days, 1)
-        
-        # Sort by days
-        sorted_times = sorted(reading_times, key=lambda x: x["days"])
-        if sorted_times:
-            stats["reading_pace"]["fastest_read"] = {
-                "title": sorted_times[0]["title"],
-                "days": sorted_times[0]["days"]
-            }
-            stats["reading_pace"]["slowest_read"] = {
-                "title": sorted_times[-1]["title"],
-                "days": sorted_times[-1]["days"]
-            }
-    
-    # Sort and limit authors (top 10)
-    stats["authors"] = dict(
-        sorted(stats["authors"].items(), key=lambda x: x[1], reverse=True)[:10]
+    return summarize_reading(
+        user_book_entries,
+        books_dict,
+        reading_goal=current_user.reading_goal,
+        reading_goal_year=current_user.reading_goal_year
     )
-    
-    # Sort months chronologically
-    stats["books_by_month"] = dict(sorted(stats["books_by_month"].items()))
-    stats["pages_by_month"] = dict(sorted(stats["pages_by_month"].items()))
-    
-    # Generate monthly goal progress for current year
-    current_year = datetime.now().year
-    if current_user.reading_goal and current_user.reading_goal_year == current_year:
-        monthly_target = current_user.reading_goal / 12
-        for month in range(1, 13):
-            month_key = f"{current_year}-{month:02d}"
-            actual = stats["books_by_month"].get(month_key, 0)
-            stats["monthly_goal_progress"].append({
-                "month": datetime(current_year, month, 1).strftime("%b"),
-                "target": round(monthly_target, 1),
-                "actual": actual
-            })
-    
-    return stats
 
 
 @app.get("/stats/reading-streak")
@@ -1606,6 +1829,161 @@ def get_reading_streak(
     }
 
 
+@app.get("/stats/year-in-review")
+def get_year_in_review(
+    year: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the precomputed year-in-review report (generated by year_in_review.py)"""
+    year = year or default_report_year()
+    
+    report = db.query(YearInReviewReport).filter(
+        YearInReviewReport.user_id == current_user.id,
+        YearInReviewReport.year == year
+    ).first()
+    
+    if not report:
+        raise HTTPException(status_code=404, detail=f"Your {year} year in review isn't ready yet")
+    
+    # Stored as JSON already, no need to decode and re-encode
+    return Response(content=report.data, media_type="application/json")
+
+
+@app.get("/reports/year-in-review/{year}/progress")
+def get_year_in_review_progress(
+    year: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get generation progress for a year's reports"""
+    job = db.query(ReportJob).filter(
+        ReportJob.report_type == YEAR_IN_REVIEW_REPORT,
+        ReportJob.year == year
+    ).first()
+    return job_progress(job)
+
+
+# ==================== PLATFORM ANALYTICS ====================
+# Served entirely from the snapshot tables written by analytics.py
+
+@app.get("/analytics/top-books")
+def get_top_finished_books(
+    days: int = 7,
+    limit: int = 10,
+    db: Session = Depends(get_db)
+):
+    """Get the most finished books over the last N days"""
+    since = datetime.utcnow().date() - timedelta(days=days)
+    total_finishes = func.sum(BookFinishSnapshot.finishes).label('finishes')
+    
+    rows = db.query(Book, total_finishes).join(
+        BookFinishSnapshot, BookFinishSnapshot.book_id == Book.id
+    ).filter(
+        BookFinishSnapshot.day >= since
+    ).group_by(Book.id).order_by(desc(total_finishes)).limit(limit).all()
+    
+    return [{
+        'book': {
+            'id': book.id,
+            'title': book.title,
+            'author': book.author,
+            'cover_url': book.cover_url,
+            'genre': book.genre
+        },
+        'finishes': finishes
+    } for book, finishes in rows]
+
+
+@app.get("/analytics/genres")
+def get_genre_share(
+    month: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get genre share of finished books for a month (YYYY-MM, defaults to current month)"""
+    month = month or datetime.utcnow().strftime("%Y-%m")
+    
+    rows = db.query(GenreShareSnapshot).filter(
+        GenreShareSnapshot.month == month
+    ).order_by(desc(GenreShareSnapshot.finishes)).all()
+    
+    return {
+        'month': month,
+        'genres': [{
+            'genre': row.genre,
+            'finishes': row.finishes,
+            'share': row.share
+        } for row in rows]
+    }
+
+
+@app.get("/analytics/overview")
+def get_platform_overview(db: Session = Depends(get_db)):
+    """Get the latest platform-wide reading snapshot"""
+    snapshot = db.query(PlatformSnapshot).order_by(desc(PlatformSnapshot.snapshot_date)).first()
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="No analytics snapshot available yet")
+    
+    return {
+        'snapshot_date': snapshot.snapshot_date.isoformat(),
+        'active_readers_7d': snapshot.active_readers_7d,
+        'active_readers_30d': snapshot.active_readers_30d,
+        'finishes_7d': snapshot.finishes_7d,
+        'finishes_30d': snapshot.finishes_30d,
+        'avg_days_per_book': snapshot.avg_days_per_book,
+        'avg_pages_per_day': snapshot.avg_pages_per_day,
+        'computed_at': snapshot.computed_at
+    }
+
+
+# ==================== COVERS ====================
+
+@app.get("/covers/{identifier}")
+def get_cover(identifier: str, request: Request, size: str = "medium"):
+    """Cached cover image by ISBN, Open Library cover id or edition OLID (thumb, medium or large)"""
+    if size not in COVER_SIZES:
+        raise HTTPException(status_code=400, detail=f"size must be one of {', '.join(COVER_SIZES)}")
+    try:
+        kind, value = parse_identifier(identifier)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        cover = cover_cache.get(identifier, size)
+    except Exception as e:
+        # Upstream trouble: let the browser fetch it from Open Library directly
+        print(f"Cover proxy error for {identifier}: {e}")
+        return RedirectResponse(cover_cache.upstream_url(kind, value, size), status_code=302)
+    if cover is None:
+        raise HTTPException(status_code=404, detail="Cover not found")
+    
+    path, etag = cover
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={COVER_MAX_AGE_SECONDS}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
+
+
+# ==================== SERVICE METRICS ====================
+
+@app.get("/metrics/book-search")
+def get_book_search_metrics():
+    """Cache hit ratios, HTTP pool settings, circuit breaker state, mirror hits and author lookups for external book APIs"""
+    return {
+        "cache": book_service.cache.metrics(),
+        "http": async_book_service.http.stats(),
+        "endpoints": upstream_endpoints.metrics(),
+        "mirror": book_service.mirror.metrics(),
+        "covers": cover_cache.metrics(),
+        "authors": book_service.authors.metrics(),
+    }
+
+@app.get("/health/trending")
+def get_trending_health():
+    """Age of the trending books snapshot"""
+    return trending_snapshot.health()
+
+
 # ==================== READING CIRCLES ====================
 
 def generate_invite_code(length: int = 8) -> str:
@@ -2103,10 +2481,11 @@ def get_circle_challenges(
             ).fetchone()
             
             if user_book:
+                buffered_page = progress_buffer.get(current_user.id, challenge.target_book_id)
                 user_library_status = {
                     "in_library": True,
                     "status": user_book.status,
-                    "current_page": user_book.current_page or 0,
+                    "current_page": (buffered_page if buffered_page is not None else user_book.current_page) or 0,
                     "rating": user_book.rating
                 }
             else:
@@ -2183,25 +2562,21 @@ def update_challenge_progress(
             current_value=0
         )
         db.add(progress)
+        db.flush()
     
-    old_value = progress.current_value
-    progress.current_value = max(0, value)
-    
-    # Check for completion
-    completed_now = False
     if challenge.challenge_type == 'book_race':
         book = db.query(Book).filter(Book.id == challenge.target_book_id).first()
         target = book.page_count if book and book.page_count else 0
     else:
         target = challenge.target_count or 0
     
-    if progress.current_value >= target and not progress.completed:
-        progress.completed = True
-        progress.completed_at = datetime.utcnow()
-        completed_now = True
-        
+    # Points come from the value this write replaced, not an earlier read, so
+    # concurrent updates can't award the same progress twice
+    old_value, new_value, completed_now = set_challenge_progress(db, progress.id, value, target)
+    
+    if completed_now:
         # Award bonus points
-        membership.circle_points += 50  # Completion bonus
+        award_points(db, current_user.id, 50, 'challenge_completed', circle_id=circle_id)  # Completion bonus
         
         # Create activity
         activity = CircleActivity(
@@ -2214,20 +2589,20 @@ def update_challenge_progress(
         db.add(activity)
     
     # Award points for progress
-    points_earned = max(0, progress.current_value - old_value)
+    points_earned = max(0, new_value - old_value)
     if challenge.challenge_type == 'book_race':
-        membership.circle_points += points_earned  # 1 point per page
+        award_points(db, current_user.id, points_earned, 'challenge_progress', circle_id=circle_id)  # 1 point per page
     else:
-        membership.circle_points += points_earned * 10  # 10 points per book/item
+        award_points(db, current_user.id, points_earned * 10, 'challenge_progress', circle_id=circle_id)  # 10 points per book/item
     
     # Create progress activity for significant updates
-    if progress.current_value - old_value >= 50 or completed_now:
+    if new_value - old_value >= 50 or completed_now:
         activity = CircleActivity(
             circle_id=circle_id,
             user_id=current_user.id,
             activity_type='progress_update',
             challenge_id=challenge_id,
-            content=f"made progress: now at {progress.current_value}"
+            content=f"made progress: now at {new_value}"
         )
         db.add(activity)
     
@@ -2283,7 +2658,8 @@ def sync_challenge_from_library(
     if not user_book:
         raise HTTPException(status_code=400, detail="Add this book to your library first")
     
-    library_page = user_book.current_page or 0
+    buffered_page = progress_buffer.get(current_user.id, challenge.target_book_id)
+    library_page = (buffered_page if buffered_page is not None else user_book.current_page) or 0
     
     # If the user has finished the book, set to max pages
     if user_book.status == 'read':
@@ -2304,23 +2680,20 @@ def sync_challenge_from_library(
             current_value=0
         )
         db.add(progress)
+        db.flush()
     
-    old_value = progress.current_value
+    book = db.query(Book).filter(Book.id == challenge.target_book_id).first()
+    target = book.page_count if book and book.page_count else 0
     
-    # Only update if library has more progress
-    if library_page > progress.current_value:
-        progress.current_value = library_page
-        
-        # Check for completion
-        book = db.query(Book).filter(Book.id == challenge.target_book_id).first()
-        target = book.page_count if book and book.page_count else 0
-        
-        completed_now = False
-        if progress.current_value >= target and not progress.completed:
-            progress.completed = True
-            progress.completed_at = datetime.utcnow()
-            completed_now = True
-            membership.circle_points += 50
+    # Only update if library has more progress; compare-and-set so a concurrent
+    # sync or update can't make both requests award the same pages
+    old_value, new_value, completed_now = set_challenge_progress(
+        db, progress.id, library_page, target, only_if_higher=True
+    )
+    
+    if new_value > old_value:
+        if completed_now:
+            award_points(db, current_user.id, 50, 'challenge_completed', circle_id=circle_id)
             
             activity = CircleActivity(
                 circle_id=circle_id,
@@ -2332,8 +2705,8 @@ def sync_challenge_from_library(
             db.add(activity)
         
         # Award points for progress
-        points_earned = max(0, progress.current_value - old_value)
-        membership.circle_points += points_earned
+        points_earned = new_value - old_value
+        award_points(db, current_user.id, points_earned, 'challenge_progress', circle_id=circle_id)
         
         db.commit()
         
@@ -2347,7 +2720,7 @@ def sync_challenge_from_library(
     
     return {
         "message": "Library progress is not ahead of challenge progress",
-        "current_value": progress.current_value,
+        "current_value": old_value,
         "library_page": library_page,
         "completed": progress.completed
     }
@@ -2461,6 +2834,39 @@ def update_book_rating(db: Session, book_id: int):
             Book.ratings_count: 0
         })
 
+def update_book_ratings(db: Session, book_ids):
+    """Recalculate average rating and count for many books with one aggregate query"""
+    book_ids = list(set(book_ids))
+    if not book_ids:
+        return
+    
+    aggregates = {
+        row.book_id: row
+        for row in db.execute(
+            select(
+                user_books.c.book_id,
+                func.avg(user_books.c.rating).label('avg_rating'),
+                func.count(user_books.c.rating).label('ratings_count')
+            ).where(
+                user_books.c.book_id.in_(book_ids),
+                user_books.c.rating.isnot(None)
+            ).group_by(user_books.c.book_id)
+        )
+    }
+    
+    books_table = Book.__table__
+    db.execute(
+        books_table.update().where(books_table.c.id == bindparam('b_id')).values(
+            average_rating=bindparam('b_avg'),
+            ratings_count=bindparam('b_count')
+        ),
+        [{
+            'b_id': book_id,
+            'b_avg': float(aggregates[book_id].avg_rating) if book_id in aggregates else 0.0,
+            'b_count': aggregates[book_id].ratings_count if book_id in aggregates else 0
+        } for book_id in book_ids]
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,538 @@
+"""
+Open Library Catalog Mirror
+Local SQLite copy of Open Library's bulk dumps (authors, works, editions)
+with an FTS5 index, so BookSearchService can answer searches, ISBN lookups
+and work details in milliseconds and only go to the network on a miss.
+
+Dumps are streamed line by line (gzip or plain; tab-separated dump rows or
+bare JSON lines) in fixed-size chunks. Chunks are parsed on a process pool
+with a bounded number in flight, and a single writer upserts the results,
+so memory stays flat however large the dump is. Each record type keeps a
+last_modified watermark: feeding a newer dump only rewrites what changed.
+A re-imported edition replaces its ISBNs, and a renamed author re-indexes
+the works that list it.
+
+Build or refresh the mirror (authors first so works get author names):
+    python ol_mirror.py ol_dump_authors.txt.gz ol_dump_works.txt.gz ol_dump_editions.txt.gz
+"""
+
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# SQLite file holding the mirror
+OL_MIRROR_PATH = os.getenv("OL_MIRROR_PATH", "./ol_mirror.db")
+# Parser processes used by the ingestion pipeline
+OL_MIRROR_WORKERS = int(os.getenv("OL_MIRROR_WORKERS", str(os.cpu_count() or 1)))
+# Dump lines per parse chunk (memory use is roughly chunk size x workers x 2)
+OL_MIRROR_CHUNK_LINES = int(os.getenv("OL_MIRROR_CHUNK_LINES", "5000"))
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS authors (key TEXT PRIMARY KEY, name TEXT, last_modified TEXT)",
+    "CREATE TABLE IF NOT EXISTS works ("
+    "id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, title TEXT, subtitle TEXT, author_keys TEXT, "
+    "author_names TEXT, subjects TEXT, description TEXT, first_publish_year INTEGER, cover_id INTEGER, "
+    "last_modified TEXT, dirty INTEGER NOT NULL DEFAULT 1)",
+    "CREATE INDEX IF NOT EXISTS ix_works_dirty ON works (dirty) WHERE dirty = 1",
+    "CREATE TABLE IF NOT EXISTS editions ("
+    "key TEXT PRIMARY KEY, work_key TEXT, title TEXT, isbns TEXT, publishers TEXT, publish_date TEXT, "
+    "number_of_pages INTEGER, cover_id INTEGER, last_modified TEXT)",
+    "CREATE INDEX IF NOT EXISTS ix_editions_work_key ON editions (work_key)",
+    "CREATE TABLE IF NOT EXISTS edition_isbns (isbn TEXT PRIMARY KEY, edition_key TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_edition_isbns_edition_key ON edition_isbns (edition_key)",
+    # Which works list which authors, so a renamed author re-indexes just those works
+    "CREATE TABLE IF NOT EXISTS work_authors (work_key TEXT NOT NULL, author_key TEXT NOT NULL, "
+    "PRIMARY KEY (work_key, author_key)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS ix_work_authors_author_key ON work_authors (author_key)",
+    "CREATE TABLE IF NOT EXISTS mirror_state (record_type TEXT PRIMARY KEY, last_modified TEXT)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS works_fts USING fts5 (title, authors, subjects, tokenize='unicode61 remove_diacritics 2')",
+]
+
+RECORD_TYPES = {'/type/author': 'authors', '/type/work': 'works', '/type/edition': 'editions'}
+
+_YEAR = re.compile(r'\d{4}')
+_YEAR_FILTER = re.compile(r'first_publish_year:\[(\*|\d{4}) TO (\*|\d{4})\]')
+_SUBJECT_FILTER = re.compile(r'subject:("[^"]+"|\S+)')
+_FIELD_FILTER = re.compile(r'\w+:\S+')
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+# ---------- parsing (runs in worker processes) ----------
+
+def _text(value) -> Optional[str]:
+    if isinstance(value, dict):
+        return value.get('value')
+    return value if isinstance(value, str) else None
+
+
+def _year(value) -> Optional[int]:
+    match = _YEAR.search(value or '') if isinstance(value, str) else None
+    return int(match.group()) if match else None
+
+
+def _first(values) -> Optional[int]:
+    """First positive cover id (-1 marks a deleted cover)"""
+    return next((v for v in values or [] if isinstance(v, int) and v > 0), None)
+
+
+def _parse_line(line: str) -> Optional[Tuple[str, Dict, str]]:
+    """(record type, record, last_modified) from a dump row or a JSON line"""
+    if line.startswith('{'):
+        data = json.loads(line)
+        record_type = (data.get('type') or {}).get('key')
+        last_modified = _text(data.get('last_modified')) or ''
+    else:
+        parts = line.rstrip('\n').split('\t', 4)
+        if len(parts) != 5:
+            return None
+        record_type, _, _, last_modified, raw = parts
+        data = json.loads(raw)
+    if record_type not in RECORD_TYPES or not data.get('key'):
+        return None
+    return RECORD_TYPES[record_type], data, last_modified
+
+
+def _parse_chunk(lines: List[str], since: Dict[str, str]) -> Dict:
+    """Rows to upsert for one chunk, skipping records at or below the watermarks"""
+    rows = {'authors': [], 'works': [], 'editions': [], 'isbns': [], 'errors': 0, 'skipped': 0, 'latest': {}}
+    for line in lines:
+        try:
+            parsed = _parse_line(line)
+        except ValueError:
+            rows['errors'] += 1
+            continue
+        if parsed is None:
+            continue
+        kind, data, last_modified = parsed
+        if last_modified and last_modified <= since.get(kind, ''):
+            rows['skipped'] += 1
+            continue
+        if last_modified > rows['latest'].get(kind, ''):
+            rows['latest'][kind] = last_modified
+
+        if kind == 'authors':
+            rows['authors'].append((data['key'], data.get('name') or data.get('personal_name'), last_modified))
+        elif kind == 'works':
+            author_keys = [
+                (a.get('author') or {}).get('key') if isinstance(a.get('author'), dict) else a.get('key')
+                for a in data.get('authors', []) if isinstance(a, dict)
+            ]
+            rows['works'].append((
+                data['key'], data.get('title'), data.get('subtitle'),
+                json.dumps([k for k in author_keys if k]), json.dumps((data.get('subjects') or [])[:25]),
+                _text(data.get('description')), _year(data.get('first_publish_date')),
+                _first(data.get('covers')), last_modified
+            ))
+        else:
+            isbns = [i.replace('-', '') for i in (data.get('isbn_13') or []) + (data.get('isbn_10') or []) if i]
+            work_key = ((data.get('works') or [{}])[0]).get('key')
+            rows['editions'].append((
+                data['key'], work_key, data.get('title'), json.dumps(isbns),
+                json.dumps((data.get('publishers') or [])[:3]), data.get('publish_date'),
+                data.get('number_of_pages') if isinstance(data.get('number_of_pages'), int) else None,
+                _first(data.get('covers')), last_modified
+            ))
+            rows['isbns'].extend((isbn, data['key']) for isbn in isbns)
+    return rows
+
+
+def _read_chunks(path: str, chunk_lines: int) -> Iterator[List[str]]:
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        chunk = []
+        for line in f:
+            chunk.append(line)
+            if len(chunk) >= chunk_lines:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+# ---------- mirror ----------
+
+class OpenLibraryMirror:
+    """Read/query side of the mirror plus the ingestion pipeline"""
+
+    def __init__(self, path: str = OL_MIRROR_PATH):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        return conn
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        """Shared read connection, opened once the mirror file exists (checked every 60s)"""
+        if self._conn is None and self.path and time.monotonic() - self._checked_at > 60:
+            self._checked_at = time.monotonic()
+            if os.path.exists(self.path):
+                try:
+                    self._conn = self._connect()
+                except sqlite3.Error as e:
+                    print(f"Open Library mirror unavailable ({self.path}): {e}")
+        return self._conn
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            conn = self._db()
+            if conn is None:
+                return []
+            try:
+                return conn.execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                print(f"Open Library mirror query error: {e}")
+                return []
+
+    def _count(self, found: bool):
+        with self._lock:
+            self.stats["hits" if found else "misses"] += 1
+
+    # ---------- lookups (Open Library-shaped results) ----------
+
+    def search_docs(self, query: str, limit: int) -> Optional[List[Dict]]:
+        """
+        search.json-style docs for a query, or None when the mirror can't
+        answer it (no mirror, unsupported filter, or no match)
+        """
+        if self._db() is None:
+            return None
+
+        text, years = query, None
+        match = _YEAR_FILTER.search(text)
+        if match:
+            years = (None if match.group(1) == '*' else int(match.group(1)),
+                     None if match.group(2) == '*' else int(match.group(2)))
+            text = text.replace(match.group(), ' ')
+        subjects = [s.strip('"') for s in _SUBJECT_FILTER.findall(text)]
+        text = _SUBJECT_FILTER.sub(' ', text)
+        if _FIELD_FILTER.search(text):
+            return None
+
+        terms = [f'"{word}"' for word in _WORD.findall(text)]
+        terms += [f'subjects : "{word}"' for subject in subjects for word in _WORD.findall(subject)]
+        if not terms:
+            return None
+
+        sql = (
+            "SELECT w.key, w.title, w.author_names, w.first_publish_year, w.cover_id, w.subjects "
+            "FROM works_fts JOIN works w ON w.id = works_fts.rowid WHERE works_fts MATCH ?"
+        )
+        params: list = [' AND '.join(terms)]
+        if years and years[0] is not None:
+            sql += " AND w.first_publish_year >= ?"
+            params.append(years[0])
+        if years and years[1] is not None:
+            sql += " AND w.first_publish_year <= ?"
+            params.append(years[1])
+        sql += " ORDER BY bm25(works_fts, 10.0, 5.0, 1.0) LIMIT ?"
+        params.append(limit)
+
+        rows = self._query(sql, params)
+        self._count(bool(rows))
+        if not rows:
+            return None
+
+        editions = self._editions_for([row[0] for row in rows])
+        return [self._doc(row, editions.get(row[0])) for row in rows]
+
+    def isbn_doc(self, isbn: str) -> Optional[Dict]:
+        """Doc for the edition with this ISBN, with the work's description"""
+        docs = self.isbn_docs([isbn])
+        return docs.get(isbn)
+
+    def isbn_docs(self, isbns: List[str]) -> Dict[str, Dict]:
+        """Docs keyed by ISBN for every ISBN the mirror knows"""
+        if not isbns or self._db() is None:
+            return {}
+        found = {}
+        for start in range(0, len(isbns), 500):
+            chunk = isbns[start:start + 500]
+            rows = self._query(
+                "SELECT i.isbn, e.key, e.title, e.isbns, e.publishers, e.publish_date, e.number_of_pages, "
+                "e.cover_id, w.key, w.title, w.author_names, w.first_publish_year, w.cover_id, w.subjects, w.description "
+                f"FROM edition_isbns i JOIN editions e ON e.key = i.edition_key LEFT JOIN works w ON w.key = e.work_key "
+                f"WHERE i.isbn IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            for row in rows:
+                doc = {
+                    'key': row[8] or row[1],
+                    'title': row[2] or row[9],
+                    'author_name': json.loads(row[10]) if row[10] else [],
+                    'first_publish_year': row[11] or _year(row[5]),
+                    'isbn': [row[0]],
+                    'cover_i': row[7] or row[12],
+                    'publisher': json.loads(row[4] or '[]'),
+                    'number_of_pages_median': row[6],
+                    'subject': json.loads(row[13] or '[]'),
+                    'description': row[14],
+                }
+                found[row[0]] = doc
+        with self._lock:
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(isbns) - len(found)
+        return found
+
+    def work(self, key: str) -> Optional[Dict]:
+        """Work record in the shape of /works/{id}.json"""
+        if self._db() is None:
+            return None
+        rows = self._query(
+            "SELECT w.title, w.description, w.author_keys, w.subjects, "
+            "(SELECT MIN(e.publish_date) FROM editions e WHERE e.work_key = w.key), "
+            "(SELECT e.publishers FROM editions e WHERE e.work_key = w.key LIMIT 1), "
+            "(SELECT MAX(e.number_of_pages) FROM editions e WHERE e.work_key = w.key) "
+            "FROM works w WHERE w.key = ?",
+            (key,)
+        )
+        self._count(bool(rows))
+        if not rows:
+            return None
+        title, description, author_keys, subjects, publish_date, publishers, pages = rows[0]
+        return {
+            'title': title,
+            'description': description,
+            'authors': [{'author': {'key': k}} for k in json.loads(author_keys or '[]')],
+            'subjects': json.loads(subjects or '[]'),
+            'publish_date': publish_date,
+            'publishers': json.loads(publishers or '[]'),
+            'number_of_pages': pages,
+        }
+
+    def author_names(self, keys: List[str]) -> Dict[str, str]:
+        """Names keyed by author key (/authors/OL..A) for every author the mirror knows"""
+        if not keys or self._db() is None:
+            return {}
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._query(
+                f"SELECT key, name FROM authors WHERE key IN ({','.join('?' * len(chunk))}) AND name IS NOT NULL",
+                chunk
+            )
+            found.update({key: name for key, name in rows})
+        with self._lock:
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(keys) - len(found)
+        return found
+
+    def _editions_for(self, work_keys: List[str]) -> Dict[str, Tuple]:
+        """One representative edition per work, preferring one with an ISBN-13"""
+        rows = self._query(
+            f"SELECT work_key, isbns, publishers, number_of_pages FROM editions "
+            f"WHERE work_key IN ({','.join('?' * len(work_keys))})",
+            work_keys
+        )
+        best: Dict[str, Tuple] = {}
+        for work_key, isbns, publishers, pages in rows:
+            isbns = json.loads(isbns or '[]')
+            rank = (any(len(i) == 13 for i in isbns), bool(isbns), pages is not None)
+            if work_key not in best or rank > best[work_key][0]:
+                best[work_key] = (rank, isbns, json.loads(publishers or '[]'), pages)
+        return best
+
+    def _doc(self, row: Tuple, edition: Optional[Tuple]) -> Dict:
+        key, title, author_names, year, cover_id, subjects = row
+        _, isbns, publishers, pages = edition or (None, [], [], None)
+        return {
+            'key': key,
+            'title': title,
+            'author_name': json.loads(author_names) if author_names else [],
+            'first_publish_year': year,
+            'isbn': isbns,
+            'cover_i': cover_id,
+            'publisher': publishers,
+            'number_of_pages_median': pages,
+            'subject': json.loads(subjects or '[]'),
+        }
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        return {"available": self._conn is not None, **stats}
+
+    # ---------- ingestion ----------
+
+    def ingest(self, paths: List[str], workers: int = OL_MIRROR_WORKERS, chunk_lines: int = OL_MIRROR_CHUNK_LINES) -> Dict:
+        """Stream dump files into the mirror; only records newer than the watermarks are written"""
+        conn = self._connect()
+        conn.execute("PRAGMA synchronous=OFF")
+        since = dict(conn.execute("SELECT record_type, last_modified FROM mirror_state").fetchall())
+        self._fill_work_authors(conn)
+        summary = {"authors": 0, "works": 0, "editions": 0, "skipped": 0, "errors": 0}
+        latest = dict(since)
+
+        def apply(rows: Dict):
+            self._write(conn, rows)
+            for kind in ('authors', 'works', 'editions', 'skipped', 'errors'):
+                summary[kind] += rows[kind] if isinstance(rows[kind], int) else len(rows[kind])
+            for kind, value in rows['latest'].items():
+                if value > latest.get(kind, ''):
+                    latest[kind] = value
+
+        try:
+            for path in paths:
+                started = time.monotonic()
+                if workers > 1:
+                    with ProcessPoolExecutor(max_workers=workers) as pool:
+                        in_flight = deque()
+                        for chunk in _read_chunks(path, chunk_lines):
+                            in_flight.append(pool.submit(_parse_chunk, chunk, since))
+                            # Bounded: never more than 2 chunks per worker waiting
+                            if len(in_flight) >= workers * 2:
+                                apply(in_flight.popleft().result())
+                        while in_flight:
+                            apply(in_flight.popleft().result())
+                else:
+                    for chunk in _read_chunks(path, chunk_lines):
+                        apply(_parse_chunk(chunk, since))
+                conn.commit()
+                print(f"Open Library mirror: {path} done in {time.monotonic() - started:.1f}s ({summary})")
+
+            summary["indexed"] = self._index_dirty_works(conn)
+            conn.executemany(
+                "INSERT INTO mirror_state (record_type, last_modified) VALUES (?, ?) "
+                "ON CONFLICT(record_type) DO UPDATE SET last_modified = excluded.last_modified",
+                list(latest.items())
+            )
+            conn.commit()
+            return summary
+        finally:
+            conn.close()
+            # Make readers reopen and see the new data
+            with self._lock:
+                if self._conn is not None:
+                    self._conn.close()
+                self._conn = None
+                self._checked_at = 0.0
+
+    def _fill_work_authors(self, conn: sqlite3.Connection):
+        """Mirrors built before work_authors existed get it from works.author_keys once"""
+        if conn.execute("SELECT 1 FROM work_authors LIMIT 1").fetchone() or \
+                not conn.execute("SELECT 1 FROM works LIMIT 1").fetchone():
+            return
+        conn.execute(
+            "INSERT OR IGNORE INTO work_authors (work_key, author_key) "
+            "SELECT works.key, author.value FROM works, json_each(works.author_keys) AS author"
+        )
+        conn.commit()
+
+    def _renamed_authors(self, conn: sqlite3.Connection, authors: List[Tuple]) -> List[str]:
+        """Keys of incoming authors that are new or whose name differs from the stored one"""
+        keys = [row[0] for row in authors]
+        stored = {}
+        for start in range(0, len(keys), 900):
+            chunk = keys[start:start + 900]
+            stored.update(conn.execute(
+                f"SELECT key, name FROM authors WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        return [key for key, name, _ in authors if key not in stored or stored[key] != name]
+
+    def _write(self, conn: sqlite3.Connection, rows: Dict):
+        if rows['authors']:
+            renamed = self._renamed_authors(conn, rows['authors'])
+            conn.executemany(
+                "INSERT INTO authors (key, name, last_modified) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET name = excluded.name, last_modified = excluded.last_modified",
+                rows['authors']
+            )
+            # Their works' stored author names and FTS rows are rebuilt by _index_dirty_works
+            conn.executemany(
+                "UPDATE works SET dirty = 1 WHERE dirty = 0 AND key IN "
+                "(SELECT work_key FROM work_authors WHERE author_key = ?)",
+                [(key,) for key in renamed]
+            )
+        if rows['works']:
+            conn.executemany(
+                "INSERT INTO works (key, title, subtitle, author_keys, subjects, description, first_publish_year, "
+                "cover_id, last_modified, dirty) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1) "
+                "ON CONFLICT(key) DO UPDATE SET title = excluded.title, subtitle = excluded.subtitle, "
+                "author_keys = excluded.author_keys, subjects = excluded.subjects, description = excluded.description, "
+                "first_publish_year = COALESCE(excluded.first_publish_year, works.first_publish_year), "
+                "cover_id = excluded.cover_id, last_modified = excluded.last_modified, dirty = 1",
+                rows['works']
+            )
+            conn.executemany("DELETE FROM work_authors WHERE work_key = ?", [(row[0],) for row in rows['works']])
+            conn.executemany(
+                "INSERT OR IGNORE INTO work_authors (work_key, author_key) VALUES (?, ?)",
+                [(row[0], author) for row in rows['works'] for author in json.loads(row[3])]
+            )
+        if rows['editions']:
+            # A re-imported edition's ISBN list replaces the old one; retired ISBNs must stop resolving
+            conn.executemany("DELETE FROM edition_isbns WHERE edition_key = ?", [(row[0],) for row in rows['editions']])
+            conn.executemany(
+                "INSERT INTO editions (key, work_key, title, isbns, publishers, publish_date, number_of_pages, "
+                "cover_id, last_modified) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET work_key = excluded.work_key, title = excluded.title, "
+                "isbns = excluded.isbns, publishers = excluded.publishers, publish_date = excluded.publish_date, "
+                "number_of_pages = excluded.number_of_pages, cover_id = excluded.cover_id, "
+                "last_modified = excluded.last_modified",
+                rows['editions']
+            )
+            # Works without a first_publish_date take their earliest edition year
+            conn.executemany(
+                "UPDATE works SET first_publish_year = ? WHERE key = ? "
+                "AND (first_publish_year IS NULL OR first_publish_year > ?)",
+                [(year, row[1], year) for row in rows['editions'] if row[1] for year in [_year(row[5])] if year]
+            )
+        if rows['isbns']:
+            conn.executemany("INSERT OR REPLACE INTO edition_isbns (isbn, edition_key) VALUES (?, ?)", rows['isbns'])
+
+    def _index_dirty_works(self, conn: sqlite3.Connection, batch_size: int = 5000) -> int:
+        """(Re)build FTS rows for new or changed works, resolving author names"""
+        indexed = 0
+        while True:
+            rows = conn.execute(
+                "SELECT id, title, subtitle, author_keys, subjects FROM works WHERE dirty = 1 LIMIT ?", (batch_size,)
+            ).fetchall()
+            if not rows:
+                return indexed
+            author_keys = sorted({k for row in rows for k in json.loads(row[3] or '[]')})
+            names = {}
+            for start in range(0, len(author_keys), 900):
+                chunk = author_keys[start:start + 900]
+                names.update(conn.execute(
+                    f"SELECT key, name FROM authors WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall())
+
+            ids = [row[0] for row in rows]
+            conn.execute(f"DELETE FROM works_fts WHERE rowid IN ({','.join('?' * len(ids))})", ids)
+            fts_rows, name_rows = [], []
+            for work_id, title, subtitle, keys, subjects in rows:
+                author_names = [names[k] for k in json.loads(keys or '[]') if names.get(k)]
+                fts_rows.append((
+                    work_id, ' '.join(filter(None, [title, subtitle])), ' '.join(author_names),
+                    ' '.join(json.loads(subjects or '[]'))
+                ))
+                name_rows.append((json.dumps(author_names), work_id))
+            conn.executemany("INSERT INTO works_fts (rowid, title, authors, subjects) VALUES (?, ?, ?, ?)", fts_rows)
+            conn.executemany("UPDATE works SET author_names = ?, dirty = 0 WHERE id = ?", name_rows)
+            conn.commit()
+            indexed += len(rows)
+
+
+# Singleton instance
+ol_mirror = OpenLibraryMirror()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    print(f"Open Library mirror: {ol_mirror.ingest(sys.argv[1:])}")
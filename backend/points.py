@@ -0,0 +1,108 @@
+"""
+Points Ledger
+Awards are appended to points_ledger and applied to the balance with a single
+atomic UPDATE (points = points + :n), so concurrent requests never lose an
+increment and no ORM read-modify-write holds the user row
+"""
+
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from database import User, CircleMember, PointsLedgerEntry, ChallengeProgress
+
+users_table = User.__table__
+members_table = CircleMember.__table__
+ledger_table = PointsLedgerEntry.__table__
+progress_table = ChallengeProgress.__table__
+
+
+def award_points(
+    db: Session,
+    user_id: int,
+    points: int,
+    reason: str,
+    book_id: Optional[int] = None,
+    circle_id: Optional[int] = None
+) -> int:
+    """
+    Add points to a user's balance, or to their circle balance when circle_id is set.
+    Negative awards never take a balance below zero; returns the points applied.
+    """
+    return award_points_many(db, user_id, [(points, reason, book_id)], circle_id=circle_id)
+
+
+def award_points_many(
+    db: Session,
+    user_id: int,
+    awards: List[Tuple[int, str, Optional[int]]],
+    circle_id: Optional[int] = None
+) -> int:
+    """
+    Apply several (points, reason, book_id) awards with one balance UPDATE and
+    one ledger executemany, keeping a ledger row per award. Returns the points applied.
+    """
+    awards = [(points, reason, book_id) for points, reason, book_id in awards if points]
+    points = sum(award[0] for award in awards)
+    if not awards:
+        return 0
+
+    if circle_id is None:
+        balance = users_table.c.points
+        stmt = users_table.update().where(users_table.c.id == user_id).values(points=balance + points)
+    else:
+        balance = members_table.c.circle_points
+        stmt = members_table.update().where(
+            members_table.c.circle_id == circle_id,
+            members_table.c.user_id == user_id
+        ).values(circle_points=balance + points)
+
+    if points < 0:
+        stmt = stmt.where(balance + points >= 0)
+
+    if db.execute(stmt).rowcount == 0:
+        return 0
+
+    db.execute(ledger_table.insert(), [
+        {'user_id': user_id, 'circle_id': circle_id, 'points': amount, 'reason': reason, 'book_id': book_id}
+        for amount, reason, book_id in awards
+    ])
+    return points
+
+
+def set_challenge_progress(
+    db: Session,
+    progress_id: int,
+    value: int,
+    target: int,
+    only_if_higher: bool = False
+) -> Tuple[int, int, bool]:
+    """
+    Compare-and-set a member's challenge progress; returns (old, new, completed_now).
+    The old value is the one this UPDATE actually replaced, so two concurrent
+    updates can't both award the same pages or the completion bonus.
+    """
+    value = max(0, value)
+    while True:
+        row = db.execute(
+            select(progress_table.c.current_value, progress_table.c.completed)
+            .where(progress_table.c.id == progress_id)
+        ).one()
+        old = row.current_value or 0
+        if only_if_higher and value <= old:
+            return old, old, False
+
+        now = datetime.utcnow()
+        completed_now = value >= target and not row.completed
+        values = {'current_value': value, 'updated_at': now}
+        if completed_now:
+            values.update(completed=True, completed_at=now)
+        stmt = progress_table.update().where(
+            progress_table.c.id == progress_id,
+            func.coalesce(progress_table.c.current_value, 0) == old,
+            func.coalesce(progress_table.c.completed, False) == bool(row.completed)
+        ).values(**values)
+        if db.execute(stmt).rowcount:
+            return old, value, completed_now
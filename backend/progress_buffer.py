@@ -0,0 +1,133 @@
+"""
+Reading Progress Write-Behind Buffer
+The reader UI reports the current page every few seconds; most of those
+writes are overwritten almost immediately. Updates are kept in memory (latest
+page per user/book) and flushed to user_books in batches.
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, select, tuple_
+
+from database import SessionLocal, user_books
+from library_sync import next_library_revisions
+
+# Seconds between background flushes
+PROGRESS_FLUSH_INTERVAL_SECONDS = float(os.getenv("PROGRESS_FLUSH_INTERVAL_SECONDS", "5"))
+# Flush early once this many (user, book) pairs are pending
+PROGRESS_FLUSH_THRESHOLD = int(os.getenv("PROGRESS_FLUSH_THRESHOLD", "500"))
+
+
+class ProgressBuffer:
+    """Coalesces current_page updates per (user_id, book_id)"""
+
+    def __init__(self, flush_threshold: int = PROGRESS_FLUSH_THRESHOLD):
+        self.flush_threshold = flush_threshold
+        self._pending: Dict[Tuple[int, int], int] = {}
+        # Entries taken by a flush that hasn't committed yet; still visible to readers
+        self._inflight: Dict[Tuple[int, int], int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._on_threshold = None
+
+    def set_threshold_callback(self, callback):
+        """Called (without blocking the request) when the threshold is reached"""
+        self._on_threshold = callback
+
+    def record(self, user_id: int, book_id: int, current_page: int):
+        with self._lock:
+            self._pending[(user_id, book_id)] = current_page
+            size = len(self._pending)
+        if size >= self.flush_threshold and self._on_threshold:
+            self._on_threshold()
+
+    def get(self, user_id: int, book_id: int) -> Optional[int]:
+        """Buffered page for a book, or None if nothing is waiting to be written"""
+        key = (user_id, book_id)
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+            return self._inflight.get(key)
+
+    def pending_for_user(self, user_id: int) -> Dict[int, int]:
+        """All buffered pages for a user, keyed by book_id"""
+        with self._lock:
+            pages = {book_id: page for (uid, book_id), page in self._inflight.items() if uid == user_id}
+            pages.update({book_id: page for (uid, book_id), page in self._pending.items() if uid == user_id})
+        return pages
+
+    def discard(self, user_id: int, book_id: int):
+        """
+        Drop a buffered update (e.g. the book was removed from the library),
+        including one a running flush has taken but not written yet
+        """
+        with self._lock:
+            self._pending.pop((user_id, book_id), None)
+            self._inflight.pop((user_id, book_id), None)
+
+    def flush(self) -> int:
+        """Write every pending update in one executemany; returns rows written"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._inflight = self._pending
+                self._pending = {}
+                batch = self._inflight
+                keys = list(batch)
+
+            db = SessionLocal()
+            try:
+                # Pages for books that aren't (or are no longer) in the library change
+                # nothing, so they must not bump the user's revision either
+                present = self._present(db, keys)
+                with self._lock:
+                    # discard() may have dropped some since they were taken
+                    pages = {key: batch[key] for key in present if key in batch}
+                present = list(pages)
+                if present:
+                    revisions = next_library_revisions(db, [user_id for user_id, _ in present])
+                    db.execute(
+                        user_books.update().where(
+                            user_books.c.user_id == bindparam('b_user_id'),
+                            user_books.c.book_id == bindparam('b_book_id')
+                        ).values(current_page=bindparam('b_page'), revision=bindparam('b_revision')),
+                        [
+                            {'b_user_id': user_id, 'b_book_id': book_id, 'b_page': pages[(user_id, book_id)],
+                             'b_revision': revisions[user_id]}
+                            for user_id, book_id in present
+                        ]
+                    )
+                db.commit()
+            except Exception:
+                db.rollback()
+                # Put the batch back (minus discarded entries) unless a newer value arrived meanwhile
+                with self._lock:
+                    for key, page in batch.items():
+                        self._pending.setdefault(key, page)
+                raise
+            finally:
+                db.close()
+                with self._lock:
+                    self._inflight = {}
+
+            return len(present)
+
+    def _present(self, db, keys: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """The given (user_id, book_id) pairs that have a library row"""
+        present = []
+        # Two bound parameters per pair, kept well under SQLite's limit
+        for start in range(0, len(keys), 450):
+            rows = db.execute(
+                select(user_books.c.user_id, user_books.c.book_id).where(
+                    tuple_(user_books.c.user_id, user_books.c.book_id).in_(keys[start:start + 450])
+                )
+            )
+            present.extend((row.user_id, row.book_id) for row in rows)
+        return present
+
+
+# Singleton instance
+progress_buffer = ProgressBuffer()
@@ -0,0 +1,160 @@
+"""
+Reading Statistics
+Aggregates a user's library rows into the chart data used by /stats/detailed
+and the year-in-review reports
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+def summarize_reading(
+    user_book_entries: List,
+    books_dict: Dict[int, object],
+    reading_goal: Optional[int] = None,
+    reading_goal_year: Optional[int] = None
+) -> Dict:
+    """
+    Build reading statistics from user_books rows and their books
+    books_dict maps book_id -> Book
+    """
+    # Initialize stats
+    stats = {
+        "overview": {
+            "total_books": len(user_book_entries),
+            "books_read": 0,
+            "currently_reading": 0,
+            "want_to_read": 0,
+            "total_pages": 0,
+            "total_ratings": 0,
+            "total_reviews": 0,
+            "average_rating_given": 0,
+        },
+        "books_by_month": {},  # { "2024-01": 5, "2024-02": 3, ... }
+        "books_by_year": {},   # { "2024": 20, "2023": 15, ... }
+        "pages_by_month": {},  # { "2024-01": 1500, ... }
+        "genres": {},          # { "Fiction": 10, "Mystery": 5, ... }
+        "ratings_distribution": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0},
+        "authors": {},         # { "Author Name": 3, ... }
+        "reading_pace": {
+            "avg_days_per_book": None,
+            "fastest_read": None,
+            "slowest_read": None,
+        },
+        "publication_years": {},  # { "2020": 5, "2019": 3, ... }
+        "monthly_goal_progress": [],  # [{ month: "Jan", target: 4, actual: 5 }, ...]
+    }
+    
+    ratings_sum = 0
+    ratings_count = 0
+    reading_times = []  # List of days taken to read books
+    
+    for ub in user_book_entries:
+        book = books_dict.get(ub.book_id)
+        if not book:
+            continue
+            
+        # Overview counts
+        if ub.status == 'read':
+            stats["overview"]["books_read"] += 1
+            if book.page_count:
+                stats["overview"]["total_pages"] += book.page_count
+        elif ub.status == 'currently_reading':
+            stats["overview"]["currently_reading"] += 1
+        elif ub.status == 'want_to_read':
+            stats["overview"]["want_to_read"] += 1
+            
+        if ub.rating:
+            stats["overview"]["total_ratings"] += 1
+            ratings_sum += ub.rating
+            ratings_count += 1
+            # Ratings distribution (round to nearest int for distribution)
+            rating_key = min(5, max(1, round(ub.rating)))
+            stats["ratings_distribution"][rating_key] += 1
+            
+        if ub.review:
+            stats["overview"]["total_reviews"] += 1
+            
+        # Books by month/year (based on finished_at for read books, fallback to added_at)
+        if ub.status == 'read':
+            # Use finished_at if available, otherwise fall back to added_at
+            date_to_use = ub.finished_at or ub.added_at
+            if date_to_use:
+                month_key = date_to_use.strftime("%Y-%m")
+                year_key = str(date_to_use.year)
+                
+                stats["books_by_month"][month_key] = stats["books_by_month"].get(month_key, 0) + 1
+                stats["books_by_year"][year_key] = stats["books_by_year"].get(year_key, 0) + 1
+                
+                if book.page_count:
+                    stats["pages_by_month"][month_key] = stats["pages_by_month"].get(month_key, 0) + book.page_count
+                    
+            # Calculate reading time (only if both dates exist)
+            if ub.started_at and ub.finished_at:
+                days = (ub.finished_at - ub.started_at).days
+                if days >= 0:
+                    reading_times.append({
+                        "days": days,
+                        "title": book.title,
+                        "pages": book.page_count
+                    })
+        
+        # Genre breakdown
+        if book.genre:
+            stats["genres"][book.genre] = stats["genres"].get(book.genre, 0) + 1
+            
+        # Author breakdown (top authors)
+        if book.author:
+            # Handle multiple authors
+            primary_author = book.author.split(',')[0].strip()
+            stats["authors"][primary_author] = stats["authors"].get(primary_author, 0) + 1
+            
+        # Publication years
+        if book.published_year:
+            year_key = str(book.published_year)
+            stats["publication_years"][year_key] = stats["publication_years"].get(year_key, 0) + 1
+    
+    # Calculate averages
+    if ratings_count > 0:
+        stats["overview"]["average_rating_given"] = round(ratings_sum / ratings_count, 2)
+        
+    # Reading pace
+    if reading_times:
+        avg_days = sum(rt["days"] for rt in reading_times) / len(reading_times)
+        stats["reading_pace"]["avg_days_per_book"] = round(avg_days, 1)
+        
+        # Sort by days
+        sorted_times = sorted(reading_times, key=lambda x: x["days"])
+        if sorted_times:
+            stats["reading_pace"]["fastest_read"] = {
+                "title": sorted_times[0]["title"],
+                "days": sorted_times[0]["days"]
+            }
+            stats["reading_pace"]["slowest_read"] = {
+                "title": sorted_times[-1]["title"],
+                "days": sorted_times[-1]["days"]
+            }
+    
+    # Sort and limit authors (top 10)
+    stats["authors"] = dict(
+        sorted(stats["authors"].items(), key=lambda x: x[1], reverse=True)[:10]
+    )
+    
+    # Sort months chronologically
+    stats["books_by_month"] = dict(sorted(stats["books_by_month"].items()))
+    stats["pages_by_month"] = dict(sorted(stats["pages_by_month"].items()))
+    
+    # Generate monthly goal progress for current year
+    current_year = datetime.now().year
+    if reading_goal and reading_goal_year == current_year:
+        monthly_target = reading_goal / 12
+        for month in range(1, 13):
+            month_key = f"{current_year}-{month:02d}"
+            actual = stats["books_by_month"].get(month_key, 0)
+            stats["monthly_goal_progress"].append({
+                "month": datetime(current_year, month, 1).strftime("%b"),
+                "target": round(monthly_target, 1),
+                "actual": actual
+            })
+    
+    return stats
@@ -0,0 +1,348 @@
+"""
+External API Resilience
+Per-endpoint guards for calls to Open Library, NYT and ISBNdb:
+- a circuit breaker that fails fast after repeated errors and lets a single
+  probe through once the cool-down has passed
+- a timeout derived from the endpoint's observed p95 latency instead of a
+  fixed 10 s
+- hedged requests: when a GET is slower than the p95, a second identical
+  request is sent and whichever answers first wins
+Works for blocking calls (threads) and coroutines. Hedged blocking calls
+race both attempts on a small bounded pool under one deadline; when the
+pool is busy the call runs unhedged on the caller's thread.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import requests
+
+# Consecutive failures that open a circuit
+RESILIENCE_FAILURE_THRESHOLD = int(os.getenv("RESILIENCE_FAILURE_THRESHOLD", "5"))
+# Seconds an open circuit rejects calls before letting a probe through
+RESILIENCE_RESET_SECONDS = float(os.getenv("RESILIENCE_RESET_SECONDS", "30"))
+# Adaptive timeout = p95 latency x multiplier, clamped to [min, max] seconds
+RESILIENCE_TIMEOUT_MULTIPLIER = float(os.getenv("RESILIENCE_TIMEOUT_MULTIPLIER", "3"))
+RESILIENCE_TIMEOUT_MIN_SECONDS = float(os.getenv("RESILIENCE_TIMEOUT_MIN_SECONDS", "1"))
+RESILIENCE_TIMEOUT_MAX_SECONDS = float(os.getenv("RESILIENCE_TIMEOUT_MAX_SECONDS", "10"))
+# Latency samples kept per endpoint, and how many are needed before adapting
+RESILIENCE_LATENCY_WINDOW = int(os.getenv("RESILIENCE_LATENCY_WINDOW", "200"))
+RESILIENCE_MIN_SAMPLES = int(os.getenv("RESILIENCE_MIN_SAMPLES", "20"))
+# Send a backup request when the first is slower than the p95 ("false" disables)
+RESILIENCE_HEDGING = os.getenv("RESILIENCE_HEDGING", "true").lower() == "true"
+# Attempts of hedged blocking calls in flight at once (a hedge takes two); beyond that calls aren't hedged
+RESILIENCE_HEDGE_WORKERS = int(os.getenv("RESILIENCE_HEDGE_WORKERS", "8"))
+
+# Circuit states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit is open"""
+
+    def __init__(self, endpoint: str):
+        super().__init__(f"Circuit open for {endpoint}")
+        self.endpoint = endpoint
+
+
+class UpstreamServerError(Exception):
+    """5xx response; counts against the breaker like a timeout"""
+
+
+def check_server_error(status_code: int, url: str):
+    """4xx answers mean the upstream is healthy; only 5xx count as failures"""
+    if status_code >= 500:
+        raise UpstreamServerError(f"{status_code} from {url}")
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open probe -> closed"""
+
+    def __init__(self, failure_threshold: int = RESILIENCE_FAILURE_THRESHOLD, reset_seconds: float = RESILIENCE_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                # Exactly one probe while half-open
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+    def is_probing(self) -> bool:
+        with self._lock:
+            return self.state == HALF_OPEN
+
+
+class LatencyWindow:
+    """Rolling window of call latencies"""
+
+    def __init__(self, size: int = RESILIENCE_LATENCY_WINDOW):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """None until RESILIENCE_MIN_SAMPLES calls have been observed"""
+        with self._lock:
+            if len(self._samples) < RESILIENCE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+class HedgePool:
+    """
+    Bounded pool for the attempts of hedged blocking calls. An attempt that
+    finds every slot busy is refused rather than queued, so a burst of slow
+    calls can't pile up threads.
+    """
+
+    def __init__(self, workers: int = RESILIENCE_HEDGE_WORKERS):
+        self.workers = max(2, workers)
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hedge")
+
+    def submit(self, fn: Callable, *args) -> Optional[Future]:
+        """Run fn on the pool, or return None when every slot is busy"""
+        if not self._slots.acquire(blocking=False):
+            return None
+        future = self._pool.submit(fn, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+
+# Shared by every endpoint
+_hedges = HedgePool()
+
+
+class Endpoint:
+    """Breaker + adaptive timeout + hedging for one upstream endpoint"""
+
+    def __init__(self, name: str, max_timeout: float = RESILIENCE_TIMEOUT_MAX_SECONDS, hedge: bool = RESILIENCE_HEDGING):
+        self.name = name
+        self.max_timeout = max_timeout
+        self.hedge = hedge
+        self.breaker = CircuitBreaker()
+        self.latency = LatencyWindow()
+        self._stats_lock = threading.Lock()
+        self.stats = {"calls": 0, "failures": 0, "hedged": 0, "hedge_wins": 0, "hedges_skipped": 0}
+
+    def timeout(self) -> float:
+        p95 = self.latency.percentile(0.95)
+        if p95 is None or self.breaker.is_probing():
+            # Not enough data yet, or a recovery probe: allow the full budget
+            return self.max_timeout
+        return min(self.max_timeout, max(RESILIENCE_TIMEOUT_MIN_SECONDS, p95 * RESILIENCE_TIMEOUT_MULTIPLIER))
+
+    def hedge_delay(self) -> Optional[float]:
+        if not self.hedge or self.breaker.is_probing():
+            return None
+        return self.latency.percentile(0.95)
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def _finish(self, started: float, ok: bool):
+        self.latency.add(time.monotonic() - started)
+        if ok:
+            self.breaker.record_success()
+        else:
+            self._count("failures")
+            self.breaker.record_failure()
+
+    def call(self, request: Callable[[float], Any], max_timeout: Optional[float] = None) -> Any:
+        """Run request(timeout) under this endpoint's guards"""
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.name)
+        self._count("calls")
+        timeout = min(self.timeout(), max_timeout or self.max_timeout)
+        hedge_after = self.hedge_delay()
+        started = time.monotonic()
+        try:
+            if hedge_after is None or hedge_after >= timeout:
+                result = request(timeout)
+            else:
+                result = self._hedged(request, timeout, hedge_after)
+        except Exception:
+            self._finish(started, ok=False)
+            raise
+        self._finish(started, ok=True)
+        return result
+
+    def _hedged(self, request: Callable[[float], Any], timeout: float, hedge_after: float) -> Any:
+        """
+        The primary runs on the hedge pool; if it hasn't answered after
+        hedge_after a backup joins it and whichever succeeds first wins, both
+        within the one timeout. A blocking request can't be interrupted, so
+        the loser finishes in the background under its own timeout. With the
+        pool full the call runs unhedged on the caller's thread.
+        """
+        deadline = time.monotonic() + timeout
+        primary = _hedges.submit(request, timeout)
+        if primary is None:
+            self._count("hedges_skipped")
+            return request(timeout)
+
+        done, _ = wait({primary}, timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        backup = _hedges.submit(request, max(deadline - time.monotonic(), 0.001))
+        if backup is None:
+            self._count("hedges_skipped")
+            pending = {primary}
+        else:
+            self._count("hedged")
+            pending = {primary, backup}
+
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"{self.name} timed out after {timeout}s")
+            for attempt in done:
+                if attempt.exception() is None:
+                    if attempt is backup:
+                        self._count("hedge_wins")
+                    return attempt.result()
+                error = attempt.exception()
+        raise error
+
+    async def acall(self, request: Callable[[float], Awaitable[Any]], max_timeout: Optional[float] = None) -> Any:
+        """Coroutine version of call(); the losing hedge is cancelled"""
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.name)
+        self._count("calls")
+        timeout = min(self.timeout(), max_timeout or self.max_timeout)
+        hedge_after = self.hedge_delay()
+        started = time.monotonic()
+        try:
+            if hedge_after is None or hedge_after >= timeout:
+                result = await asyncio.wait_for(request(timeout), timeout)
+            else:
+                result = await self._ahedged(request, timeout, hedge_after)
+        except Exception:
+            self._finish(started, ok=False)
+            raise
+        self._finish(started, ok=True)
+        return result
+
+    async def _ahedged(self, request: Callable[[float], Awaitable[Any]], timeout: float, hedge_after: float) -> Any:
+        primary = asyncio.ensure_future(request(timeout))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        self._count("hedged")
+        backup = asyncio.ensure_future(request(timeout))
+        pending = {primary, backup}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError(f"{self.name} timed out after {timeout}s")
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in (primary, backup):
+                task.cancel()
+
+    def metrics(self) -> Dict:
+        p50 = self.latency.percentile(0.5)
+        p95 = self.latency.percentile(0.95)
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "times_opened": self.breaker.times_opened,
+            "rejected": self.breaker.rejected,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "timeout_seconds": round(self.timeout(), 3),
+            **stats,
+        }
+
+
+class EndpointRegistry:
+    """Endpoints by name, created on first use"""
+
+    def __init__(self):
+        self._endpoints: Dict[str, Endpoint] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, max_timeout: float = RESILIENCE_TIMEOUT_MAX_SECONDS, hedge: bool = RESILIENCE_HEDGING) -> Endpoint:
+        """Settings only apply when the endpoint is first created"""
+        with self._lock:
+            endpoint = self._endpoints.get(name)
+            if endpoint is None:
+                endpoint = self._endpoints[name] = Endpoint(name, max_timeout=max_timeout, hedge=hedge)
+            return endpoint
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            endpoints = dict(self._endpoints)
+        return {name: endpoint.metrics() for name, endpoint in sorted(endpoints.items())}
+
+
+def guarded_get(
+    session: requests.Session, endpoint: Endpoint, url: str, max_timeout: Optional[float] = None, **kwargs
+) -> requests.Response:
+    """session.get through an endpoint's breaker, adaptive timeout and hedging"""
+    def request(timeout: float) -> requests.Response:
+        response = session.get(url, timeout=timeout, **kwargs)
+        check_server_error(response.status_code, url)
+        return response
+    return endpoint.call(request, max_timeout)
+
+
+# Singleton instance
+endpoints = EndpointRegistry()
@@ -0,0 +1,106 @@
+"""
+Background Job Scheduler
+Runs periodic maintenance jobs on daemon threads inside the API process
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+class PeriodicJob:
+    """Run a function every `interval_seconds` on a background thread"""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], None],
+        interval_seconds: float,
+        run_on_start: bool = True
+    ):
+        self.name = name
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.run_on_start = run_on_start
+        self.last_run_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the job thread (no-op if already running)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name=f"job-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Signal the job to stop and wait briefly for the current run to finish"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+    def trigger(self):
+        """Run the job as soon as possible instead of waiting out the interval"""
+        self._wake_event.set()
+
+    def run_now(self):
+        """Run the job once in the calling thread"""
+        try:
+            self.func()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Job {self.name} failed: {e}")
+        finally:
+            self.last_run_at = time.time()
+
+    def _wait(self) -> bool:
+        """Sleep until the next run; returns True when the job should exit"""
+        self._wake_event.wait(self.interval_seconds)
+        self._wake_event.clear()
+        return self._stop_event.is_set()
+
+    def _loop(self):
+        if not self.run_on_start:
+            if self._wait():
+                return
+        while not self._stop_event.is_set():
+            self.run_now()
+            if self._wait():
+                break
+
+
+class Scheduler:
+    """Registry of periodic jobs started and stopped with the app"""
+
+    def __init__(self):
+        self.jobs: Dict[str, PeriodicJob] = {}
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[], None],
+        interval_seconds: float,
+        run_on_start: bool = True
+    ) -> PeriodicJob:
+        if name in self.jobs:
+            return self.jobs[name]
+        job = PeriodicJob(name, func, interval_seconds, run_on_start)
+        self.jobs[name] = job
+        return job
+
+    def start(self):
+        for job in self.jobs.values():
+            job.start()
+
+    def stop(self):
+        for job in self.jobs.values():
+            job.stop()
+
+
+# Singleton instance
+scheduler = Scheduler()
@@ -64,6 +64,9 @@ class BookSearch(BaseModel):
     query: str
     limit: int = 20
 
+class BookLookupRequest(BaseModel):
+    isbns: List[str] = Field(..., min_length=1, max_length=500)
+
 # User book schemas
 class UserBookCreate(BaseModel):
     book_id: int
@@ -94,6 +97,31 @@ class UserBookResponse(BaseModel):
     finished_at: Optional[datetime]
     added_at: datetime
 
+class UserBookChange(UserBookResponse):
+    revision: int
+
+class LibraryTombstone(BaseModel):
+    book_id: int
+    revision: int
+
+class LibraryChangesResponse(BaseModel):
+    revision: int  # Pass as `since` on the next sync
+    changes: List[UserBookChange]
+    deleted: List[LibraryTombstone]
+
+class LibraryBatchOperation(BaseModel):
+    op: str = Field(..., pattern='^(add|update|remove)$')
+    book_id: int
+    status: Optional[str] = Field(None, pattern='^(read|currently_reading|want_to_read|owned)$')  # Required for add
+    rating: Optional[float] = Field(None, ge=0, le=5)
+    review: Optional[str] = None
+    is_owned: Optional[bool] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class LibraryBatchRequest(BaseModel):
+    operations: List[LibraryBatchOperation] = Field(..., min_length=1, max_length=500)
+
 # Collection schemas
 class CollectionCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
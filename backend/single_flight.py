@@ -0,0 +1,67 @@
+"""
+Single-Flight Call Coalescing
+Concurrent calls for the same key share one execution: the first caller
+runs the function and everyone who arrives while it is in flight waits for
+that result (or exception) instead of starting their own. Works for plain
+functions across threads and for coroutines on the event loop.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """In-flight call registry keyed by caller-normalized keys"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any], on_shared: Optional[Callable[[], None]] = None) -> Any:
+        """Run func once per in-flight key; on_shared is called when this call joins another"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            if on_shared:
+                on_shared()
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def ado(
+        self, key: Hashable, func: Callable[[], Awaitable[Any]], on_shared: Optional[Callable[[], None]] = None
+    ) -> Any:
+        """
+        Coroutine version. The shared call runs as its own task, so a
+        cancelled waiter doesn't cancel it for the others.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        elif on_shared:
+            on_shared()
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._tasks)
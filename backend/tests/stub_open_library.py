@@ -0,0 +1,138 @@
+"""
+Stub Open Library
+A local threaded HTTP server answering the Open Library endpoints the app
+calls (/api/books, /search.json, /search/authors.json, /authors/*.json).
+Every request is recorded with the client port, so tests can count requests
+per endpoint and the TCP connections they used.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Set
+from urllib.parse import parse_qs, urlsplit
+
+
+def bibkeys_record(isbn: str) -> Dict:
+    """jscmd=data record as Open Library returns it"""
+    return {
+        'title': f"Book {isbn}",
+        'authors': [{'name': f"Author {isbn[-3:]}"}],
+        'publish_date': "March 2004",
+        'publishers': [{'name': "Stub Press"}],
+        'number_of_pages': 320,
+        'cover': {'medium': f"https://covers.example/{isbn}-M.jpg"},
+        'subjects': [{'name': "Fantasy fiction"}],
+    }
+
+
+class StubOpenLibrary:
+    """
+    known(isbn) decides which ISBNs bibkeys answers; searchable ISBNs are
+    only found by the isbn: search fallback. Authors listed in unindexed
+    have a record but are missing from the author search. Set fail=True to
+    answer 503.
+    """
+
+    def __init__(
+        self,
+        known: Callable[[str], bool] = lambda isbn: not isbn.endswith('0'),
+        searchable: Optional[Set[str]] = None,
+        authors: Optional[Dict[str, str]] = None,
+        delay: float = 0.0
+    ):
+        self.known = known
+        self.searchable = searchable or set()
+        self.authors = authors or {}
+        self.unindexed: Set[str] = set()
+        self.delay = delay
+        self.fail = False
+        self.requests: List[Dict] = []
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'StubOpenLibrary':
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body in one write; otherwise Nagle + delayed ACK add ~40 ms per request
+            wbufsize = 65536
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+                with stub._lock:
+                    stub.requests.append({'path': parts.path, 'query': query, 'port': self.client_address[1],
+                                          'at': time.monotonic()})
+                if stub.delay:
+                    time.sleep(stub.delay)
+                if stub.fail:
+                    return self.reply(503, {})
+                status, body = stub.route(parts.path, query)
+                self.reply(status, body)
+
+            def reply(self, status: int, body: Dict):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def route(self, path: str, query: Dict[str, str]):
+        if path == "/api/books":
+            isbns = [key.split(':', 1)[1] for key in query.get('bibkeys', '').split(',') if key]
+            return 200, {f"ISBN:{isbn}": bibkeys_record(isbn) for isbn in isbns if self.known(isbn)}
+        if path == "/search.json":
+            q = query.get('q', '')
+            if q.startswith('isbn:'):
+                isbn = q[5:]
+                docs = [{'key': f"/works/OL{isbn}W", 'title': f"Found {isbn}", 'author_name': ["Searcher"],
+                         'isbn': [isbn], 'subject': ["Mystery"]}] if isbn in self.searchable else []
+                return 200, {'docs': docs}
+            return 200, {'docs': [{'key': "/works/OL1W", 'title': q, 'author_name': ["Someone"],
+                                   'first_publish_year': 2024, 'subject': ["Fantasy"]}]}
+        if path == "/search/authors.json":
+            ids = query.get('q', '')[len('key:('):-1].split(' OR ')
+            docs = [{'key': f"/authors/{i}", 'name': self.authors[i]}
+                    for i in ids if i in self.authors and i not in self.unindexed]
+            return 200, {'docs': docs}
+        if path.startswith("/authors/") and path.endswith(".json"):
+            author_id = path[len("/authors/"):-len(".json")]
+            if author_id in self.authors:
+                return 200, {'name': self.authors[author_id]}
+            return 404, {}
+        return 404, {}
+
+    # ---------- assertions helpers ----------
+
+    def paths(self, path: str) -> List[Dict]:
+        with self._lock:
+            return [request for request in self.requests if request['path'] == path]
+
+    def connections(self) -> int:
+        with self._lock:
+            return len({request['port'] for request in self.requests})
+
+    def reset(self):
+        with self._lock:
+            self.requests = []
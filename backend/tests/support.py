@@ -0,0 +1,63 @@
+"""
+Test Support
+Points the app at throwaway storage before any backend module is imported,
+so import this first in every test module. Run the suite from backend/:
+
+    python -m unittest discover -s tests -t .
+"""
+
+import os
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp(prefix="bookshelf-tests-")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DIR}/test.db"
+os.environ["BOOK_CACHE_PATH"] = ""  # memory-only book cache
+os.environ["OL_MIRROR_PATH"] = os.path.join(TEST_DIR, "ol_mirror.db")
+os.environ["COVER_CACHE_DIR"] = os.path.join(TEST_DIR, "covers")
+os.environ["IMPORT_UPLOAD_DIR"] = os.path.join(TEST_DIR, "import_uploads")
+
+from database import init_db, migrate_database, SessionLocal, User  # noqa: E402
+
+init_db()
+migrate_database()
+
+
+def make_user(username: str) -> int:
+    """Create a verified user with no points; returns the id"""
+    db = SessionLocal()
+    try:
+        user = User(username=username, email=f"{username}@example.com", hashed_password="x", is_verified=True, points=0)
+        db.add(user)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def api_client(user_id: int):
+    """
+    TestClient for the app acting as the given user. Not entered as a context
+    manager, so startup (scheduler, worker pool) stays off; call
+    clear_api_user() in tearDown.
+    """
+    from fastapi.testclient import TestClient
+    import main
+    from auth import get_current_user
+
+    def current_user():
+        db = SessionLocal()
+        try:
+            return db.query(User).filter(User.id == user_id).first()
+        finally:
+            db.close()
+
+    main.app.dependency_overrides[get_current_user] = current_user
+    return TestClient(main.app)
+
+
+def clear_api_user():
+    import main
+    from auth import get_current_user
+
+    main.app.dependency_overrides.pop(get_current_user, None)
@@ -0,0 +1,83 @@
+import asyncio
+import unittest
+
+from tests.support import make_user  # noqa: F401  (sets up the test database)
+from tests.stub_open_library import StubOpenLibrary
+
+from async_book_search import AsyncBookSearchService, AsyncHTTPPool, HTTP2_AVAILABLE
+from book_cache import BookCache
+
+
+class AsyncHTTPPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stub = StubOpenLibrary(delay=0.05).start()
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def service(self, pool: AsyncHTTPPool) -> AsyncBookSearchService:
+        service = AsyncBookSearchService(cache=BookCache(path=""), http=pool)
+        service.open_library_url = self.stub.url
+        return service
+
+    def test_concurrent_and_sequential_searches_reuse_pooled_connections(self):
+        pool = AsyncHTTPPool(max_connections=4, max_keepalive=4, host_limits={})
+
+        async def scenario():
+            service = self.service(pool)
+            try:
+                results = await asyncio.gather(*(service.search_books(f"concurrent {i}") for i in range(20)))
+                connections = self.stub.connections()
+                for i in range(10):
+                    await service.search_books(f"sequential {i}")
+                return results, connections, self.stub.connections(), pool.stats()["hosts"]
+            finally:
+                await pool.aclose()
+
+        results, after_concurrent, after_sequential, hosts = asyncio.run(scenario())
+
+        self.assertEqual([books[0]['title'] for books in results], [f"concurrent {i}" for i in range(20)])
+        self.assertGreaterEqual(len(self.stub.paths("/search.json")), 30)
+        # 20 concurrent requests share the host's 4 connections...
+        self.assertLessEqual(after_concurrent, 4)
+        # ...and later requests ride the same keep-alive connections
+        self.assertEqual(after_sequential, after_concurrent)
+        self.assertEqual(hosts, [self.stub.url])
+
+    def test_one_client_per_host(self):
+        pool = AsyncHTTPPool(host_limits={})
+        first = pool.client_for(f"{self.stub.url}/search.json")
+        self.assertIs(pool.client_for(f"{self.stub.url}/api/books?bibkeys=x"), first)
+        self.assertIsNot(pool.client_for("http://localhost:1/search.json"), first)
+        asyncio.run(pool.aclose())
+        self.assertTrue(first.is_closed)
+
+    def test_http2_only_when_h2_is_installed(self):
+        self.assertEqual(AsyncHTTPPool(http2=True).http2, HTTP2_AVAILABLE)
+        self.assertFalse(AsyncHTTPPool(http2=False).http2)
+
+    @unittest.skipUnless(HTTP2_AVAILABLE, "h2 is not installed")
+    def test_http2_clients_negotiate_http2(self):
+        pool = AsyncHTTPPool(http2=True, host_limits={})
+        client = pool.client_for("https://openlibrary.org/search.json")
+        self.assertTrue(client._transport._pool._http2)
+        asyncio.run(pool.aclose())
+
+    def test_http1_stub_is_served_over_http1_by_an_http2_pool(self):
+        # A pool that would negotiate HTTP/2 still works against HTTP/1.1 upstreams
+        pool = AsyncHTTPPool(http2=True, host_limits={})
+
+        async def fetch():
+            try:
+                return await pool.get(f"{self.stub.url}/search.json", params={'q': 'any'})
+            finally:
+                await pool.aclose()
+
+        response = asyncio.run(fetch())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.http_version, "HTTP/1.1")
+
+
+if __name__ == '__main__':
+    unittest.main()
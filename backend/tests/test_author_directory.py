@@ -0,0 +1,70 @@
+import threading
+import time
+import unittest
+
+from tests.support import make_user  # noqa: F401  (sets up the test database)
+from tests.stub_open_library import StubOpenLibrary
+
+from author_directory import AuthorDirectory
+from book_cache import BookCache
+
+
+class AuthorDirectoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stub = StubOpenLibrary(authors={f"OL{i}A": f"Author {i}" for i in range(1, 200)}).start()
+        self.directory = AuthorDirectory(cache=BookCache(path=""))
+        self.directory.open_library_url = self.stub.url
+
+    def tearDown(self):
+        self.stub.stop()
+
+    def drain_background(self):
+        # One worker, so a no-op queued now runs after every deferred lookup
+        self.directory._background.submit(lambda: None).result(timeout=5)
+
+    def test_request_path_only_searches_and_defers_the_rest(self):
+        self.stub.unindexed = {"OL2A"}
+        hold = threading.Event()
+        self.directory._background.submit(hold.wait)
+        try:
+            names = self.directory.resolve(["/authors/OL1A", "/authors/OL2A", "/authors/OL999A"])
+            # Only the batch search ran before answering; the rest show as ids
+            self.assertEqual(names, ["Author 1", "OL2A", "OL999A"])
+            self.assertEqual([r['path'] for r in self.stub.requests], ["/search/authors.json"])
+        finally:
+            hold.set()
+        self.drain_background()
+
+        fetched = sorted(r['path'] for r in self.stub.requests if r['path'].startswith("/authors/"))
+        self.assertEqual(fetched, ["/authors/OL2A.json", "/authors/OL999A.json"])
+        self.assertEqual(self.directory.metrics()["deferred"], 2)
+
+        # Resolved (and the unknown key cached as missing) for the next request
+        self.stub.reset()
+        names = self.directory.resolve(["/authors/OL1A", "/authors/OL2A", "/authors/OL999A"])
+        self.assertEqual(names, ["Author 1", "Author 2", "OL999A"])
+        self.assertEqual(self.stub.requests, [])
+
+    def test_resolve_has_one_overall_deadline(self):
+        self.stub.delay = 0.2
+        keys = [f"/authors/OL{i}A" for i in range(1, 121)]  # three search batches of 50/50/20
+        hold = threading.Event()
+        self.directory._background.submit(hold.wait)
+        try:
+            started = time.monotonic()
+            names = self.directory.names(keys, timeout=0.3)
+            elapsed = time.monotonic() - started
+            searches = len(self.stub.paths("/search/authors.json"))
+        finally:
+            hold.set()
+
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(len(names), 50)  # only the first batch answered in time
+        self.assertLessEqual(searches, 2)  # the third batch was never sent
+        self.assertEqual(self.directory.metrics()["deferred"], 70)
+        self.drain_background()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import threading
+import unittest
+
+from tests.support import TEST_DIR
+
+from book_cache import BookCache
+
+
+class RecordingCache(BookCache):
+    """Remembers which threads touched the SQLite tier"""
+
+    def __init__(self, path):
+        super().__init__(path=path)
+        self.disk_threads = []
+
+    def _disk_get(self, namespace, key):
+        self.disk_threads.append(threading.get_ident())
+        return super()._disk_get(namespace, key)
+
+    def _disk_put(self, namespace, key, value, expires_at):
+        self.disk_threads.append(threading.get_ident())
+        return super()._disk_put(namespace, key, value, expires_at)
+
+
+class AsyncCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(TEST_DIR, f"{self.id()}.db")
+
+    def test_sqlite_tier_stays_off_the_event_loop(self):
+        BookCache(path=self.path).store('search', 'warm', ['from disk'], ttl=600)
+        cache = RecordingCache(self.path)
+        loads = []
+
+        async def loader():
+            loads.append(1)
+            return ['loaded']
+
+        async def scenario():
+            loop_thread = threading.get_ident()
+            warm = await cache.aget_or_load('search', 'warm', loader)
+            cold = await cache.aget_or_load('search', 'cold', loader)
+            again = await cache.aget_or_load('search', 'cold', loader)
+            return loop_thread, warm, cold, again
+
+        loop_thread, warm, cold, again = asyncio.run(scenario())
+
+        self.assertEqual((warm, cold, again), (['from disk'], ['loaded'], ['loaded']))
+        self.assertEqual(len(loads), 1)
+        # Disk read for 'warm', read + write for 'cold'; the repeat is a memory hit
+        self.assertEqual(len(cache.disk_threads), 3)
+        self.assertNotIn(loop_thread, cache.disk_threads)
+        # The stored value reached the file
+        self.assertEqual(BookCache(path=self.path).lookup('search', 'cold')[1], ['loaded'])
+
+    def test_memory_only_cache_works_without_threads(self):
+        cache = BookCache(path="")
+
+        async def loader():
+            return {'title': 'Dune'}
+
+        async def scenario():
+            first = await cache.aget_or_load('isbn', '9780441013593', loader)
+            second = await cache.aget_or_load('isbn', '9780441013593', loader)
+            return first, second
+
+        self.assertEqual(asyncio.run(scenario()), ({'title': 'Dune'}, {'title': 'Dune'}))
+        self.assertEqual(cache.metrics()["namespaces"]["isbn"]["hits"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import unittest
+
+from tests.support import TEST_DIR
+
+import cover_cache as covers
+from cover_cache import CoverCache, parse_identifier, is_valid_isbn
+
+
+class ParseIdentifierTest(unittest.TestCase):
+
+    def test_isbns_need_a_valid_checksum(self):
+        self.assertEqual(parse_identifier("978-0-441-01359-3"), ('isbn', '9780441013593'))
+        self.assertEqual(parse_identifier("0441013597"), ('isbn', '0441013597'))
+        self.assertEqual(parse_identifier("080442957x"), ('isbn', '080442957X'))
+        self.assertTrue(is_valid_isbn("0306406152"))
+        self.assertFalse(is_valid_isbn("0306406153"))
+
+    def test_digits_failing_the_checksum_are_cover_ids(self):
+        self.assertEqual(parse_identifier("1234567890"), ('id', '1234567890'))
+        self.assertEqual(parse_identifier("9780441013590"), ('id', '9780441013590'))
+        self.assertEqual(parse_identifier("8231856"), ('id', '8231856'))
+
+    def test_prefixes_remove_the_ambiguity(self):
+        self.assertEqual(parse_identifier("id:0441013597"), ('id', '0441013597'))
+        self.assertEqual(parse_identifier("isbn:9780441013593"), ('isbn', '9780441013593'))
+        self.assertEqual(parse_identifier("olid:OL7353617M"), ('olid', 'OL7353617M'))
+        with self.assertRaises(ValueError):
+            parse_identifier("isbn:9780441013590")
+        with self.assertRaises(ValueError):
+            parse_identifier("id:OL1M")
+
+    def test_other_values_are_rejected(self):
+        self.assertEqual(parse_identifier("ol7353617m"), ('olid', 'OL7353617M'))
+        for bad in ("", "abc", "123456789Y", "OL12W"):
+            with self.assertRaises(ValueError):
+                parse_identifier(bad)
+
+
+class EvictionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = CoverCache(directory=os.path.join(TEST_DIR, f"covers-{self._testMethodName}"), max_bytes=250)
+
+    def exists(self, relpath):
+        return os.path.exists(os.path.join(self.cache.directory, relpath))
+
+    def test_least_recently_served_file_is_evicted(self):
+        paths = [self.cache._relpath(f"id-{i}", 'medium') for i in range(3)]
+        for path in paths:
+            self.cache._store(path, b"x" * 100)
+        self.assertEqual([self.exists(p) for p in paths], [False, True, True])
+        self.assertEqual(self.cache.stats["evicted"], 1)
+
+    def test_recently_served_files_are_not_evicted(self):
+        paths = [self.cache._relpath(f"id-{i}", 'medium') for i in range(3)]
+        self.cache._store(paths[0], b"x" * 100)
+        self.cache._store(paths[1], b"x" * 100)
+        # paths[0] is still least recently used, but a response just got its path
+        self.cache._serve(paths[0], 100)
+        self.cache._store(paths[2], b"x" * 100)
+        self.assertEqual([self.exists(p) for p in paths], [True, False, True])
+
+    def test_grace_period_expires(self):
+        saved = covers.COVER_EVICTION_GRACE_SECONDS
+        covers.COVER_EVICTION_GRACE_SECONDS = 0
+        try:
+            paths = [self.cache._relpath(f"id-{i}", 'medium') for i in range(3)]
+            self.cache._store(paths[0], b"x" * 100)
+            self.cache._serve(paths[0], 100)
+            self.cache._store(paths[1], b"x" * 100)
+            self.cache._store(paths[2], b"x" * 100)
+        finally:
+            covers.COVER_EVICTION_GRACE_SECONDS = saved
+        self.assertEqual([self.exists(p) for p in paths], [False, True, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
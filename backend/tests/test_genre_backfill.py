@@ -0,0 +1,93 @@
+import unittest
+
+from tests.support import make_user  # noqa: F401  (sets up the test database)
+from tests.stub_open_library import StubOpenLibrary
+
+import enrichment
+from database import SessionLocal, Book
+from enrichment import RateLimiter, backfill_genres, book_enricher
+
+RATE = 20  # requests per second -> 50 ms apart
+
+
+class GenreBackfillTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stub = StubOpenLibrary().start()
+        self.service = book_enricher.service
+        self.saved = (self.service.open_library_url, book_enricher.limiter)
+        self.service.open_library_url = self.stub.url
+        book_enricher.limiter = RateLimiter(RATE)
+        self.service.cache._memory.clear()
+
+    def tearDown(self):
+        self.service.open_library_url, book_enricher.limiter = self.saved
+        self.stub.stop()
+
+    def add_books(self, prefix: str, count: int):
+        """Books without a genre; ISBNs ending in 0 are unknown to bibkeys"""
+        db = SessionLocal()
+        try:
+            after_id = db.query(Book.id).order_by(Book.id.desc()).limit(1).scalar() or 0
+            isbns = [f"979{prefix}{i:06d}" for i in range(count)]
+            db.add_all(Book(title=f"Untyped {isbn}", author="Someone", isbn=isbn) for isbn in isbns)
+            db.commit()
+            return after_id, isbns
+        finally:
+            db.close()
+
+    def genres(self, isbns):
+        db = SessionLocal()
+        try:
+            return {book.isbn: book.genre for book in db.query(Book).filter(Book.isbn.in_(isbns))}
+        finally:
+            db.close()
+
+    def test_fallback_searches_are_rate_limited(self):
+        after_id, isbns = self.add_books("3001", 40)
+        unknown = [isbn for isbn in isbns if isbn.endswith('0')]
+        self.stub.searchable = {unknown[0]}
+
+        totals = backfill_genres(after_id=after_id)
+
+        self.assertEqual(len(self.stub.paths("/api/books")), 1)
+        self.assertEqual(len(self.stub.paths("/search.json")), len(unknown))
+        times = sorted(request['at'] for request in self.stub.requests)
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        self.assertGreaterEqual(min(gaps), 0.9 / RATE)
+
+        genres = self.genres(isbns)
+        self.assertEqual(genres[isbns[1]], "Fantasy")
+        self.assertEqual(genres[unknown[0]], "Mystery")
+        self.assertIsNone(genres[unknown[1]])
+        self.assertEqual(totals["classified"], len(isbns) - len(unknown) + 1)
+
+    def test_answered_isbns_without_genre_are_skipped_next_time(self):
+        after_id, isbns = self.add_books("3002", 20)
+        backfill_genres(after_id=after_id)
+        unknown = [isbn for isbn in isbns if isbn.endswith('0')]
+
+        # Even with the cached ISBN answers gone, the markers keep the next run offline
+        cache = self.service.cache
+        for key in [key for key in cache._memory if key[0] == 'isbn']:
+            del cache._memory[key]
+        self.stub.reset()
+        totals = backfill_genres(after_id=after_id)
+        self.assertEqual(self.stub.requests, [])
+        self.assertEqual((totals["books"], totals["skipped"], totals["classified"]), (len(unknown), len(unknown), 0))
+
+    def test_failed_lookups_are_not_marked(self):
+        after_id, isbns = self.add_books("3003", 10)
+        self.stub.fail = True
+        backfill_genres(after_id=after_id)
+
+        self.stub.fail = False
+        self.stub.reset()
+        totals = backfill_genres(after_id=after_id)
+        self.assertEqual(len(self.stub.paths("/api/books")), 1)
+        self.assertEqual(totals["skipped"], 0)
+        self.assertEqual(totals["classified"], 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import unittest
+
+from tests.support import TEST_DIR, api_client, clear_api_user, make_user
+from tests.test_import_stream import write_export
+
+from database import SessionLocal, user_books
+from import_jobs import process_import_job
+
+
+class GoodreadsImportEndpointTest(unittest.TestCase):
+
+    def setUp(self):
+        self.user_id = make_user(f"endpoint{id(self)}")
+        self.client = api_client(self.user_id)
+        self.path = os.path.join(TEST_DIR, f"endpoint-{self.user_id}.csv")
+        write_export(self.path, 30)
+
+    def tearDown(self):
+        clear_api_user()
+
+    def upload(self):
+        with open(self.path, 'rb') as f:
+            return self.client.post("/import/goodreads", files={'file': ("export.csv", f, "text/csv")})
+
+    def library_size(self) -> int:
+        db = SessionLocal()
+        try:
+            return db.query(user_books).filter(user_books.c.user_id == self.user_id).count()
+        finally:
+            db.close()
+
+    def test_upload_queues_instead_of_importing(self):
+        response = self.upload()
+        self.assertEqual(response.status_code, 202)
+        job = response.json()
+        self.assertEqual((job["status"], job["already_imported"]), ("queued", False))
+        self.assertEqual(self.library_size(), 0)
+
+        process_import_job(job["job_id"])
+        status = self.client.get(f"/import/jobs/{job['job_id']}").json()
+        self.assertEqual((status["status"], status["imported"], status["percentage"]), ("completed", 30, 100))
+        self.assertEqual(self.library_size(), 30)
+
+        again = self.upload().json()
+        self.assertEqual((again["job_id"], again["already_imported"]), (job["job_id"], True))
+        self.assertEqual(self.library_size(), 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
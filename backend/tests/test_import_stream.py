@@ -0,0 +1,137 @@
+import csv
+import os
+import tracemalloc
+import unittest
+
+from tests.support import TEST_DIR, make_user
+
+from database import SessionLocal, ImportJob, PointsLedgerEntry, user_books, import_row_keys
+from goodreads_import import goodreads_importer
+from import_jobs import import_stream
+
+HEADER = [
+    "Book Id", "Title", "Author", "Author l-f", "Additional Authors", "ISBN", "ISBN13", "My Rating",
+    "Average Rating", "Publisher", "Binding", "Number of Pages", "Year Published",
+    "Original Publication Year", "Date Read", "Date Added", "Bookshelves", "Bookshelves with positions",
+    "Exclusive Shelf", "My Review", "Spoiler", "Private Notes", "Read Count", "Owned Copies"
+]
+SHELVES = ["read", "to-read", "currently-reading"]
+
+
+def write_export(path: str, rows: int, review_chars: int = 0):
+    """Goodreads-style export written row by row (never held in memory)"""
+    review = ("A long and thoughtful review. " * (review_chars // 30 + 1))[:review_chars]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            writer.writerow([
+                str(1000 + i), f"Title {i}", f"First{i} Last{i}", f"Last{i}, First{i}", "",
+                f'="{i:010d}"', f'="978{i:010d}"', str(i % 6), "3.9", "Publisher", "Paperback",
+                str(100 + i % 400), "2001", "1999", "2020/01/05" if i % 3 == 0 else "", "2019/12/01",
+                "fantasy" if i % 2 else "", "", SHELVES[i % 3], review, "", "", "1", "0"
+            ])
+
+
+def new_job(user_id: int, path: str) -> int:
+    db = SessionLocal()
+    try:
+        job = ImportJob(user_id=user_id, source='goodreads', status='running', file_path=path)
+        db.add(job)
+        db.commit()
+        return job.id
+    finally:
+        db.close()
+
+
+def run_job(job_id: int, path: str, chunk_size: int = 200) -> ImportJob:
+    db = SessionLocal()
+    try:
+        job = db.query(ImportJob).filter(ImportJob.id == job_id).first()
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            import_stream(db, job, f, chunk_size)
+        db.refresh(job)
+        db.expunge(job)
+        return job
+    finally:
+        db.close()
+
+
+class StreamingMemoryTest(unittest.TestCase):
+    """A ~50 MB export must import in roughly one chunk's worth of memory"""
+
+    ROWS = 10000
+    REVIEW_CHARS = 5000
+    PEAK_LIMIT_MB = 16
+
+    @classmethod
+    def setUpClass(cls):
+        cls.path = os.path.join(TEST_DIR, "large_export.csv")
+        write_export(cls.path, cls.ROWS, cls.REVIEW_CHARS)
+        cls.size_mb = os.path.getsize(cls.path) / 1e6
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.path)
+
+    def test_file_is_large(self):
+        self.assertGreater(self.size_mb, 45)
+
+    def test_iter_batches_peak_is_bounded(self):
+        rows = 0
+        tracemalloc.start()
+        try:
+            with open(self.path, encoding='utf-8-sig', newline='') as f:
+                for books, errors, rows_read in goodreads_importer.iter_batches(f, 200):
+                    self.assertLessEqual(len(books), 200)
+                    rows += rows_read
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(rows, self.ROWS)
+        self.assertLess(peak_mb, self.PEAK_LIMIT_MB, f"peak {peak_mb:.1f} MB for a {self.size_mb:.0f} MB file")
+
+    def test_import_stream_peak_is_bounded(self):
+        user_id = make_user("streamer")
+        job_id = new_job(user_id, self.path)
+        tracemalloc.start()
+        try:
+            job = run_job(job_id, self.path)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+        self.assertEqual((job.status, job.processed_rows, job.imported), ('completed', self.ROWS, self.ROWS))
+        self.assertLess(peak_mb, self.PEAK_LIMIT_MB, f"peak {peak_mb:.1f} MB for a {self.size_mb:.0f} MB file")
+
+
+class ImportIdempotencyTest(unittest.TestCase):
+    """Re-running the same export must not insert anything twice"""
+
+    def test_rerun_skips_imported_rows(self):
+        path = os.path.join(TEST_DIR, "rerun_export.csv")
+        write_export(path, 1000)
+        user_id = make_user("rerunner")
+
+        first = run_job(new_job(user_id, path), path, chunk_size=150)
+        second = run_job(new_job(user_id, path), path, chunk_size=150)
+
+        db = SessionLocal()
+        try:
+            library = db.execute(user_books.select().where(user_books.c.user_id == user_id)).fetchall()
+            row_keys = db.execute(import_row_keys.select().where(import_row_keys.c.user_id == user_id)).fetchall()
+            ledger = db.query(PointsLedgerEntry).filter(PointsLedgerEntry.user_id == user_id).count()
+        finally:
+            db.close()
+        os.remove(path)
+
+        self.assertEqual((first.imported, first.skipped), (1000, 0))
+        self.assertEqual((second.imported, second.skipped), (0, 1000))
+        self.assertEqual(len(library), 1000)
+        self.assertEqual(len({row.book_id for row in library}), 1000)
+        self.assertEqual(len(row_keys), 1000)
+        # Points were only awarded by the first run
+        self.assertEqual(ledger, 1000 + sum(1 for i in range(1000) if i % 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+from datetime import datetime
+
+from tests.support import api_client, clear_api_user, make_user
+
+from database import SessionLocal, Book, user_books
+from progress_buffer import progress_buffer
+
+
+class LibraryBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.user_id = make_user(f"batcher{id(self)}")
+        self.client = api_client(self.user_id)
+        db = SessionLocal()
+        try:
+            book = Book(title="Read Again", author="Someone", page_count=300)
+            db.add(book)
+            db.commit()
+            self.book_id = book.id
+        finally:
+            db.close()
+
+    def tearDown(self):
+        clear_api_user()
+
+    def batch(self, *operations):
+        response = self.client.post("/my-books/batch", json={'operations': list(operations)})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def row(self):
+        db = SessionLocal()
+        try:
+            return db.execute(user_books.select().where(
+                user_books.c.user_id == self.user_id, user_books.c.book_id == self.book_id
+            )).mappings().first()
+        finally:
+            db.close()
+
+    def test_remove_then_add_replaces_the_entry(self):
+        self.batch({'op': 'add', 'book_id': self.book_id, 'status': 'currently_reading'})
+        db = SessionLocal()
+        try:
+            db.execute(user_books.update().where(user_books.c.user_id == self.user_id).values(
+                added_at=datetime(2020, 1, 1), current_page=120
+            ))
+            db.commit()
+        finally:
+            db.close()
+        old = self.row()
+        since = self.client.get("/my-books/changes", params={'since': 0}).json()['revision']
+        progress_buffer.record(self.user_id, self.book_id, 150)
+
+        result = self.batch(
+            {'op': 'remove', 'book_id': self.book_id},
+            {'op': 'add', 'book_id': self.book_id, 'status': 'currently_reading'},
+        )
+        self.assertEqual(result['applied'], 2)
+
+        new = self.row()
+        self.assertGreater(new['added_at'], old['added_at'])
+        self.assertIsNone(new['current_page'])
+        self.assertIsNone(progress_buffer.get(self.user_id, self.book_id))
+
+        changes = self.client.get("/my-books/changes", params={'since': since}).json()
+        self.assertGreater(changes['revision'], since)
+        self.assertEqual([change['book']['id'] for change in changes['changes']], [self.book_id])
+        self.assertGreater(changes['changes'][0]['added_at'], old['added_at'].isoformat())
+
+    def test_remove_alone_leaves_a_tombstone(self):
+        self.batch({'op': 'add', 'book_id': self.book_id, 'status': 'read'})
+        since = self.client.get("/my-books/changes", params={'since': 0}).json()['revision']
+        self.batch({'op': 'remove', 'book_id': self.book_id})
+        changes = self.client.get("/my-books/changes", params={'since': since}).json()
+        self.assertEqual([gone['book_id'] for gone in changes['deleted']], [self.book_id])
+        self.assertIsNone(self.row())
+
+
+if __name__ == '__main__':
+    unittest.main()
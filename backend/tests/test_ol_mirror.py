@@ -0,0 +1,56 @@
+import json
+import os
+import unittest
+
+from tests.support import TEST_DIR
+
+from ol_mirror import OpenLibraryMirror
+
+
+def write_dump(path: str, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+def author(name: str, modified: str) -> dict:
+    return {'type': {'key': '/type/author'}, 'key': '/authors/OL1A', 'name': name, 'last_modified': modified}
+
+
+def edition(isbn: str, modified: str) -> dict:
+    return {'type': {'key': '/type/edition'}, 'key': '/books/OL1M', 'title': "Dragon Tales",
+            'isbn_13': [isbn], 'works': [{'key': '/works/OL1W'}], 'last_modified': modified}
+
+
+class MirrorReimportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mirror = OpenLibraryMirror(os.path.join(TEST_DIR, f"mirror-{id(self)}.db"))
+        self.ingest(
+            author("Ann Writer", "2024-01-01"),
+            {'type': {'key': '/type/work'}, 'key': '/works/OL1W', 'title': "Dragon Tales",
+             'authors': [{'author': {'key': '/authors/OL1A'}}], 'last_modified': "2024-01-01"},
+            edition("9780000000017", "2024-01-01"),
+        )
+
+    def ingest(self, *records):
+        path = os.path.join(TEST_DIR, f"dump-{id(self)}.jsonl")
+        write_dump(path, records)
+        self.mirror.ingest([path], workers=1)
+
+    def test_reimported_edition_drops_retired_isbns(self):
+        self.assertIsNotNone(self.mirror.isbn_doc("9780000000017"))
+        self.ingest(edition("9780000000024", "2024-02-01"))
+        self.assertIsNone(self.mirror.isbn_doc("9780000000017"))
+        self.assertEqual(self.mirror.isbn_doc("9780000000024")['title'], "Dragon Tales")
+
+    def test_renamed_author_reindexes_their_works(self):
+        self.assertEqual(self.mirror.search_docs("Writer", 5)[0]['author_name'], ["Ann Writer"])
+        self.ingest(author("Ann Newname", "2024-02-01"))
+        self.assertIsNone(self.mirror.search_docs("Writer", 5))
+        self.assertEqual(self.mirror.search_docs("Newname", 5)[0]['author_name'], ["Ann Newname"])
+        self.assertEqual(self.mirror.isbn_doc("9780000000017")['author_name'], ["Ann Newname"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+
+from tests.support import make_user  # noqa: F401  (sets up the test database)
+from tests.stub_open_library import StubOpenLibrary
+
+from book_cache import BookCache, MISS
+from book_search import BookSearchService, ISBN_LOOKUP_BATCH_SIZE
+from database import SessionLocal, Book
+from enrichment import BookEnricher
+
+
+def isbns(prefix: str, count: int):
+    return [f"978{prefix}{i:06d}" for i in range(count)]
+
+
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stub = StubOpenLibrary().start()
+        self.cache = BookCache(path="")
+        self.service = BookSearchService(cache=self.cache)
+        self.service.open_library_url = self.stub.url
+
+    def tearDown(self):
+        self.stub.stop()
+
+
+class EnrichmentBatchesTest(BatchTest):
+
+    def test_enrich_sends_one_bibkeys_request_per_batch(self):
+        wanted = isbns("1001", 120)
+        db = SessionLocal()
+        try:
+            books = [Book(title=f"Imported {isbn}", author="Someone", isbn=isbn) for isbn in wanted]
+            db.add_all(books)
+            db.commit()
+            book_ids = [book.id for book in books]
+        finally:
+            db.close()
+
+        enricher = BookEnricher(service=self.service, batch_size=50, workers=2, rate_limit=0)
+        summary = enricher.enrich(book_ids)
+
+        bibkeys = self.stub.paths("/api/books")
+        self.assertEqual(sorted(len(r['query']['bibkeys'].split(',')) for r in bibkeys), [20, 50, 50])
+        self.assertEqual(summary["requests"], 3)
+        known = [isbn for isbn in wanted if not isbn.endswith('0')]
+        self.assertEqual(summary["enriched"], len(known))
+
+        db = SessionLocal()
+        try:
+            rows = {book.isbn: book for book in db.query(Book).filter(Book.id.in_(book_ids))}
+        finally:
+            db.close()
+        self.assertEqual(rows[known[0]].genre, "Fantasy")
+        self.assertEqual(rows[known[0]].published_year, 2004)
+        self.assertIsNone(rows[wanted[0]].genre)  # unknown to Open Library, left empty
+
+    def test_failed_batch_is_counted_and_leaves_books_alone(self):
+        wanted = isbns("1002", 30)
+        db = SessionLocal()
+        try:
+            books = [Book(title=f"Imported {isbn}", author="Someone", isbn=isbn) for isbn in wanted]
+            db.add_all(books)
+            db.commit()
+            book_ids = [book.id for book in books]
+        finally:
+            db.close()
+
+        self.stub.fail = True
+        summary = BookEnricher(service=self.service, batch_size=50, workers=2, rate_limit=0).enrich(book_ids)
+        self.assertEqual((summary["requests"], summary["failed_requests"], summary["enriched"]), (1, 1, 0))
+
+
+class IsbnBatchLookupTest(BatchTest):
+
+    def test_bibkeys_batches_then_search_fallback_for_unknown(self):
+        wanted = isbns("2001", 120)
+        unknown = [isbn for isbn in wanted if isbn.endswith('0')]
+        self.stub.searchable = set(unknown[:4])
+
+        books = self.service.get_books_by_isbns(wanted)
+
+        sizes = sorted(len(r['query']['bibkeys'].split(',')) for r in self.stub.paths("/api/books"))
+        self.assertEqual(sizes, [20, ISBN_LOOKUP_BATCH_SIZE, ISBN_LOOKUP_BATCH_SIZE])
+        searches = sorted(r['query']['q'] for r in self.stub.paths("/search.json"))
+        self.assertEqual(searches, sorted(f"isbn:{isbn}" for isbn in unknown))
+
+        self.assertEqual(list(books), wanted)
+        self.assertEqual(books[wanted[1]]['title'], f"Book {wanted[1]}")
+        self.assertEqual(books[unknown[0]]['title'], f"Found {unknown[0]}")
+        self.assertIsNone(books[unknown[-1]])
+
+        # Answers, including "not found", are cached: a repeat sends nothing
+        self.stub.reset()
+        self.assertEqual(self.service.get_books_by_isbns(wanted), books)
+        self.assertEqual(self.stub.requests, [])
+
+    def test_failed_batches_are_not_cached_as_missing(self):
+        wanted = isbns("2002", 60)
+        self.stub.fail = True
+        books = self.service.get_books_by_isbns(wanted)
+
+        self.assertTrue(all(book is None for book in books.values()))
+        self.assertEqual(len(self.stub.paths("/api/books")), 2)
+        self.assertEqual(self.stub.paths("/search.json"), [])  # no fallback for failed batches
+        self.assertTrue(all(self.cache.lookup('isbn', isbn)[0] == MISS for isbn in wanted))
+
+        # Once Open Library answers again the same ISBNs are looked up for real
+        self.stub.fail = False
+        self.stub.reset()
+        books = self.service.get_books_by_isbns(wanted)
+        self.assertEqual(len(self.stub.paths("/api/books")), 2)
+        self.assertEqual(books[wanted[1]]['title'], f"Book {wanted[1]}")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import threading
+import unittest
+
+from tests.support import make_user
+
+from sqlalchemy import func
+
+from database import SessionLocal, User, PointsLedgerEntry, ChallengeProgress
+from points import award_points, award_points_many, set_challenge_progress
+
+
+def run_threads(count, target):
+    barrier = threading.Barrier(count)
+    errors = []
+
+    def worker(index):
+        barrier.wait()
+        try:
+            target(index)
+        except Exception as e:  # surfaced by the assertion below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+class AwardPointsTest(unittest.TestCase):
+
+    def balance_and_ledger(self, user_id):
+        db = SessionLocal()
+        try:
+            balance = db.query(User.points).filter(User.id == user_id).scalar()
+            ledger = db.query(func.coalesce(func.sum(PointsLedgerEntry.points), 0)).filter(
+                PointsLedgerEntry.user_id == user_id,
+                PointsLedgerEntry.circle_id.is_(None)
+            ).scalar()
+            entries = db.query(PointsLedgerEntry).filter(PointsLedgerEntry.user_id == user_id).count()
+            return balance, ledger, entries
+        finally:
+            db.close()
+
+    def test_concurrent_awards_are_not_lost(self):
+        user_id = make_user("concurrent")
+        threads, awards_per_thread = 8, 25
+
+        def award(index):
+            for n in range(awards_per_thread):
+                db = SessionLocal()
+                try:
+                    award_points(db, user_id, 3, 'book_added', book_id=index * 1000 + n)
+                    db.commit()
+                finally:
+                    db.close()
+
+        self.assertEqual(run_threads(threads, award), [])
+        balance, ledger, entries = self.balance_and_ledger(user_id)
+        self.assertEqual(entries, threads * awards_per_thread)
+        self.assertEqual(balance, threads * awards_per_thread * 3)
+        self.assertEqual(balance, ledger)
+
+    def test_many_awards_keep_one_ledger_row_each(self):
+        user_id = make_user("batch")
+        db = SessionLocal()
+        try:
+            applied = award_points_many(db, user_id, [
+                (5, 'book_added', 1), (10, 'book_rated', 1), (0, 'book_reviewed', 1), (5, 'book_added', 2)
+            ])
+            db.commit()
+            rows = db.query(PointsLedgerEntry.reason, PointsLedgerEntry.book_id).filter(
+                PointsLedgerEntry.user_id == user_id
+            ).order_by(PointsLedgerEntry.id).all()
+        finally:
+            db.close()
+        self.assertEqual(applied, 20)
+        self.assertEqual([tuple(row) for row in rows], [('book_added', 1), ('book_rated', 1), ('book_added', 2)])
+        balance, ledger, _ = self.balance_and_ledger(user_id)
+        self.assertEqual((balance, ledger), (20, 20))
+
+
+class ChallengeProgressTest(unittest.TestCase):
+
+    def test_concurrent_syncs_award_each_page_once(self):
+        user_id = make_user("racer")
+        db = SessionLocal()
+        progress = ChallengeProgress(challenge_id=1, user_id=user_id, current_value=0)
+        db.add(progress)
+        db.commit()
+        progress_id = progress.id
+        db.close()
+
+        awarded = []
+        lock = threading.Lock()
+
+        def sync(index):
+            for page in range(index, 200, 8):
+                db = SessionLocal()
+                try:
+                    old, new, _ = set_challenge_progress(db, progress_id, page, target=1000, only_if_higher=True)
+                    db.commit()
+                finally:
+                    db.close()
+                with lock:
+                    awarded.append(new - old)
+
+        self.assertEqual(run_threads(8, sync), [])
+        self.assertEqual(sum(awarded), 199)
+        self.assertTrue(all(delta >= 0 for delta in awarded))
+
+    def test_completion_is_reported_once(self):
+        user_id = make_user("finisher")
+        db = SessionLocal()
+        progress = ChallengeProgress(challenge_id=2, user_id=user_id, current_value=0)
+        db.add(progress)
+        db.commit()
+        progress_id = progress.id
+        db.close()
+
+        completions = []
+
+        def update(index):
+            db = SessionLocal()
+            try:
+                _, _, completed_now = set_challenge_progress(db, progress_id, 100 + index, target=100)
+                db.commit()
+            finally:
+                db.close()
+            completions.append(completed_now)
+
+        self.assertEqual(run_threads(6, update), [])
+        self.assertEqual(completions.count(True), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
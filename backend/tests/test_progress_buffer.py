@@ -0,0 +1,69 @@
+import unittest
+
+from tests.support import make_user
+
+from database import SessionLocal, Book, User, user_books
+from progress_buffer import ProgressBuffer
+
+
+class ProgressBufferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.user_id = make_user(f"reader{id(self)}")
+        db = SessionLocal()
+        try:
+            books = [Book(title=f"Shelf {i}", author="Someone") for i in range(3)]
+            db.add_all(books)
+            db.flush()
+            self.book_ids = [book.id for book in books]
+            # The last book is not in the library
+            db.execute(user_books.insert(), [
+                {'user_id': self.user_id, 'book_id': book_id, 'status': 'currently_reading', 'current_page': 0}
+                for book_id in self.book_ids[:2]
+            ])
+            db.commit()
+        finally:
+            db.close()
+        self.buffer = ProgressBuffer(flush_threshold=1000)
+
+    def state(self):
+        db = SessionLocal()
+        try:
+            pages = dict(db.execute(
+                user_books.select().with_only_columns(user_books.c.book_id, user_books.c.current_page)
+                .where(user_books.c.user_id == self.user_id)
+            ).fetchall())
+            revision = db.query(User.library_revision).filter(User.id == self.user_id).scalar()
+            return pages, revision
+        finally:
+            db.close()
+
+    def test_only_library_pairs_are_written(self):
+        _, revision = self.state()
+        for book_id in self.book_ids:
+            self.buffer.record(self.user_id, book_id, 42)
+
+        self.assertEqual(self.buffer.flush(), 2)
+        pages, new_revision = self.state()
+        self.assertEqual(pages, {self.book_ids[0]: 42, self.book_ids[1]: 42})
+        self.assertEqual(new_revision, (revision or 0) + 1)
+
+    def test_discard_during_flush_drops_the_taken_update(self):
+        pages, revision = self.state()
+        present = self.buffer._present
+
+        def removed_meanwhile(db, keys):
+            found = present(db, keys)
+            # The book is removed after the flush took the batch but before it writes
+            self.buffer.discard(self.user_id, self.book_ids[0])
+            return found
+
+        self.buffer._present = removed_meanwhile
+        self.buffer.record(self.user_id, self.book_ids[0], 99)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.state(), (pages, revision))
+        self.assertIsNone(self.buffer.get(self.user_id, self.book_ids[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import threading
+import time
+import unittest
+
+import resilience
+from resilience import Endpoint, HedgePool, RESILIENCE_MIN_SAMPLES
+
+
+def hedging_endpoint(p95: float = 0.02) -> Endpoint:
+    """Endpoint with enough latency samples that calls slower than p95 hedge"""
+    endpoint = Endpoint("test", max_timeout=2, hedge=True)
+    for _ in range(RESILIENCE_MIN_SAMPLES):
+        endpoint.latency.add(p95)
+    return endpoint
+
+
+class HedgingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = resilience._hedges
+        resilience._hedges = HedgePool(workers=2)
+
+    def tearDown(self):
+        resilience._hedges = self.saved
+
+    def test_fast_call_is_not_hedged(self):
+        calls = []
+
+        def request(timeout):
+            calls.append(1)
+            return "ok"
+
+        endpoint = hedging_endpoint()
+        self.assertEqual(endpoint.call(request), "ok")
+        time.sleep(0.05)  # past the hedge delay: a finished call never launches a backup
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(endpoint.stats["hedged"], 0)
+
+    def test_fast_backup_beats_slow_primary(self):
+        calls = []
+
+        def request(timeout):
+            calls.append(threading.current_thread().name)
+            if len(calls) == 1:
+                time.sleep(0.5)
+                return "primary"
+            return "backup"
+
+        endpoint = hedging_endpoint()
+        started = time.monotonic()
+        self.assertEqual(endpoint.call(request), "backup")
+        self.assertLess(time.monotonic() - started, 0.25)
+        self.assertTrue(all(name.startswith("hedge") for name in calls))
+        self.assertEqual((endpoint.stats["hedged"], endpoint.stats["hedge_wins"]), (1, 1))
+
+    def test_backup_answers_when_the_slow_primary_fails(self):
+        calls = []
+
+        def request(timeout):
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.1)
+                raise TimeoutError("primary stalled")
+            time.sleep(0.15)
+            return "backup"
+
+        endpoint = hedging_endpoint()
+        self.assertEqual(endpoint.call(request), "backup")
+        self.assertEqual((endpoint.stats["hedged"], endpoint.stats["hedge_wins"]), (1, 1))
+
+    def test_primary_result_wins_when_it_succeeds_first(self):
+        calls = []
+
+        def request(timeout):
+            calls.append(1)
+            primary = len(calls) == 1
+            time.sleep(0.1 if primary else 0.3)
+            return "primary" if primary else "backup"
+
+        endpoint = hedging_endpoint()
+        self.assertEqual(endpoint.call(request), "primary")
+        self.assertEqual((endpoint.stats["hedged"], endpoint.stats["hedge_wins"]), (1, 0))
+
+    def test_both_attempts_share_one_deadline(self):
+        timeouts = []
+
+        def request(timeout):
+            timeouts.append(timeout)
+            time.sleep(0.6)
+            return "late"
+
+        endpoint = hedging_endpoint()
+        started = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            endpoint.call(request, max_timeout=0.3)
+        self.assertLess(time.monotonic() - started, 0.45)
+        # The backup only gets what is left of the budget
+        self.assertEqual(timeouts[0], 0.3)
+        self.assertLess(timeouts[1], 0.3)
+        self.assertEqual(endpoint.stats["failures"], 1)
+
+    def test_call_runs_unhedged_when_the_pool_is_busy(self):
+        release = threading.Event()
+        busy = [resilience._hedges.submit(release.wait) for _ in range(2)]
+        self.assertTrue(all(busy))
+        threads = []
+
+        def request(timeout):
+            threads.append(threading.get_ident())
+            time.sleep(0.1)
+            return "ok"
+
+        endpoint = hedging_endpoint()
+        try:
+            self.assertEqual(endpoint.call(request), "ok")
+        finally:
+            release.set()
+        self.assertEqual(threads, [threading.get_ident()])
+        self.assertEqual((endpoint.stats["hedged"], endpoint.stats["hedges_skipped"]), (0, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
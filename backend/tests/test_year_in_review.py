@@ -0,0 +1,75 @@
+import json
+import unittest
+from datetime import datetime
+
+from tests.support import make_user
+
+import year_in_review
+from database import SessionLocal, Book, ReportJob, YearInReviewReport, user_books
+from year_in_review import REPORT_TYPE, default_report_year, run_year_in_review_job
+
+YEAR = 2020
+
+
+class YearInReviewRefreshTest(unittest.TestCase):
+
+    def setUp(self):
+        self.user_id = make_user(f"reviewer{id(self)}")
+
+    def finish(self, title: str, finished_at: datetime):
+        db = SessionLocal()
+        try:
+            book = Book(title=title, author="Someone")
+            db.add(book)
+            db.flush()
+            db.execute(user_books.insert().values(
+                user_id=self.user_id, book_id=book.id, status='read', finished_at=finished_at
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    def books_read(self) -> int:
+        db = SessionLocal()
+        try:
+            report = db.query(YearInReviewReport).filter(
+                YearInReviewReport.user_id == self.user_id,
+                YearInReviewReport.year == YEAR
+            ).first()
+            return json.loads(report.data)["books_read"]
+        finally:
+            db.close()
+
+    def set_finished_at(self, finished_at: datetime):
+        db = SessionLocal()
+        try:
+            db.query(ReportJob).filter(
+                ReportJob.report_type == REPORT_TYPE, ReportJob.year == YEAR
+            ).update({ReportJob.finished_at: finished_at})
+            db.commit()
+        finally:
+            db.close()
+
+    def test_run_from_before_year_end_is_regenerated_once(self):
+        self.finish("Early December", datetime(YEAR, 12, 2))
+        run_year_in_review_job(YEAR)
+        # As if the run above happened mid-December
+        self.set_finished_at(datetime(YEAR, 12, 15))
+        self.finish("New Year's Eve", datetime(YEAR, 12, 31, 22))
+
+        self.assertEqual(run_year_in_review_job(YEAR, refresh=True)["status"], "completed")
+        self.assertEqual(self.books_read(), 2)
+
+        # That run finished after the year closed: the reports are final now
+        self.finish("Backdated", datetime(YEAR, 12, 30))
+        run_year_in_review_job(YEAR, refresh=True)
+        self.assertEqual(self.books_read(), 2)
+
+    def test_default_report_year(self):
+        start = year_in_review.YEAR_IN_REVIEW_START_MONTH
+        self.assertEqual(default_report_year(datetime(2026, 1, 5)), 2025)
+        self.assertEqual(default_report_year(datetime(2026, start, 5)), 2026)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Trending Books Snapshot
+The trending list is the same for every user, so a scheduled job builds it
+from Open Library and /books/trending serves the last snapshot from memory.
+The snapshot is also written to the book cache so a restart can serve it
+before the first refresh finishes. Optionally the books are imported into
+the local catalog so every entry carries a stable book id.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from database import SessionLocal, Book
+from book_search import BookSearchService
+from book_cache import book_cache
+from book_dedupe import find_existing_book
+
+# Minutes between scheduled refreshes
+TRENDING_REFRESH_INTERVAL_MINUTES = int(os.getenv("TRENDING_REFRESH_INTERVAL_MINUTES", "60"))
+# Books kept in the snapshot (the most /books/trending can return)
+TRENDING_SNAPSHOT_SIZE = int(os.getenv("TRENDING_SNAPSHOT_SIZE", "40"))
+# Import snapshot books into the books table so they have stable ids
+TRENDING_IMPORT_BOOKS = os.getenv("TRENDING_IMPORT_BOOKS", "false").lower() == "true"
+
+# Book columns copied from Open Library results on import
+IMPORTED_COLUMNS = ('title', 'author', 'isbn', 'description', 'cover_url', 'published_year', 'genre', 'page_count', 'publisher')
+
+
+class TrendingSnapshot:
+    """Last computed trending list, refreshed by the scheduler"""
+
+    def __init__(
+        self,
+        service: Optional[BookSearchService] = None,
+        size: int = TRENDING_SNAPSHOT_SIZE,
+        import_books: bool = TRENDING_IMPORT_BOOKS
+    ):
+        self.service = service or BookSearchService()
+        self.size = size
+        self.import_books = import_books
+        self.books: List[Dict] = []
+        self.refreshed_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Restore the persisted snapshot, if any (app startup)"""
+        _, saved = book_cache.lookup('trending', 'snapshot')
+        if saved and not self.refreshed_at:
+            with self._lock:
+                self.books = saved['books']
+                self.refreshed_at = saved['refreshed_at']
+
+    def refresh(self) -> Dict:
+        """Recompute the list; an empty result keeps the previous snapshot"""
+        books = self.service.get_trending_books(max_results=self.size)
+        if not books:
+            self.last_error = "Open Library returned no trending books"
+            print(f"Trending refresh kept the previous snapshot: {self.last_error}")
+            return {"books": 0, "kept_previous": True}
+
+        imported = self._import(books) if self.import_books else 0
+        refreshed_at = time.time()
+        with self._lock:
+            self.books = books
+            self.refreshed_at = refreshed_at
+        self.last_error = None
+        book_cache.store('trending', 'snapshot', {"books": books, "refreshed_at": refreshed_at},
+                         ttl=TRENDING_REFRESH_INTERVAL_MINUTES * 60 * 4)
+        return {"books": len(books), "imported": imported}
+
+    def _import(self, books: List[Dict]) -> int:
+        """Attach a catalog id to every book, creating the missing ones"""
+        created = 0
+        db = SessionLocal()
+        try:
+            for book in books:
+                existing = find_existing_book(db, book.get('isbn'), book.get('title'), book.get('author'))
+                if existing is None:
+                    existing = Book(**{column: book.get(column) for column in IMPORTED_COLUMNS})
+                    db.add(existing)
+                    db.flush()
+                    created += 1
+                book['id'] = existing.id
+            db.commit()
+            return created
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def get(self, limit: int) -> Optional[List[Dict]]:
+        """Snapshot books, or None before the first refresh"""
+        with self._lock:
+            if self.refreshed_at is None:
+                return None
+            return self.books[:limit]
+
+    def health(self) -> Dict:
+        age = time.time() - self.refreshed_at if self.refreshed_at else None
+        return {
+            "books": len(self.books),
+            "refreshed_at": self.refreshed_at,
+            "age_seconds": round(age, 1) if age is not None else None,
+            # Missed two scheduled refreshes in a row
+            "stale": age is None or age > TRENDING_REFRESH_INTERVAL_MINUTES * 60 * 2,
+            "last_error": self.last_error,
+        }
+
+
+# Singleton instance
+trending_snapshot = TrendingSnapshot()
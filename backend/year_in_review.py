@@ -0,0 +1,313 @@
+"""
+Year in Review Reports
+Precomputes every user's annual reading summary in a bounded worker pool so
+the December rush is served from a single row lookup instead of live stats
+
+Run from the command line:
+    python year_in_review.py 2026                 # start or resume
+    python year_in_review.py 2026 --retry-failed  # also retry users whose report failed
+    python year_in_review.py 2026 --restart       # regenerate every report from the first user
+
+A daily scheduler job (see run_scheduled_year_in_review) keeps the current
+year's reports fresh from YEAR_IN_REVIEW_START_MONTH onwards and, once the
+year is over, regenerates them one last time so late-December finishes count.
+"""
+
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, User, Book, user_books, YearInReviewReport, ReportJob
+from reading_stats import summarize_reading
+
+REPORT_TYPE = 'year_in_review'
+
+# Concurrent users being summarized (each worker holds one DB connection)
+YEAR_IN_REVIEW_WORKERS = int(os.getenv("YEAR_IN_REVIEW_WORKERS", "4"))
+# Users per checkpoint
+YEAR_IN_REVIEW_CHUNK_SIZE = int(os.getenv("YEAR_IN_REVIEW_CHUNK_SIZE", "200"))
+# Month (1-12) from which the scheduler generates the current year's reports (regenerated on every run
+# until the year ends, then finalized once); 0 disables it
+YEAR_IN_REVIEW_START_MONTH = int(os.getenv("YEAR_IN_REVIEW_START_MONTH", "12"))
+# Hours between scheduled runs (each resumes the job and retries failed users)
+YEAR_IN_REVIEW_INTERVAL_HOURS = int(os.getenv("YEAR_IN_REVIEW_INTERVAL_HOURS", "24"))
+
+
+def build_year_in_review(db: Session, user: User, year: int) -> Dict:
+    """Summarize the books a user finished during `year`"""
+    year_start = datetime(year, 1, 1)
+    year_end = datetime(year + 1, 1, 1)
+
+    entries = db.execute(
+        user_books.select().where(
+            user_books.c.user_id == user.id,
+            user_books.c.status == 'read',
+            user_books.c.finished_at >= year_start,
+            user_books.c.finished_at < year_end
+        )
+    ).fetchall()
+
+    book_ids = [ub.book_id for ub in entries]
+    books_dict = {}
+    if book_ids:
+        books = db.query(Book).filter(Book.id.in_(book_ids)).all()
+        books_dict = {b.id: b for b in books}
+
+    stats = summarize_reading(entries, books_dict)
+    overview = stats["overview"]
+
+    finished = [(ub, books_dict[ub.book_id]) for ub in entries if ub.book_id in books_dict]
+    longest = max(
+        (pair for pair in finished if pair[1].page_count),
+        key=lambda pair: pair[1].page_count,
+        default=None
+    )
+    top_rated = sorted(
+        (pair for pair in finished if pair[0].rating),
+        key=lambda pair: (-pair[0].rating, pair[0].finished_at)
+    )[:5]
+
+    goal = None
+    if user.reading_goal and user.reading_goal_year == year:
+        goal = {
+            "target": user.reading_goal,
+            "achieved": overview["books_read"] >= user.reading_goal
+        }
+
+    return {
+        "year": year,
+        "books_read": overview["books_read"],
+        "pages_read": overview["total_pages"],
+        "ratings_given": overview["total_ratings"],
+        "reviews_written": overview["total_reviews"],
+        "average_rating_given": overview["average_rating_given"],
+        "books_by_month": stats["books_by_month"],
+        "pages_by_month": stats["pages_by_month"],
+        "ratings_distribution": stats["ratings_distribution"],
+        "top_genres": dict(sorted(stats["genres"].items(), key=lambda x: x[1], reverse=True)[:5]),
+        "top_authors": dict(list(stats["authors"].items())[:5]),
+        "reading_pace": stats["reading_pace"],
+        "longest_book": {
+            "book_id": longest[1].id,
+            "title": longest[1].title,
+            "pages": longest[1].page_count
+        } if longest else None,
+        "top_rated": [{
+            "book_id": book.id,
+            "title": book.title,
+            "author": book.author,
+            "cover_url": book.cover_url,
+            "rating": ub.rating
+        } for ub, book in top_rated],
+        "goal": goal,
+    }
+
+
+def _generate_for_user(user_id: int, year: int) -> bool:
+    """Build and store one user's report in its own session"""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            return True
+
+        data = json.dumps(build_year_in_review(db, user, year), separators=(',', ':'), default=str)
+
+        report = db.query(YearInReviewReport).filter(
+            YearInReviewReport.user_id == user_id,
+            YearInReviewReport.year == year
+        ).first()
+        if report:
+            report.data = data
+            report.generated_at = datetime.utcnow()
+        else:
+            db.add(YearInReviewReport(user_id=user_id, year=year, data=data))
+
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f"Year in review failed for user {user_id}: {e}")
+        return False
+    finally:
+        db.close()
+
+
+def _finished_before_year_end(job: ReportJob) -> bool:
+    """A completed run from before the year closed misses books finished after it"""
+    return job.status == 'completed' and (job.finished_at is None or job.finished_at < datetime(job.year + 1, 1, 1))
+
+
+def _get_or_create_job(db: Session, year: int, restart: bool, refresh: bool = False) -> ReportJob:
+    job = db.query(ReportJob).filter(
+        ReportJob.report_type == REPORT_TYPE,
+        ReportJob.year == year
+    ).first()
+
+    if not job:
+        job = ReportJob(report_type=REPORT_TYPE, year=year, last_user_id=0)
+        db.add(job)
+    elif restart or (refresh and _finished_before_year_end(job)):
+        job.status = 'pending'
+        job.last_user_id = 0
+        job.processed_users = 0
+        job.failed_users = 0
+        job.failed_user_ids = None
+        job.started_at = None
+        job.finished_at = None
+        job.error = None
+
+    db.commit()
+    return job
+
+
+def _failed_ids(job: ReportJob) -> List[int]:
+    return json.loads(job.failed_user_ids) if job.failed_user_ids else []
+
+
+def _set_failed_ids(job: ReportJob, user_ids: List[int]):
+    job.failed_user_ids = json.dumps(sorted(set(user_ids))) if user_ids else None
+    job.failed_users = len(set(user_ids))
+
+
+def _retry_failed(db: Session, job: ReportJob, pool: ThreadPoolExecutor, year: int):
+    """Regenerate the reports that failed earlier; the ones that fail again stay listed"""
+    failed = _failed_ids(job)
+    if not failed:
+        return
+    results = list(pool.map(lambda uid: _generate_for_user(uid, year), failed))
+    _set_failed_ids(job, [uid for uid, ok in zip(failed, results) if not ok])
+    db.commit()
+
+
+def job_progress(job: Optional[ReportJob]) -> Dict:
+    """Serialize a report job for progress polling"""
+    if not job:
+        return {"status": "not_started", "processed_users": 0, "total_users": 0, "percentage": 0}
+
+    percentage = 0
+    if job.total_users:
+        percentage = round(min(job.processed_users / job.total_users, 1) * 100, 1)
+
+    return {
+        "year": job.year,
+        "status": job.status,
+        "processed_users": job.processed_users,
+        "failed_users": job.failed_users,
+        "total_users": job.total_users,
+        "percentage": percentage,
+        "started_at": job.started_at,
+        "updated_at": job.updated_at,
+        "finished_at": job.finished_at,
+        "error": job.error,
+    }
+
+
+def run_year_in_review_job(
+    year: int,
+    workers: int = YEAR_IN_REVIEW_WORKERS,
+    chunk_size: int = YEAR_IN_REVIEW_CHUNK_SIZE,
+    restart: bool = False,
+    retry_failed: bool = False,
+    refresh: bool = False
+) -> Dict:
+    """
+    Generate reports for every user in id order, checkpointing after each chunk.
+    An interrupted run resumes after the last fully processed chunk. Users
+    whose report failed are recorded; retry_failed regenerates just those
+    (also on a completed job), restart regenerates everything and refresh
+    does so only if the completed run finished before the year ended.
+    """
+    db = SessionLocal()
+    job = None
+    try:
+        job = _get_or_create_job(db, year, restart, refresh)
+        if job.status == 'completed' and not (retry_failed and _failed_ids(job)):
+            return job_progress(job)
+
+        job.status = 'running'
+        job.started_at = job.started_at or datetime.utcnow()
+        job.error = None
+        job.total_users = db.query(func.count(User.id)).scalar()
+        db.commit()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                user_ids = [row.id for row in db.query(User.id).filter(
+                    User.id > job.last_user_id
+                ).order_by(User.id).limit(chunk_size).all()]
+
+                if not user_ids:
+                    break
+
+                results = list(pool.map(lambda uid: _generate_for_user(uid, year), user_ids))
+
+                # Every user in the chunk is done, so it is safe to advance the checkpoint
+                job.last_user_id = user_ids[-1]
+                job.processed_users += len(user_ids)
+                _set_failed_ids(job, _failed_ids(job) + [uid for uid, ok in zip(user_ids, results) if not ok])
+                db.commit()
+
+            if retry_failed:
+                _retry_failed(db, job, pool, year)
+
+        job.status = 'completed'
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        return job_progress(job)
+    except Exception as e:
+        db.rollback()
+        if job is not None:
+            job.status = 'failed'
+            job.error = str(e)
+            db.commit()
+        raise
+    finally:
+        db.close()
+
+
+def default_report_year(now: Optional[datetime] = None) -> int:
+    """The year whose report users see by default: this one once its reports start, otherwise last year's"""
+    now = now or datetime.utcnow()
+    if YEAR_IN_REVIEW_START_MONTH and now.month >= YEAR_IN_REVIEW_START_MONTH:
+        return now.year
+    return now.year - 1
+
+
+def run_scheduled_year_in_review() -> Optional[Dict]:
+    """
+    Scheduler entry point, retrying failed users on every run. Last year's
+    reports are regenerated once if their run completed before the year
+    ended; from YEAR_IN_REVIEW_START_MONTH on, the current year's reports are
+    regenerated on every run, since books are still being finished.
+    Returns progress by year.
+    """
+    if not YEAR_IN_REVIEW_START_MONTH:
+        return None
+    now = datetime.utcnow()
+    progress = {now.year - 1: run_year_in_review_job(now.year - 1, retry_failed=True, refresh=True)}
+    if now.month >= YEAR_IN_REVIEW_START_MONTH:
+        progress[now.year] = run_year_in_review_job(now.year, retry_failed=True, refresh=True)
+    return progress
+
+
+if __name__ == "__main__":
+    from database import init_db
+
+    if len(sys.argv) < 2:
+        print("Usage: python year_in_review.py <year> [--retry-failed] [--restart]")
+        sys.exit(1)
+
+    init_db()
+    summary = run_year_in_review_job(
+        int(sys.argv[1]),
+        restart='--restart' in sys.argv,
+        retry_failed='--retry-failed' in sys.argv
+    )
+    print(f"Year in review: {summary}")
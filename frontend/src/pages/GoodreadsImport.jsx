@@ -1,4 +1,4 @@
-import React, { useState, useRef } from 'react';
+import React, { useState, useRef, useEffect } from 'react';
 import { 
   Upload, FileText, CheckCircle, AlertCircle, BookOpen, 
   Star, Clock, Heart, ArrowRight, Download, X, Loader2
@@ -7,16 +7,29 @@ import { importAPI } from '../services/api';
 import { useToast } from '../components/Toast';
 import { Link } from 'react-router-dom';
 
+// How often the import job's progress is polled while it runs
+const JOB_POLL_INTERVAL_MS = 1500;
+
 function GoodreadsImport() {
   const toast = useToast();
   const fileInputRef = useRef(null);
   
   const [file, setFile] = useState(null);
-  const [csvContent, setCsvContent] = useState('');
   const [preview, setPreview] = useState(null);
   const [importResult, setImportResult] = useState(null);
+  const [job, setJob] = useState(null);
   const [loading, setLoading] = useState(false);
   const [step, setStep] = useState('upload'); // 'upload', 'preview', 'importing', 'complete'
+  const pollTimer = useRef(null);
+  const polledJobId = useRef(null);
+
+  const stopPolling = () => {
+    polledJobId.current = null;
+    clearTimeout(pollTimer.current);
+  };
+
+  // Stop polling when leaving the page
+  useEffect(() => stopPolling, []);
 
   const handleFileSelect = async (e) => {
     const selectedFile = e.target.files?.[0];
@@ -28,28 +41,15 @@ function GoodreadsImport() {
     }
     
     setFile(selectedFile);
-    
-    // Read file content
-    const reader = new FileReader();
-    reader.onload = async (event) => {
-      const content = event.target?.result;
-      if (typeof content === 'string') {
-        setCsvContent(content);
-        await loadPreview(content);
-      }
-    };
-    reader.onerror = () => {
-      toast.error('Failed to read file');
-    };
-    reader.readAsText(selectedFile);
+    await loadPreview(selectedFile);
   };
 
-  const loadPreview = async (content) => {
+  const loadPreview = async (csvFile) => {
     setLoading(true);
     setStep('preview');
     
     try {
-      const response = await importAPI.previewGoodreads(content);
+      const response = await importAPI.previewGoodreads(csvFile);
       setPreview(response.data);
     } catch (error) {
       console.error('Preview error:', error);
@@ -61,37 +61,84 @@ function GoodreadsImport() {
     setLoading(false);
   };
 
+  const finishImport = (result, alreadyImported) => {
+    setImportResult(result);
+    setStep('complete');
+    setLoading(false);
+    
+    // Refresh global data
+    if (window.refreshPoints) window.refreshPoints();
+    if (window.refreshReadingGoal) window.refreshReadingGoal();
+    if (window.refreshStats) window.refreshStats();
+    
+    if (alreadyImported) {
+      toast.success('This export was already imported - nothing new to add');
+    } else {
+      toast.success(`Successfully imported ${result.imported} books!`);
+    }
+  };
+
+  const failImport = (message) => {
+    stopPolling();
+    toast.error(message);
+    setJob(null);
+    setStep('preview');
+    setLoading(false);
+  };
+
+  const pollJob = async (jobId) => {
+    try {
+      const response = await importAPI.getImportJob(jobId);
+      // Reset or left the page while the request was in flight
+      if (polledJobId.current !== jobId) return;
+      const status = response.data;
+      setJob(status);
+      
+      if (status.status === 'completed') {
+        stopPolling();
+        finishImport(status, false);
+      } else if (status.status === 'failed') {
+        failImport(status.errors[status.errors.length - 1] || 'Import failed. Please try again.');
+      } else {
+        pollTimer.current = setTimeout(() => pollJob(jobId), JOB_POLL_INTERVAL_MS);
+      }
+    } catch (error) {
+      console.error('Import status error:', error);
+      if (polledJobId.current !== jobId) return;
+      // The job keeps running on the server; keep asking
+      pollTimer.current = setTimeout(() => pollJob(jobId), JOB_POLL_INTERVAL_MS * 2);
+    }
+  };
+
   const handleImport = async () => {
-    if (!csvContent) return;
+    if (!file) return;
     
     setStep('importing');
     setLoading(true);
     
     try {
-      const response = await importAPI.importGoodreads(csvContent);
-      setImportResult(response.data);
-      setStep('complete');
+      // The import runs in the background; the upload only queues it
+      const response = await importAPI.importGoodreads(file);
+      setJob(response.data);
       
-      // Refresh global data
-      if (window.refreshPoints) window.refreshPoints();
-      if (window.refreshReadingGoal) window.refreshReadingGoal();
-      if (window.refreshStats) window.refreshStats();
-      
-      toast.success(`Successfully imported ${response.data.imported} books!`);
+      if (response.data.already_imported) {
+        finishImport(response.data, true);
+      } else {
+        polledJobId.current = response.data.job_id;
+        pollJob(response.data.job_id);
+      }
     } catch (error) {
       console.error('Import error:', error);
-      toast.error('Import failed. Please try again.');
-      setStep('preview');
+      failImport('Import failed. Please try again.');
     }
-    
-    setLoading(false);
   };
 
   const resetImport = () => {
+    stopPolling();
     setFile(null);
-    setCsvContent('');
     setPreview(null);
     setImportResult(null);
+    setJob(null);
     setStep('upload');
     if (fileInputRef.current) {
       fileInputRef.current.value = '';
@@ -179,7 +226,20 @@ function GoodreadsImport() {
             Importing Your Books...
           </h2>
           <p className="text-ink-500 dark:text-ink-400">
-            This may take a moment depending on how many books you have
+            {job?.total_rows
+              ? `${job.processed_rows} of ${job.total_rows} books processed`
+              : 'This may take a moment depending on how many books you have'}
+          </p>
+          {job?.total_rows > 0 && (
+            <div className="mt-4 h-2 bg-cream-200 dark:bg-ink-700 rounded-full overflow-hidden max-w-sm mx-auto">
+              <div
+                className="h-full bg-primary-500 transition-all"
+                style={{ width: `${job.percentage}%` }}
+              />
+            </div>
+          )}
+          <p className="text-xs text-ink-400 dark:text-ink-500 mt-4">
+            You can leave this page - the import keeps running
           </p>
         </div>
       )}
@@ -126,14 +126,22 @@ export const statsAPI = {
   getReadingStreak: () => api.get('/stats/reading-streak'),
 };
 
-// Import API
+// Import API (CSV files are uploaded as multipart form data)
+const csvUpload = (file) => {
+  const formData = new FormData();
+  formData.append('file', file);
+  return formData;
+};
+
 export const importAPI = {
-  previewGoodreads: (csvContent) => api.post('/import/goodreads/preview', csvContent, {
-    headers: { 'Content-Type': 'text/plain' }
+  previewGoodreads: (file) => api.post('/import/goodreads/preview', csvUpload(file), {
+    headers: { 'Content-Type': 'multipart/form-data' }
   }),
-  importGoodreads: (csvContent) => api.post('/import/goodreads', csvContent, {
-    headers: { 'Content-Type': 'text/plain' }
+  // Queues a background import; poll getImportJob with the returned job_id
+  importGoodreads: (file) => api.post('/import/goodreads/jobs', csvUpload(file), {
+    headers: { 'Content-Type': 'multipart/form-data' }
   }),
+  getImportJob: (jobId) => api.get(`/import/jobs/${jobId}`),
 };
 
 // Reading Circles API